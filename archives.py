@@ -0,0 +1,172 @@
+"""
+archives.py - Read exports inside ZIP archives and compressed files without extracting them
+"""
+import os
+import gzip
+import zipfile
+import threading
+
+try:
+    # Optional - zstd-compressed outputs (pip install zstandard)
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# A file inside an archive is addressed as <archive path><os.sep><member name>,
+# e.g. results/export.zip/labs/cbc.json - it reads like a path, and
+# os.path.basename() gives the member's own file name
+
+# Archives kept open, so reading member after member does not parse the
+# archive's directory each time (closed by close_archives())
+MAX_OPEN_ARCHIVES = 8
+
+# File suffix of each compression (see open_compressed); read_data_file()
+# decompresses files with these suffixes
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# JSON exports, plain or compressed
+JSON_EXTENSIONS = ('.json', '.json.gz', '.json.zst')
+
+ZSTD_MISSING_ERROR = "zstd compression needs the zstandard package: pip install zstandard"
+
+_open_archives = {}
+_lock = threading.Lock()
+
+
+def is_archive(path):
+    """True for a .zip path"""
+    return path.lower().endswith('.zip')
+
+
+def member_path(archive_path, member):
+    """Path for a member (a name as stored in the archive) of archive_path"""
+    return archive_path + os.sep + member.replace('/', os.sep)
+
+
+def split_member_path(path):
+    """(archive path, member name) for a path inside an archive, else (path, None)"""
+    lowered = path.lower()
+    start = 0
+    while True:
+        i = lowered.find('.zip' + os.sep, start)
+        if i == -1:
+            return path, None
+        archive_path = path[:i + 4]
+        if os.path.isfile(archive_path):
+            return archive_path, path[i + 5:].replace(os.sep, '/')
+        # A folder whose name ends in .zip - keep looking
+        start = i + 5
+
+
+def is_member_path(path):
+    return split_member_path(path)[1] is not None
+
+
+def _archive(archive_path):
+    """Open (or reuse) the ZipFile for archive_path; reopened if the file changed"""
+    st = os.stat(archive_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    with _lock:
+        cached = _open_archives.get(archive_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+        archive = zipfile.ZipFile(archive_path)
+        _open_archives[archive_path] = (stamp, archive)
+        while len(_open_archives) > MAX_OPEN_ARCHIVES:
+            oldest = next(iter(_open_archives))
+            _open_archives.pop(oldest)[1].close()
+        return archive
+
+
+def close_archives():
+    """Close the archives kept open (so they can be replaced or deleted, e.g. on Windows)"""
+    with _lock:
+        for stamp, archive in _open_archives.values():
+            archive.close()
+        _open_archives.clear()
+
+
+def list_members(archive_path, extensions):
+    """Paths of the archive's files with the given extensions, in archive order"""
+    try:
+        infos = _archive(archive_path).infolist()
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"✗ {os.path.basename(archive_path)}: Error - {e}")
+        return []
+    return [member_path(archive_path, info.filename) for info in infos
+            if not info.is_dir()
+            and info.filename.lower().endswith(extensions)
+            # Resource forks added by the macOS archiver
+            and not info.filename.startswith('__MACOSX/')]
+
+
+def expand_paths(paths, extensions):
+    """paths with each .zip replaced by its members with the given extensions"""
+    expanded = []
+    for path in paths:
+        if is_archive(path):
+            expanded.extend(list_members(path, extensions))
+        elif path.lower().endswith(extensions):
+            expanded.append(path)
+    return expanded
+
+
+def member_fingerprint(path):
+    """(size, CRC-32) of an archive member, from the archive's directory (nothing is decompressed)"""
+    archive_path, member = split_member_path(path)
+    try:
+        info = _archive(archive_path).getinfo(member)
+    except KeyError:
+        raise FileNotFoundError(f"{member} is not in {archive_path}")
+    return info.file_size, info.CRC
+
+
+def open_data_file(path):
+    """Open a file - or an archive member, decompressed as it is read - for reading bytes"""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        return open(path, 'rb')
+    try:
+        return _archive(archive_path).open(member)
+    except KeyError:
+        raise FileNotFoundError(f"{member} is not in {archive_path}")
+    except ValueError:
+        # Closed by close_archives() in another thread just now - open it again
+        return _archive(archive_path).open(member)
+
+
+def read_data_file(path):
+    """All bytes of a file or archive member - decompressed for a .gz or .zst file"""
+    with open_data_file(path) as f:
+        data = f.read()
+    lowered = path.lower()
+    if lowered.endswith(COMPRESSION_SUFFIXES['gzip']):
+        return gzip.decompress(data)
+    if lowered.endswith(COMPRESSION_SUFFIXES['zstd']):
+        if zstandard is None:
+            raise OSError(f"{os.path.basename(path)}: {ZSTD_MISSING_ERROR}")
+        # A decompressobj also reads frames written without their size (streamed)
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def compression_error(compression):
+    """Why files can't be written with compression (None, "gzip" or "zstd"), or None if they can"""
+    if compression and compression not in COMPRESSION_SUFFIXES:
+        return f"Unknown compression '{compression}' (use 'gzip' or 'zstd')"
+    if compression == 'zstd' and zstandard is None:
+        return ZSTD_MISSING_ERROR
+    return None
+
+
+def open_compressed(path, compression=None):
+    """Open path for writing bytes, compressed with compression (None, "gzip" or "zstd")"""
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise OSError(ZSTD_MISSING_ERROR)
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True)
+    return open(path, 'wb')
@@ -0,0 +1,489 @@
+"""
+benchmarks.py - Timing comparisons for search and parsing hot paths
+
+Usage:
+    python benchmarks.py fuzzy [--names 5000] [--queries 300]
+    python benchmarks.py segment [--pages 2000]
+    python benchmarks.py notes [--notes 500]
+    python benchmarks.py labcorp [--lines 200000]
+    python benchmarks.py kaiser [--panels 3000]
+    python benchmarks.py series [--points 20000] (needs numpy)
+    python benchmarks.py snapshot [--tests 500] [--points 400]
+
+Each benchmark builds a synthetic workload, checks that the optimized code
+returns exactly what the reference implementation returns, and prints timings.
+"""
+import argparse
+import random
+import re
+import sys
+import os
+import time
+from difflib import get_close_matches
+
+# Add current directory to path to ensure imports work
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from matcher import FuzzyNameMatcher
+from parsers import parse_labcorp_tests, parse_kaiser_tests, _determine_status
+from medical_parsers import SectionIndex, parse_all_medical_records, _iter_note_spans
+
+# Word pools used to build realistic-looking test and procedure names
+NAME_WORDS = [
+    'glucose', 'calcium', 'urine', 'serum', 'protein', 'albumin', 'globulin',
+    'cholesterol', 'triglycerides', 'hdl', 'ldl', 'vitamin', 'ferritin', 'iron',
+    'sodium', 'potassium', 'chloride', 'creatinine', 'bilirubin', 'total',
+    'direct', 'free', 'ratio', 'count', 'auto', 'panel', 'culture', 'screen',
+    'ultrasound', 'abdomen', 'colonoscopy', 'xr', 'chest', 'knee', 'fluoro',
+    'optical', 'coherence', 'tomography', 'retina', 'hemoglobin', 'a1c',
+    'platelet', 'neutrophils', 'lymphocytes', 'monocytes', 'absolute', '24hr',
+]
+
+
+def _timed(func, repeat=1):
+    """Run func repeat times and return (last_result, seconds_per_run)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def _make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(' '.join(rng.sample(NAME_WORDS, rng.randint(1, 4))))
+    return sorted(names)
+
+
+def _make_typo(name, rng):
+    """Drop, swap or replace one character"""
+    if len(name) < 3:
+        return name
+    i = rng.randrange(len(name) - 1)
+    choice = rng.randint(0, 2)
+    if choice == 0:
+        return name[:i] + name[i + 1:]
+    if choice == 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + name[i + 1:]
+
+
+def bench_fuzzy(args):
+    """Compare FuzzyNameMatcher with difflib.get_close_matches (n=3, cutoff=0.8)"""
+    rng = random.Random(args.seed)
+    names = _make_names(args.names, rng)
+    queries = [_make_typo(rng.choice(names), rng) for _ in range(args.queries // 2)]
+    queries += [' '.join(rng.sample(NAME_WORDS, 2))[:rng.randint(3, 20)] for _ in range(args.queries - len(queries))]
+
+    print(f"Fuzzy matching: {len(names)} names, {len(queries)} queries")
+
+    matcher, build_time = _timed(lambda: FuzzyNameMatcher(names))
+
+    expected, difflib_time = _timed(
+        lambda: [get_close_matches(q, names, n=3, cutoff=0.8) for q in queries]
+    )
+    actual, index_time = _timed(
+        lambda: [matcher.get_close_matches(q, n=3, cutoff=0.8) for q in queries]
+    )
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    per_query = 1000.0 / len(queries)
+    print(f"  Index build:         {build_time * 1000:8.1f} ms (once per load)")
+    print(f"  difflib:             {difflib_time * per_query:8.2f} ms/query")
+    print(f"  FuzzyNameMatcher:    {index_time * per_query:8.2f} ms/query")
+    print(f"  Speedup:             {difflib_time / max(index_time, 1e-9):8.1f}x")
+    print(f"  Result mismatches:   {mismatches}")
+    return mismatches == 0
+
+
+# Section lookups as medical_parsers did them before SectionIndex (one regex scan each)
+LEGACY_SECTIONS = [
+    ('vitals', r'Last Filed Vital Signs.*?(?=Results|Immunizations|$)', 0,
+     ('Last Filed Vital Signs', ('Results', 'Immunizations'), True)),
+    ('ended medications', r'Ended Medications(.*?)(?=Active Problems|Immunizations|$)', 1,
+     ('Ended Medications', ('Active Problems', 'Immunizations'), False)),
+    ('immunizations', r'Immunizations(.*?)(?=Social History|$)', 1,
+     ('Immunizations', ('Social History',), False)),
+    ('active problems', r'Active Problems(.*?)(?=Resolved Problems|Immunizations|$)', 1,
+     ('Active Problems', ('Resolved Problems', 'Immunizations'), False)),
+    ('resolved problems', r'Resolved Problems(.*?)(?=Immunizations|$)', 1,
+     ('Resolved Problems', ('Immunizations',), False)),
+]
+
+
+def _make_kaiser_document(pages, rng):
+    """A long Kaiser-style export: summary sections up front, then many result pages"""
+    def date():
+        return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2015, 2024)}"
+
+    parts = [
+        "Kaiser Permanente",
+        "Last Filed Vital Signs",
+        f"Blood Pressure 120/80 {date()}", f"Pulse 72 {date()}",
+        "Ended Medications",
+        f"ATORVASTATIN 10 MG tablet (Started {date()}) (Expired)",
+        "Active Problems", f"HYPERTENSION {date()}",
+        "Resolved Problems", f"ACUTE BRONCHITIS {date()} resolved on {date()}",
+        "Immunizations", f"Influenza Vaccine (Given {date()}, {date()})",
+    ]
+    # Result pages rarely repeat the summary headers, so the lazy section
+    # regexes used to scan all of them looking for a terminator
+    for page in range(pages):
+        parts.append(f"CBC WITH DIFF - Final result ({date()} 10:00 AM PST)")
+        parts.append(f"Hemoglobin 13.{page % 10} 13.2 - 17.1 g/dL")
+        parts.append(f"XR CHEST 2 VIEWS - Final result ({date()})\nImpressions\nNo acute findings.\n\nPerforming Organization")
+        parts.append(f"Page {page + 1} of {pages}")
+    parts.append("Social History")
+    return '\n'.join(parts) + '\n'
+
+
+def bench_segment(args):
+    """Compare SectionIndex slices with one lazy regex search per section"""
+    rng = random.Random(args.seed)
+    text = _make_kaiser_document(args.pages, rng)
+    print(f"Section segmentation: {len(text) / 1e6:.1f} MB document, {args.pages} result pages")
+
+    def legacy():
+        slices = []
+        for _, pattern, group, _ in LEGACY_SECTIONS:
+            match = re.search(pattern, text, re.DOTALL)
+            slices.append(match.group(group) if match else None)
+        return slices
+
+    def segmented():
+        sections = SectionIndex(text)
+        return [sections.section(header, terminators, include_header)
+                for _, _, _, (header, terminators, include_header) in LEGACY_SECTIONS]
+
+    expected, legacy_time = _timed(legacy, repeat=3)
+    actual, index_time = _timed(segmented, repeat=3)
+    _, parse_time = _timed(lambda: parse_all_medical_records(text))
+
+    mismatches = [name for (name, _, _, _), a, b in zip(LEGACY_SECTIONS, expected, actual) if a != b]
+    print(f"  Regex per section:   {legacy_time * 1000:8.1f} ms")
+    print(f"  SectionIndex:        {index_time * 1000:8.1f} ms")
+    print(f"  Speedup:             {legacy_time / max(index_time, 1e-9):8.1f}x")
+    print(f"  Full medical parse:  {parse_time * 1000:8.1f} ms")
+    print(f"  Section mismatches:  {len(mismatches)} {', '.join(mismatches)}")
+    return not mismatches
+
+
+LEGACY_NOTE_PATTERN = re.compile(
+    r'Procedure Note\s+(.*?)\s+Procedure Note(.*?)(?=Authorizing Provider|Performing|$)', re.DOTALL
+)
+
+
+def bench_notes(args):
+    """Compare the offset-based note extractor with the original DOTALL regex"""
+    rng = random.Random(args.seed)
+    # Note headers that never get a closing "Procedure Note" (the repeated
+    # marker is glued to the previous word) and no "Authorizing Provider" /
+    # "Performing" markers: the regex rescanned to the end for every header
+    unclosed = []
+    for i in range(args.notes):
+        unclosed.append(f"See:Procedure Note DR {i} MD {rng.randint(1, 12):02d}/01/2020 "
+                        f"Patient tolerated the procedure well. {'Findings unremarkable. ' * rng.randint(1, 5)}")
+    # Complete notes - header, repeated marker, body, then one of the two
+    # terminators - so the notes found are compared as well
+    closed = []
+    for i in range(args.notes):
+        terminator = rng.choice(["Authorizing Provider: DR SMITH MD", "Performing Department: ENDOSCOPY"])
+        closed.append(f"Procedure Note\nDR {i} MD {rng.randint(1, 12):02d}/01/2020\nProcedure Note\n"
+                      f"Patient tolerated the procedure well. {'Findings unremarkable. ' * rng.randint(1, 5)}\n"
+                      f"{terminator}")
+
+    ok = True
+    for label, notes in (("unclosed headers", unclosed), ("closed notes", closed)):
+        text = '\n'.join(notes)
+        print(f"Clinical notes: {args.notes} notes, {len(text) / 1e6:.2f} MB, {label}")
+
+        expected, legacy_time = _timed(
+            lambda: [(m.group(1).strip(), m.group(2)) for m in LEGACY_NOTE_PATTERN.finditer(text)]
+        )
+        actual, scan_time = _timed(
+            lambda: [(header.strip(), body) for header, body in _iter_note_spans(text)]
+        )
+
+        print(f"  DOTALL regex:        {legacy_time * 1000:8.1f} ms")
+        print(f"  Offset scan:         {scan_time * 1000:8.1f} ms")
+        print(f"  Speedup:             {legacy_time / max(scan_time, 1e-9):8.1f}x")
+        print(f"  Notes found:         {len(actual)} (regex: {len(expected)})")
+        ok = ok and expected == actual
+    return ok
+
+
+def _legacy_labcorp_results(text, test_date):
+    """parse_labcorp_tests' line loop as it was before parse_labcorp_line"""
+    results = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or 'Current Result' in line or 'Reference Interval' in line:
+            continue
+        match = re.match(
+            r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([\d.<>]+)?\s+(\d{1,2}/\d{1,2}/\d{4})?\s+([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?',
+            line
+        )
+        if match:
+            groups = (match.group(1), match.group(2), match.group(3), match.group(6), match.group(7))
+        else:
+            match = re.match(
+                r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?',
+                line
+            )
+            if not match:
+                continue
+            groups = match.groups()
+        name, value, flag, unit, ref_range = groups
+        value = value.strip()
+        unit = unit.strip() if unit else ''
+        ref_range = ref_range.strip() if ref_range else ''
+        results.setdefault(name.strip(), []).append({
+            'Date': test_date,
+            'Value': value,
+            'Unit': unit,
+            'Reference Range': ref_range,
+            'Status': _determine_status(value, ref_range, flag or None)
+        })
+    return results
+
+
+def _make_labcorp_document(line_count, rng):
+    """A LabCorp export: mostly boilerplate with result lines in both formats"""
+    boilerplate = [
+        "Laboratory Corporation of America", "Patient Details", "Ordering Physician: J. Smith MD",
+        "Tests Ordered Current Result and Flag Previous Result and Date Units Reference Interval",
+        "This test was developed and its performance characteristics determined by LabCorp.",
+        "Page 1 of 4", "", "Comment:", "Final Report 01/22/2024 Phone: 800-845-6167",
+    ]
+    units = ['mg/dL', 'x10E3/uL', '%', 'mmol/L', 'U/L', 'g/dL']
+    lines = ["Date Collected: 01/15/2024"]
+    for _ in range(line_count):
+        roll = rng.random()
+        name = ' '.join(rng.sample(NAME_WORDS, rng.randint(1, 3))).title()
+        value = f"{rng.uniform(1, 200):.1f}"
+        ref_range = f"{rng.randint(1, 50)}-{rng.randint(60, 250)}"
+        if roll < 0.15:
+            flag = rng.choice(['', 'High ', 'Low '])
+            lines.append(f"{name} 01 {value} {flag}{rng.uniform(1, 200):.1f} "
+                         f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/2023 {rng.choice(units)} {ref_range}")
+        elif roll < 0.3:
+            flag = rng.choice(['', 'High ', 'Critical '])
+            lines.append(f"{name} 01 {value} {flag}{rng.choice(units)} {ref_range}")
+        elif roll < 0.33:
+            # Irregular spacing from the PDF text layer
+            lines.append(f"{name}  01\t{value}   {rng.choice(units)}  {ref_range}")
+        else:
+            lines.append(rng.choice(boilerplate))
+    return '\n'.join(lines)
+
+
+def bench_labcorp(args):
+    """Compare parse_labcorp_tests with the per-line regex loop it replaced"""
+    rng = random.Random(args.seed)
+    text = _make_labcorp_document(args.lines, rng)
+    line_count = text.count('\n') + 1
+    print(f"LabCorp lines: {line_count} lines, {len(text) / 1e6:.1f} MB")
+
+    expected, legacy_time = _timed(lambda: _legacy_labcorp_results(text, '01/15/2024'))
+    actual, tokenizer_time = _timed(lambda: parse_labcorp_tests(text))
+
+    records = sum(len(entries) for entries in actual.values())
+    print(f"  Regex per line:      {line_count / legacy_time:12,.0f} lines/s")
+    print(f"  Tokenizer:           {line_count / tokenizer_time:12,.0f} lines/s")
+    print(f"  Speedup:             {legacy_time / max(tokenizer_time, 1e-9):8.1f}x")
+    print(f"  Records:             {records} (match: {expected == actual})")
+    return expected == actual
+
+
+def _legacy_kaiser_results(text):
+    """parse_kaiser_tests as it was, with a 4000-character window per panel header"""
+    results = {}
+    for panel_match in re.finditer(r'([A-Z][A-Z\s,()/-]+?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})', text):
+        next_section = text[panel_match.end():panel_match.end() + 4000]
+        for line in next_section.split('\n'):
+            line = line.strip()
+            if not line or 'Component' in line or 'Analysis' in line or 'Test Method' in line:
+                continue
+            if 'Final result' in line or 'Specimen' in line or 'Comment:' in line:
+                break
+            match = re.match(r'^([A-Z][A-Z\s,()\'/-]+?)\s+([\d.]+)\s+([\d.\s-]+)\s*([a-zA-Z0-9/*%]+)?', line)
+            if match:
+                value = match.group(2).strip()
+                ref_range = match.group(3).strip()
+                results.setdefault(match.group(1).strip(), []).append({
+                    'Date': panel_match.group(2),
+                    'Value': value,
+                    'Unit': match.group(4).strip() if match.group(4) else '',
+                    'Reference Range': ref_range,
+                    'Status': _determine_status(value, ref_range)
+                })
+    return results
+
+
+def bench_kaiser(args):
+    """Compare the line-indexed panel scanner with per-panel 4000-character windows"""
+    rng = random.Random(args.seed)
+    parts = ["Kaiser Permanente"]
+    for panel in range(args.panels):
+        parts.append(f"{rng.choice(NAME_WORDS).upper()} PANEL - Final result ({rng.randint(1, 12):02d}/01/2023 10:00 AM PST)")
+        parts.append("Component Value Ref Range Units")
+        # Every 50th panel is long enough to run past the old window
+        for _ in range(200 if panel % 50 == 0 else rng.randint(2, 6)):
+            name = rng.choice(NAME_WORDS).upper()
+            parts.append(f"{name} {rng.uniform(1, 200):.1f} {rng.randint(1, 50)} - {rng.randint(60, 250)} mg/dL")
+        parts.append("Specimen Collected: blood")
+    text = '\n'.join(parts)
+    print(f"Kaiser panels: {args.panels} panels, {len(text) / 1e6:.1f} MB")
+
+    legacy, legacy_time = _timed(lambda: _legacy_kaiser_results(text))
+    results, scan_time = _timed(lambda: parse_kaiser_tests(text))
+    legacy_count = sum(len(entries) for entries in legacy.values())
+    count = sum(len(entries) for entries in results.values())
+
+    print(f"  4000-char windows:   {legacy_time * 1000:8.1f} ms ({legacy_count} records)")
+    print(f"  Line index:          {scan_time * 1000:8.1f} ms ({count} records)")
+    print(f"  Speedup:             {legacy_time / max(scan_time, 1e-9):8.1f}x")
+    print(f"  Records recovered from long panels: {count - legacy_count}")
+    return count >= legacy_count
+
+
+def bench_series(args):
+    """Compare per-entry statistics and abnormal scans with a TestSeries"""
+    from series import TestSeries
+    from records import Record, status_is_abnormal
+    from reference_range import parse_reference_range
+
+    def is_abnormal_value(entry):
+        # The status and range checks of AbnormalTestsManager.is_abnormal_value
+        if status_is_abnormal(entry.get('Status', '')):
+            return True
+        value, ref_range = entry.get('Value', ''), entry.get('Reference Range', '')
+        return bool(value and ref_range and parse_reference_range(ref_range).classify(value) in ('Low', 'High'))
+
+    rng = random.Random(args.seed)
+    records = [Record({
+        'Date': f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1980, 2024)}",
+        'Value': f"{rng.gauss(100, 15):.1f}",
+        'Unit': 'mg/dL',
+        'Reference Range': '70-130',
+        'Status': 'Normal',
+    }) for _ in range(args.points)]
+    print(f"Series: {args.points} points for one test")
+
+    def per_entry():
+        values = [r.numeric_value for r in records]
+        stats = (min(values), max(values), sum(values) / len(values))
+        return stats, [is_abnormal_value(r) for r in records]
+
+    def columnar():
+        series = TestSeries(records, {})
+        return series.stats(), series.abnormal_mask(is_abnormal_value).tolist()
+
+    (expected_stats, expected_mask), entry_time = _timed(per_entry, repeat=3)
+    (stats, mask), build_time = _timed(columnar, repeat=3)
+    series = TestSeries(records, {})
+    series.abnormal_mask(is_abnormal_value)
+    _, render_time = _timed(lambda: (series.stats(), series.abnormal_mask(is_abnormal_value).any()), repeat=20)
+
+    # The series is in date order; compare the flags of each record
+    expected_flags = dict(zip(map(id, records), expected_mask))
+    ok = ([expected_flags[id(r)] for r in series.records] == mask
+          and all(abs(a - b) < 1e-9 for a, b in zip(expected_stats, stats)))
+    print(f"  Per-entry loops:     {entry_time * 1000:8.1f} ms per render")
+    print(f"  Build TestSeries:    {build_time * 1000:8.1f} ms (once per load)")
+    print(f"  TestSeries render:   {render_time * 1000:8.3f} ms per render")
+    print(f"  Results match:       {ok}")
+    return ok
+
+
+def bench_snapshot(args):
+    """Compare rebuilding all_tests from parsed dicts with opening a snapshot"""
+    import tempfile
+    from records import Record
+    from snapshot import write_snapshot, open_snapshot
+
+    rng = random.Random(args.seed)
+    names = _make_names(args.tests, rng)
+    parsed = {name: [{
+        'Date': f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1980, 2024)}",
+        'Value': f"{rng.gauss(100, 15):.1f}",
+        'Unit': 'mg/dL',
+        'Reference Range': '70-130',
+        'Status': rng.choice(['Normal', 'Normal', 'High', 'Low']),
+    } for _ in range(args.points)] for name in names}
+    print(f"Snapshot: {len(names)} tests x {args.points} entries")
+
+    def rebuild():
+        # What a cached load still does: build a Record for every parsed entry
+        return {name: [Record(entry, source='export.json') for entry in entries]
+                for name, entries in parsed.items()}
+
+    all_tests, rebuild_time = _timed(rebuild, repeat=3)
+
+    with tempfile.TemporaryDirectory() as folder:
+        with open(os.path.join(folder, 'export.json'), 'w') as f:
+            f.write('{}')
+        path = os.path.join(folder, '.parse_cache', 'snapshot.bin')
+        _, write_time = _timed(lambda: write_snapshot(path, folder, all_tests))
+        snapshot, open_time = _timed(lambda: open_snapshot(path, folder), repeat=3)
+        _, lookup_time = _timed(lambda: open_snapshot(path, folder)[names[0]], repeat=3)
+        _, full_time = _timed(lambda: dict(open_snapshot(path, folder).items()))
+        size = os.path.getsize(path)
+
+        ok = (list(snapshot) == list(all_tests)
+              and all(snapshot[name] == entries for name, entries in all_tests.items())
+              and all(a.date_ordinal == b.date_ordinal and a.source == b.source
+                      for name in names[:10] for a, b in zip(snapshot[name], all_tests[name])))
+        del snapshot
+
+    print(f"  Rebuild all_tests:   {rebuild_time * 1000:8.1f} ms")
+    print(f"  Write snapshot:      {write_time * 1000:8.1f} ms ({size / 1e6:.1f} MB, once per load)")
+    print(f"  Open snapshot:       {open_time * 1000:8.3f} ms (ready to search)")
+    print(f"  Open + one test:     {lookup_time * 1000:8.3f} ms")
+    print(f"  Open + every test:   {full_time * 1000:8.1f} ms")
+    print(f"  Results match:       {ok}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medical Health Assistant benchmarks")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for synthetic data")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    fuzzy = subparsers.add_parser('fuzzy', help="Fuzzy name matching vs difflib")
+    fuzzy.add_argument('--names', type=int, default=5000)
+    fuzzy.add_argument('--queries', type=int, default=300)
+    fuzzy.set_defaults(func=bench_fuzzy)
+
+    segment = subparsers.add_parser('segment', help="Single-pass section segmentation vs per-section regexes")
+    segment.add_argument('--pages', type=int, default=2000)
+    segment.set_defaults(func=bench_segment)
+
+    notes = subparsers.add_parser('notes', help="Clinical note extraction vs the backtracking regex")
+    notes.add_argument('--notes', type=int, default=500)
+    notes.set_defaults(func=bench_notes)
+
+    labcorp = subparsers.add_parser('labcorp', help="LabCorp line tokenizer vs per-line regexes")
+    labcorp.add_argument('--lines', type=int, default=200000)
+    labcorp.set_defaults(func=bench_labcorp)
+
+    kaiser = subparsers.add_parser('kaiser', help="Kaiser panel scanning vs fixed-size windows")
+    kaiser.add_argument('--panels', type=int, default=3000)
+    kaiser.set_defaults(func=bench_kaiser)
+
+    series = subparsers.add_parser('series', help="Columnar series vs per-entry loops (needs numpy)")
+    series.add_argument('--points', type=int, default=20000)
+    series.set_defaults(func=bench_series)
+
+    snapshot = subparsers.add_parser('snapshot', help="Memory-mapped snapshot vs rebuilding all_tests")
+    snapshot.add_argument('--tests', type=int, default=500)
+    snapshot.add_argument('--points', type=int, default=400)
+    snapshot.set_defaults(func=bench_snapshot)
+
+    args = parser.parse_args()
+    ok = args.func(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
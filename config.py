@@ -6,4 +6,61 @@ config.py - Configuration settings
 RESULTS_FOLDER = "results"
 
 # Enable debug output
-DEBUG_MODE = False
\ No newline at end of file
+DEBUG_MODE = False
+
+# Cache parsed results next to the data folder so unchanged files are not re-parsed
+USE_PARSE_CACHE = True
+
+# Number of worker processes used to parse files (1 = serial, 0 = one per CPU)
+LOAD_WORKERS = 1
+
+# Seconds allowed for parsing one document before it is skipped (None = no limit)
+PARSE_TIME_BUDGET = 60
+
+# Keep parsed records in an indexed SQLite database next to the data folder
+# (for large archives; queries like "abnormal since 2022" then use its indexes)
+USE_RECORD_STORE = False
+
+# Start from a manifest of test names and parse files only when a test is
+# first looked up (for folders with thousands of exports). Speeds up later
+# starts only - the first load of a folder still parses every file
+LAZY_LOAD = False
+
+# Save the loaded folder as a memory-mapped snapshot, opened instead of
+# parsing the next time the folder is loaded (rebuilt when the folder changes)
+USE_SNAPSHOT = True
+
+# Reopen the last data folder on the next GUI start instead of asking for one
+REOPEN_LAST_FOLDER = False
+
+# Watch the data folder and reload only the files that are added, changed or deleted
+# (off by default: the first change loads every file of a lazy load or snapshot)
+WATCH_FOLDER = False
+
+# Seconds between folder scans when watching (change notifications are used
+# as well if the optional watchdog package is installed)
+WATCH_INTERVAL = 2.0
+
+# Number of worker processes used to convert PDFs (1 = serial, 0 = one per CPU);
+# PDFs unchanged since the last conversion are always skipped
+CONVERT_WORKERS = 0
+
+# Write converted PDF text page by page to the .txt and keep only a reference
+# (with page offsets) in the .json - bounds memory for very large PDFs
+STREAM_PDF_TEXT = False
+
+# Limits for extracting one PDF (each runs in its own worker process): seconds
+# of wall-clock time and MB of address space (None = no limit; the memory cap
+# is not available on Windows). A PDF past either is skipped with an error.
+EXTRACT_TIMEOUT = 600
+EXTRACT_MEMORY_LIMIT_MB = 2048
+
+# Read every PDF page with PyPDF2 first and run pdfplumber only on pages with
+# results, vital signs or procedures (needs both libraries installed; the
+# other pages' text then differs, so changing this converts every PDF again)
+ADAPTIVE_EXTRACTION = False
+
+# Compress converted PDF outputs: None, "gzip" or "zstd" (needs the zstandard
+# package). Compressed, the text is stored once, in the .txt.gz/.txt.zst the
+# compact .json refers to; the loader decompresses both as it reads them
+COMPRESS_OUTPUTS = None
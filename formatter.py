@@ -1,16 +1,20 @@
 """
 formatter.py - Format test results for display
 """
-from datetime import datetime
+from records import as_record, date_sort_key, since_ordinal
 
-def format_results(results):
-    """Format test results for display"""
+def format_results(results, series=None):
+    """Format test results for display
+
+    series (a series.TestSeries for the same results) lets the statistics
+    be computed on its arrays instead of the entries.
+    """
     if not results:
         return "No results found."
     
     sorted_results = sorted(
-        results,
-        key=lambda x: datetime.strptime(x['Date'], "%m/%d/%Y"),
+        (as_record(r) for r in results),
+        key=date_sort_key,
         reverse=True
     )
     
@@ -43,32 +47,51 @@ def format_results(results):
     
     # Calculate statistics for numeric values
     if record_type in ['Vital Sign', 'Lab Test']:
-        try:
-            values = [float(r['Value']) for r in sorted_results]
-            if len(values) > 1:
-                lines.append("")
-                lines.append("Statistics:")
-                lines.append(f"  Min: {min(values)}")
-                lines.append(f"  Max: {max(values)}")
-                lines.append(f"  Avg: {sum(values)/len(values):.2f}")
-        except:
-            pass
+        # Only when every value is a plain number
+        if series is not None:
+            stats = series.stats()
+        elif len(sorted_results) > 1 and all(r.is_number for r in sorted_results):
+            values = [r.numeric_value for r in sorted_results]
+            stats = (min(values), max(values), sum(values) / len(values))
+        else:
+            stats = None
+        
+        if stats:
+            lines.append("")
+            lines.append("Statistics:")
+            lines.append(f"  Min: {stats[0]}")
+            lines.append(f"  Max: {stats[1]}")
+            lines.append(f"  Avg: {stats[2]:.2f}")
     
     return "\n".join(lines)
 
 
-def format_abnormal_tests(all_tests):
-    """Format all tests with abnormal values"""
-    abnormal_tests = {}
-    
-    # Find all tests with abnormal values
-    for test_name, results in all_tests.items():
-        abnormal_entries = [
-            r for r in results 
-            if r['Status'] in ['Low', 'High', 'Critical']
-        ]
-        if abnormal_entries:
-            abnormal_tests[test_name] = abnormal_entries
+def format_abnormal_tests(all_tests, record_store=None, since=None):
+    """Format all tests with abnormal values
+
+    since (a year like 2022 or a date string) keeps only results from that
+    date on. With a record_store.RecordStore the abnormal results are read
+    from its indexes instead of scanning all_tests.
+    """
+    if record_store is not None:
+        abnormal_tests = record_store.abnormal(since)
+    else:
+        abnormal_tests = {}
+        since_date = since_ordinal(since)
+        
+        # Find all tests with abnormal values
+        for test_name, results in all_tests.items():
+            abnormal_entries = [
+                r for r in results 
+                if r['Status'] in ['Low', 'High', 'Critical']
+            ]
+            if since_date is not None:
+                abnormal_entries = [
+                    r for r in map(as_record, abnormal_entries)
+                    if r.date_ordinal is not None and r.date_ordinal >= since_date
+                ]
+            if abnormal_entries:
+                abnormal_tests[test_name] = abnormal_entries
     
     if not abnormal_tests:
         return "No abnormal tests found. All results are within normal range!"
@@ -78,8 +101,8 @@ def format_abnormal_tests(all_tests):
     for test_name in sorted(abnormal_tests.keys()):
         abnormal_entries = abnormal_tests[test_name]
         sorted_entries = sorted(
-            abnormal_entries,
-            key=lambda x: datetime.strptime(x['Date'], "%m/%d/%Y"),
+            (as_record(r) for r in abnormal_entries),
+            key=date_sort_key,
             reverse=True
         )
         
@@ -93,4 +116,27 @@ def format_abnormal_tests(all_tests):
             )
         lines.append("")
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+def format_text_matches(hits, query):
+    """Format ranked full-text hits (score, test_name, entry) for display"""
+    if not hits:
+        return "No matching notes or procedures found."
+    
+    terms = [t for t in query.lower().split() if t]
+    lines = [f"Found {len(hits)} notes and procedures mentioning '{query}' (best match first):", ""]
+    
+    for i, (score, test_name, r) in enumerate(hits, 1):
+        lines.append(f"  {i}. {r['Date']}: {test_name} (relevance {score:.1f})")
+        
+        # Show a snippet of the narrative around the first matching term
+        text = ' '.join(str(r.get('Status', '')).split())
+        text_lower = text.lower()
+        found = [text_lower.find(t) for t in terms if text_lower.find(t) >= 0]
+        start = max(0, min(found) - 80) if found else 0
+        snippet = text[start:start + 240]
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if start + 240 < len(text) else ""
+        lines.append(f"      {prefix}{snippet}{suffix}")
+    
+    return "\n".join(lines)
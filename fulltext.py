@@ -0,0 +1,130 @@
+"""
+fulltext.py - Ranked full-text search over procedure narratives and clinical notes
+"""
+import math
+import re
+import threading
+
+# Record types whose 'Status' field holds free text worth indexing
+TEXT_RECORD_TYPES = ('Procedure', 'Clinical Note')
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Split text into lower-cased search terms with simple plural folding"""
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        # "polyps" -> "polyp"; the same folding is applied to queries
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class FullTextIndex:
+    """Inverted index with BM25 ranking, updated file by file"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+        # term -> {doc_id: term frequency}
+        self.postings = {}
+        # doc_id -> (test_name, entry, source, {term: tf}, length); None once
+        # removed, until the ids are compacted
+        self.docs = []
+        # source file -> doc_ids added from it
+        self.sources = {}
+        self.doc_count = 0
+        self.total_length = 0
+        # Files are added from loader threads (e.g. the lazy background fill)
+        # while the GUI thread searches
+        self._lock = threading.RLock()
+
+    def add_file(self, source, file_results):
+        """Index the text records of one file ({test_name: [entries]})"""
+        with self._lock:
+            for test_name, entries in file_results.items():
+                for entry in entries:
+                    if entry.get('Type') in TEXT_RECORD_TYPES:
+                        self.add_record(test_name, entry, source)
+
+    def add_record(self, test_name, entry, source=None):
+        """Index one record's name and narrative; returns its doc id"""
+        terms = tokenize(f"{entry.get('Value', '')} {entry.get('Status', '')}")
+        term_counts = {}
+        for term in terms:
+            term_counts[term] = term_counts.get(term, 0) + 1
+
+        with self._lock:
+            doc_id = len(self.docs)
+            self.docs.append((test_name, entry, source, term_counts, len(terms)))
+            for term, tf in term_counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+            self.sources.setdefault(source, []).append(doc_id)
+            self.doc_count += 1
+            self.total_length += len(terms)
+            return doc_id
+
+    def remove_file(self, source):
+        """Drop every record that was indexed from a source file"""
+        with self._lock:
+            for doc_id in self.sources.pop(source, []):
+                _, _, _, term_counts, length = self.docs[doc_id]
+                for term in term_counts:
+                    term_docs = self.postings.get(term)
+                    if term_docs is not None:
+                        term_docs.pop(doc_id, None)
+                        if not term_docs:
+                            del self.postings[term]
+                self.docs[doc_id] = None
+                self.doc_count -= 1
+                self.total_length -= length
+            if len(self.docs) - self.doc_count > self.doc_count:
+                # Mostly removed documents - renumber the rest
+                self._compact()
+
+    def _compact(self):
+        """Drop the removed documents' slots, keeping the others in order (so ties rank the same)"""
+        new_ids = {}
+        docs = []
+        for doc_id, doc in enumerate(self.docs):
+            if doc is not None:
+                new_ids[doc_id] = len(docs)
+                docs.append(doc)
+        self.postings = {term: {new_ids[doc_id]: tf for doc_id, tf in term_docs.items()}
+                         for term, term_docs in self.postings.items()}
+        self.sources = {source: [new_ids[doc_id] for doc_id in doc_ids] for source, doc_ids in self.sources.items()}
+        self.docs = docs
+
+    def search(self, query, limit=20, exclude_tests=()):
+        """Return up to limit (score, test_name, entry) tuples, best first,
+        leaving out records of the tests in exclude_tests (e.g. those already
+        matched by name)"""
+        terms = set(tokenize(query))
+        with self._lock:
+            return self._search(terms, limit, set(exclude_tests))
+
+    def _search(self, terms, limit, exclude_tests):
+        if not terms or not self.doc_count:
+            return []
+
+        avg_length = self.total_length / self.doc_count
+        scores = {}
+        for term in terms:
+            term_docs = self.postings.get(term)
+            if not term_docs:
+                continue
+            df = len(term_docs)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in term_docs.items():
+                if self.docs[doc_id][0] in exclude_tests:
+                    continue
+                length = self.docs[doc_id][4]
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score, self.docs[doc_id][0], self.docs[doc_id][1]) for doc_id, score in ranked]
@@ -3,17 +3,21 @@ GUI Abnormal Tests Manager
 Handles detection and display of abnormal test results
 """
 import tkinter as tk
+from records import status_is_abnormal, flag_is_abnormal
+from reference_range import parse_reference_range
 
 
 class AbnormalTestsManager:
     """Manages abnormal test detection and button creation"""
     
-    def __init__(self, parent_frame, button_bg, text_color, all_tests, test_names):
+    def __init__(self, parent_frame, button_bg, text_color, all_tests, test_names, series_store=None):
         self.parent_frame = parent_frame
         self.button_bg = button_bg
         self.text_color = text_color
         self.all_tests = all_tests
         self.test_names = test_names
+        # Optional series.SeriesStore - scans whole arrays instead of each entry
+        self.series_store = series_store
         
         self.abnormal_tests = []
         self.abnormal_blood_tests = []
@@ -44,36 +48,29 @@ class AbnormalTestsManager:
             return False
         
         # Check Status field
-        status = entry.get('Status', '').upper()
-        if any(keyword in status for keyword in ['ABNORMAL', 'HIGH', 'LOW', 'OUT OF RANGE', 'CRITICAL']):
+        if status_is_abnormal(entry.get('Status', '')):
             return True
         
         # Check Flag field
-        flag = entry.get('Flag', '').upper()
-        if any(keyword in flag for keyword in ['ABNORMAL', 'HIGH', 'LOW', 'H', 'L', 'CRITICAL']):
+        if flag_is_abnormal(entry.get('Flag', '')):
             return True
         
         # Check if value is outside reference range
-        try:
-            value = entry.get('Value', '')
-            ref_range = entry.get('Reference Range', '')
-            
-            if value and ref_range and '-' in ref_range:
-                # Try to parse numeric value and range
-                value_num = float(str(value).split()[0])
-                range_parts = ref_range.split('-')
-                if len(range_parts) == 2:
-                    low = float(range_parts[0].strip())
-                    high = float(range_parts[1].strip().split()[0])
-                    if value_num < low or value_num > high:
-                        return True
-        except (ValueError, AttributeError, IndexError):
-            pass
+        value = entry.get('Value', '')
+        ref_range = entry.get('Reference Range', '')
+        if value and ref_range:
+            if parse_reference_range(ref_range).classify(value) in ('Low', 'High'):
+                return True
         
         return False
     
-    def find_abnormal_tests(self):
-        """Find all tests with abnormal results"""
+    def find_abnormal_tests(self, known_abnormal=None):
+        """Find all tests with abnormal results
+        
+        known_abnormal: names already found abnormal (e.g. saved in a snapshot);
+        when given, entries are not checked again and the names are only sorted
+        into blood and other tests.
+        """
         self.abnormal_tests = []
         self.abnormal_blood_tests = []
         self.abnormal_other_tests = []
@@ -81,15 +78,23 @@ class AbnormalTestsManager:
         print(f"\n=== ABNORMAL TEST DETECTION ===")
         print(f"Checking {len(self.test_names)} tests...")
         
+        if known_abnormal is not None:
+            known_abnormal = set(known_abnormal)
+        
         # Find tests with abnormal values
         for test_name in self.test_names:
-            test_data = self.all_tests[test_name]
             has_abnormal = False
             
-            for entry in test_data:
-                if self.is_abnormal_value(entry):
-                    has_abnormal = True
-                    break
+            if known_abnormal is not None:
+                has_abnormal = test_name in known_abnormal
+            elif self.series_store is not None:
+                series = self.series_store.get(test_name)
+                has_abnormal = bool(series.abnormal_mask(self.is_abnormal_value).any())
+            else:
+                for entry in self.all_tests[test_name]:
+                    if self.is_abnormal_value(entry):
+                        has_abnormal = True
+                        break
             
             if has_abnormal:
                 self.abnormal_tests.append(test_name)
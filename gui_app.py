@@ -6,20 +6,35 @@ import tkinter as tk
 from tkinter import messagebox, scrolledtext, filedialog
 import sys
 import os
+import queue
+import threading
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from loader import load_all_tests
-from matcher import find_test
-from medical_formatter import format_results, format_abnormal_tests
+from loader import (load_all_tests, LazyTests, entry_count, total_entries,
+                    load_changed_files, apply_file_changes, expand_archive_changes, fill_record_store)
+from matcher import find_test, query_since, TestNameIndex
+from fulltext import FullTextIndex
+from series import SeriesStore
+from record_store import RecordStore, default_store_path
+from snapshot import (SnapshotTests, default_snapshot_path, folder_manifest, open_snapshot, write_snapshot,
+                      remember_last_folder, last_folder)
+from parsers import PARSER_VERSION
+from medical_formatter import format_results, format_abnormal_tests, format_text_matches
 from visualizer import can_visualize
-from config import RESULTS_FOLDER, DEBUG_MODE
-from gui_widgets import create_header, create_status_bar
+from config import (RESULTS_FOLDER, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS, PARSE_TIME_BUDGET,
+                    USE_RECORD_STORE, LAZY_LOAD, USE_SNAPSHOT, REOPEN_LAST_FOLDER, WATCH_FOLDER, WATCH_INTERVAL,
+                    CONVERT_WORKERS, STREAM_PDF_TEXT, EXTRACT_TIMEOUT, EXTRACT_MEMORY_LIMIT_MB,
+                    ADAPTIVE_EXTRACTION, COMPRESS_OUTPUTS)
+from gui_widgets import create_header, create_status_bar, create_progress_panel
 from gui_chart import ChartManager
 from gui_results import ResultsManager
 from gui_abnormal import AbnormalTestsManager
-from pdf_converter import convert_pdfs_to_json, check_pdf_support, install_pdf_library
+from pdf_converter import (convert_pdfs_to_json, check_pdf_support, install_pdf_library,
+                           convert_pdf_file, remove_converted_files)
+from watcher import FolderWatcher, collapse_changes
+from archives import expand_paths, JSON_EXTENSIONS
 from pathlib import Path
 
 class MedicalRAGApp:
@@ -40,8 +55,24 @@ class MedicalRAGApp:
         # Initialize data
         self.all_tests = {}
         self.test_names = []
+        self.name_index = TestNameIndex([])  # Rebuilt once after each load
+        self.text_index = FullTextIndex()  # Narratives of procedures and notes
+        self.series_store = SeriesStore(self.all_tests)  # Per-test arrays for stats and charts
+        self.record_store = None  # Optional SQLite store (USE_RECORD_STORE)
+        self.fill_cancel = None  # Stops the lazy-mode background load of the previous folder
+        
+        # Folder watching: watcher thread -> watch_changes, reload worker -> watch_results
+        self.watcher = None
+        self.watch_changes = queue.Queue()
+        self.watch_results = queue.Queue()
+        self.reload_running = False
         self.data_folder = None  # Will be set by user
         
+        # Background loading state (worker thread -> Tk main loop via queue)
+        self.load_queue = None
+        self.cancel_event = None
+        self.task_running = False
+        
         # Create managers (will be initialized after widgets)
         self.chart_manager = None
         self.results_manager = None
@@ -50,8 +81,24 @@ class MedicalRAGApp:
         # Create UI
         self.create_widgets()
         
-        # Prompt user to select data folder
-        self.select_data_folder()
+        # Reopen the last folder if set up to (straight from its snapshot if
+        # still valid), otherwise prompt user to select data folder
+        if not self.open_last_folder():
+            self.select_data_folder()
+    
+    def open_last_folder(self):
+        """Show the last folder opened, from its snapshot when the files are unchanged
+
+        Returns False if there is no last folder to open.
+        """
+        folder = last_folder() if REOPEN_LAST_FOLDER else None
+        if not folder:
+            return False
+        
+        self.data_folder = folder
+        # Opens the snapshot if it is still valid
+        self.load_data()
+        return True
     
     def create_widgets(self):
         """Create all UI widgets"""
@@ -129,6 +176,11 @@ class MedicalRAGApp:
         
         # Status bar
         self.status_label = create_status_bar(self.root, self.text_color)
+        
+        # Loading progress (shown only while a background load is running)
+        self.progress_frame, self.progress_label, self.progress_bar = create_progress_panel(
+            self.root, self.text_color, self.cancel_loading
+        )
     
     def create_chat_section(self, parent):
         """Create the chat input section"""
@@ -185,7 +237,7 @@ class MedicalRAGApp:
         self.search_entry.bind('<FocusIn>', on_focus_in)
         self.search_entry.bind('<FocusOut>', on_focus_out)
         
-        ask_btn = tk.Button(
+        self.ask_btn = tk.Button(
             input_frame,
             text="🔍 Ask",
             command=self.search,
@@ -196,7 +248,7 @@ class MedicalRAGApp:
             cursor="hand2",
             padx=20
         )
-        ask_btn.pack(side=tk.LEFT, padx=(5, 0))
+        self.ask_btn.pack(side=tk.LEFT, padx=(5, 0))
         
         # Quick category buttons
         tk.Label(
@@ -306,7 +358,7 @@ class MedicalRAGApp:
                 txt_json_folder = folder_path / "txt_json"
                 
                 # Check if current folder has JSON files
-                json_files = list(folder_path.glob("*.json"))
+                json_files = [f for f in folder_path.iterdir() if f.name.lower().endswith(JSON_EXTENSIONS)]
                 
                 if json_files:
                     # Current folder has JSON files - use it
@@ -378,43 +430,59 @@ class MedicalRAGApp:
                 self.show_no_folder_message()
                 return
         
-        # Convert PDFs
+        # Convert PDFs in the background, then load the results
         self.update_status("Converting PDF files...")
         self.results_text.delete(1.0, tk.END)
         self.results_text.insert(tk.END, "🔄 Converting PDF files to JSON...\n\n")
-        self.root.update()
+        self.start_background_task(self._convert_worker, pdf_folder)
+    
+    def _convert_worker(self, pdf_folder, results_queue, cancel_event):
+        """Worker thread: convert PDFs (never touches Tk widgets)"""
+        def on_progress(done, total, name):
+            results_queue.put(('progress', "Converting", done, total, name, None))
         
         try:
             # Create txt_json subfolder inside the PDF folder
             output_folder = Path(pdf_folder) / "txt_json"
             
-            # Convert PDFs
-            num_converted, output_path, errors = convert_pdfs_to_json(pdf_folder, output_folder)
-            
-            # Show results
-            result_msg = f"✅ Conversion Complete!\n\n"
-            result_msg += f"Converted {num_converted} PDF file(s)\n"
-            result_msg += f"Output folder: {output_path}\n\n"
-            
-            if errors:
-                result_msg += f"⚠️ Warnings ({len(errors)}):\n"
-                for error in errors[:5]:  # Show first 5 errors
-                    result_msg += f"  • {error}\n"
-                if len(errors) > 5:
-                    result_msg += f"  • ... and {len(errors) - 5} more\n"
-            
-            messagebox.showinfo("Conversion Complete", result_msg)
-            
-            # Now load from the txt_json subfolder
-            self.data_folder = str(output_path)
-            self.load_data()
-            
-        except Exception as e:
-            messagebox.showerror(
-                "Conversion Error",
-                f"Error converting PDFs:\n\n{str(e)}"
+            stats = {}
+            num_converted, output_path, errors = convert_pdfs_to_json(
+                pdf_folder, output_folder, on_progress, cancel_event, workers=CONVERT_WORKERS,
+                stats=stats, streaming=STREAM_PDF_TEXT, time_budget=PARSE_TIME_BUDGET,
+                timeout=EXTRACT_TIMEOUT, memory_limit_mb=EXTRACT_MEMORY_LIMIT_MB,
+                adaptive=ADAPTIVE_EXTRACTION, compression=COMPRESS_OUTPUTS
             )
-            self.show_no_folder_message()
+            if cancel_event.is_set():
+                results_queue.put(('cancelled',))
+            else:
+                results_queue.put(('converted', num_converted, output_path, errors, stats))
+        except Exception as e:
+            results_queue.put(('convert_error', e))
+    
+    def on_pdfs_converted(self, num_converted, output_path, errors, stats=None):
+        """Show conversion results and start loading the converted files"""
+        stats = stats or {}
+        result_msg = f"✅ Conversion Complete!\n\n"
+        result_msg += f"Converted {num_converted} PDF file(s)\n"
+        if stats.get('unchanged'):
+            result_msg += f"Skipped {stats['unchanged']} unchanged PDF file(s)\n"
+        if stats.get('seconds_saved') is not None:
+            result_msg += (f"Fast text used for {stats['skipped']} of {stats['pages']} page(s), "
+                           f"about {stats['seconds_saved']:.0f} s saved\n")
+        result_msg += f"Output folder: {output_path}\n\n"
+        
+        if errors:
+            result_msg += f"⚠️ Warnings ({len(errors)}):\n"
+            for error in errors[:5]:  # Show first 5 errors
+                result_msg += f"  • {error}\n"
+            if len(errors) > 5:
+                result_msg += f"  • ... and {len(errors) - 5} more\n"
+        
+        messagebox.showinfo("Conversion Complete", result_msg)
+        
+        # Now load from the txt_json subfolder
+        self.data_folder = str(output_path)
+        self.load_data()
     
     def show_no_folder_message(self):
         """Show message when no folder is selected"""
@@ -439,21 +507,171 @@ To use Medical Health Assistant:
         self.update_status("No folder selected - click '📁 Change Folder' to begin")
     
     def load_data(self):
-        """Load medical data from selected folder"""
+        """Load medical data from selected folder in a background worker"""
         if not self.data_folder:
             self.show_no_folder_message()
             return
             
+        # A full load replaces whatever the watcher would have patched
+        self.stop_watching()
+        
         self.update_status(f"Loading records from {self.data_folder}...")
         self.results_text.delete(1.0, tk.END)
         self.results_text.insert(tk.END, "🔄 Loading your health data...\n\n")
-        self.root.update()
+        self.start_background_task(self._load_worker, self.data_folder)
+    
+    def _load_worker(self, data_folder, results_queue, cancel_event):
+        """Worker thread: parse the data folder (never touches Tk widgets)"""
+        def on_progress(done, total, fname, records):
+            results_queue.put(('progress', "Loading", done, total, fname, records))
         
         try:
-            self.all_tests = load_all_tests(self.data_folder, DEBUG_MODE)
+            record_store = None
+            if USE_RECORD_STORE:
+                record_store = RecordStore(default_store_path(data_folder), PARSER_VERSION)
+            snapshot = open_snapshot(default_snapshot_path(data_folder), data_folder) if USE_SNAPSHOT else None
+            if snapshot is not None:
+                # Unchanged since the last load - nothing to parse
+                if record_store is not None and record_store.folder_manifest() != snapshot.manifest:
+                    # The store is new (just switched on, or its file deleted)
+                    # or out of step with the snapshot - fill it from there
+                    fill_record_store(record_store, snapshot)
+                    record_store.set_folder_manifest(snapshot.manifest)
+                results_queue.put(('loaded', snapshot, snapshot.build_text_index(), record_store, None))
+                return
+            
+            # Taken before parsing, so a file changed mid-load makes the snapshot stale
+            manifest = folder_manifest(data_folder) if USE_SNAPSHOT else None
+            text_index = FullTextIndex()
+            if LAZY_LOAD:
+                # Only the manifest now; records are parsed as tests are opened
+                all_tests = LazyTests(
+                    data_folder, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS,
+                    text_index=text_index, time_budget=PARSE_TIME_BUDGET,
+                    record_store=record_store
+                )
+                all_tests.scan(progress_callback=on_progress, cancel_event=cancel_event)
+            else:
+                all_tests = load_all_tests(
+                    data_folder, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS,
+                    progress_callback=on_progress, cancel_event=cancel_event,
+                    text_index=text_index, time_budget=PARSE_TIME_BUDGET,
+                    record_store=record_store
+                )
+            if cancel_event.is_set():
+                if record_store is not None:
+                    record_store.close()
+                results_queue.put(('cancelled',))
+            else:
+                results_queue.put(('loaded', all_tests, text_index, record_store, manifest))
+        except Exception as e:
+            if record_store is not None:
+                record_store.close()
+            results_queue.put(('load_error', e))
+    
+    def start_background_task(self, worker, *args):
+        """Run worker(*args, results_queue, cancel_event) in a thread and poll its queue"""
+        if self.task_running:
+            self.update_status("⏳ Still busy - please wait or press Cancel")
+            return
+        
+        self.task_running = True
+        self.load_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.set_search_enabled(False)
+        
+        self.progress_label.config(text="Starting...")
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        worker_thread = threading.Thread(
+            target=worker, args=args + (self.load_queue, self.cancel_event), daemon=True
+        )
+        worker_thread.start()
+        self.root.after(100, self.poll_load_queue)
+    
+    def poll_load_queue(self):
+        """Drain worker messages on the Tk main thread"""
+        latest_progress = None
+        try:
+            while True:
+                message = self.load_queue.get_nowait()
+                if message[0] == 'progress':
+                    # Only the newest progress update matters for display
+                    latest_progress = message
+                    continue
+                
+                self.task_running = False
+                self.progress_frame.pack_forget()
+                self.handle_worker_result(message)
+                return
+        except queue.Empty:
+            pass
+        
+        if latest_progress:
+            _, action, done, total, name, records = latest_progress
+            text = f"{action} {done}/{total} files"
+            if name:
+                text += f"  •  {name}"
+            if records is not None:
+                text += f"  •  {records:,} records so far"
+            self.progress_label.config(text=text)
+            self.progress_bar.config(maximum=max(total, 1), value=done)
+        
+        self.root.after(100, self.poll_load_queue)
+    
+    def handle_worker_result(self, message):
+        """React to the final message of a background task"""
+        kind = message[0]
+        
+        if kind == 'loaded':
+            self.on_data_loaded(*message[1:])
+        elif kind == 'converted':
+            self.on_pdfs_converted(*message[1:])
+        elif kind == 'cancelled':
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(tk.END, "⏹ Loading cancelled.\n\nClick '📁 Change Folder' to start again.\n")
+            self.update_status("Loading cancelled")
+            # Previously loaded data (if any) is still valid
+            self.set_search_enabled(bool(self.test_names))
+        elif kind == 'convert_error':
+            messagebox.showerror(
+                "Conversion Error",
+                f"Error converting PDFs:\n\n{str(message[1])}"
+            )
+            self.show_no_folder_message()
+            self.set_search_enabled(bool(self.test_names))
+        elif kind == 'load_error':
+            self.on_load_error(message[1])
+            self.set_search_enabled(bool(self.test_names))
+    
+    def cancel_loading(self):
+        """Ask the running background task to stop"""
+        if self.task_running:
+            self.cancel_event.set()
+            self.progress_label.config(text="Cancelling...")
+            self.update_status("Cancelling - finishing the current file...")
+    
+    def set_search_enabled(self, enabled):
+        """Lock or unlock the search box while data is loading"""
+        state = tk.NORMAL if enabled else tk.DISABLED
+        self.search_entry.config(state=state)
+        self.ask_btn.config(state=state)
+    
+    def on_data_loaded(self, all_tests, text_index, record_store=None, manifest=None):
+        """Build the abnormal panel and welcome message once data is ready"""
+        try:
+            self.close_snapshot(all_tests)
+            self.all_tests = all_tests
+            self.text_index = text_index
+            if self.record_store is not None:
+                self.record_store.close()
+            self.record_store = record_store
             self.test_names = sorted(self.all_tests.keys())
+            self.name_index = TestNameIndex(self.test_names)
+            self.series_store = SeriesStore(self.all_tests)
             
-            total_entries = sum(len(v) for v in self.all_tests.values())
+            entries_total = total_entries(self.all_tests)
             
             # Initialize abnormal tests manager
             self.abnormal_manager = AbnormalTestsManager(
@@ -461,14 +679,28 @@ To use Medical Health Assistant:
                 self.button_bg,
                 self.text_color,
                 self.all_tests,
-                self.test_names
+                self.test_names,
+                self.series_store
             )
             
-            # Find abnormal tests and create buttons
-            self.abnormal_manager.find_abnormal_tests()
-            self.abnormal_manager.create_buttons(self.show_abnormal_test)
+            if self.fill_cancel is not None:
+                self.fill_cancel.set()
+            if isinstance(self.all_tests, LazyTests) and not self.all_tests.is_fully_loaded():
+                # Checking every test needs every file - do it off the Tk thread
+                abnormal_line = "abnormal results are being checked in the background"
+                self.start_abnormal_fill(manifest)
+            else:
+                # Find abnormal tests (a snapshot already lists them) and create buttons
+                known_abnormal = self.all_tests.abnormal_tests if isinstance(self.all_tests, SnapshotTests) else None
+                self.abnormal_manager.find_abnormal_tests(known_abnormal)
+                self.abnormal_manager.create_buttons(self.show_abnormal_test)
+                abnormal_line = f"{self.abnormal_manager.get_abnormal_count()} tests with abnormal results"
+                self.save_snapshot(manifest)
             
-            abnormal_count = self.abnormal_manager.get_abnormal_count()
+            if REOPEN_LAST_FOLDER:
+                remember_last_folder(self.data_folder)
+            if WATCH_FOLDER:
+                self.start_watching()
             
             welcome_msg = f"""
 {'='*60}
@@ -481,8 +713,8 @@ Great news! I've successfully loaded your medical records.
 
 📊 Here's what I found:
    • {len(self.test_names)} different types of health records
-   • {total_entries} total test results and medical entries
-   • {abnormal_count} tests with abnormal results
+   • {entries_total} total test results and medical entries
+   • {abnormal_line}
 
 🤔 What would you like to know today?
 
@@ -507,16 +739,202 @@ Just type what you're curious about and I'll find it for you. 😊
             self.results_text.insert(tk.END, welcome_msg)
             self.update_status(f"✓ Ready! {len(self.test_names)} health records loaded from {os.path.basename(self.data_folder)}")
             
+            self.set_search_enabled(True)
+            
         except Exception as e:
-            error_msg = f"😟 Oops! I had trouble loading your health data.\n\n"
-            error_msg += f"Error details: {e}\n\n"
-            error_msg += f"Folder: {self.data_folder}\n\n"
-            error_msg += "Please make sure your folder contains valid JSON files.\n\n"
-            error_msg += "Click '📁 Change Folder' to select a different folder."
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, error_msg)
-            self.update_status("❌ Error loading health data")
-            messagebox.showerror("Loading Error", f"I couldn't load your health records.\n\n{e}\n\nPlease select a different folder.")
+            self.on_load_error(e)
+    
+    def close_snapshot(self, all_tests):
+        """Unmap the snapshot being replaced by all_tests, so a new one can be written over it"""
+        if isinstance(self.all_tests, SnapshotTests) and self.all_tests is not all_tests:
+            self.all_tests.close()
+    
+    def save_snapshot(self, manifest):
+        """Write the loaded state to the folder's snapshot in the background"""
+        if manifest is None:
+            return
+        if self.record_store is not None:
+            # Holds the same records, so the next start can skip fill_record_store
+            self.record_store.set_folder_manifest(manifest)
+        # The watcher may patch all_tests while the snapshot is written
+        all_tests = {name: list(entries) for name, entries in self.all_tests.items()}
+        threading.Thread(
+            target=write_snapshot,
+            args=(default_snapshot_path(self.data_folder), self.data_folder, all_tests,
+                  self.text_index, list(self.abnormal_manager.abnormal_tests), manifest),
+            daemon=True
+        ).start()
+    
+    def start_watching(self):
+        """Watch the data folder (and the PDF folder above a txt_json folder) for changes"""
+        self.stop_watching()
+        folders = [self.data_folder]
+        if os.path.basename(os.path.normpath(self.data_folder)) == "txt_json":
+            folders.append(os.path.dirname(os.path.normpath(self.data_folder)))
+        
+        folder = self.data_folder
+        self.watcher = FolderWatcher(
+            folders, lambda *batch: self.watch_changes.put((folder, batch)), WATCH_INTERVAL
+        )
+        self.watcher.start()
+        self.root.after(500, self._poll_watch, self.watcher)
+    
+    def stop_watching(self):
+        """Stop the folder watcher, if any"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _poll_watch(self, watcher):
+        """Start a reload for reported changes and apply finished reloads (Tk thread)"""
+        if watcher is not self.watcher:
+            return
+        self.root.after(500, self._poll_watch, watcher)
+        
+        try:
+            while True:
+                self.apply_reload(*self.watch_results.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if self.reload_running or self.task_running:
+            return
+        batches = []
+        while not self.watch_changes.empty():
+            folder, batch = self.watch_changes.get()
+            if folder == self.data_folder:
+                batches.append(batch)
+        if not batches:
+            return
+        
+        to_reload, removed = collapse_changes(batches)
+        self.reload_running = True
+        self.update_status(f"↻ Updating {len(to_reload) + len(removed)} changed file(s)...")
+        threading.Thread(
+            target=self._reload_worker,
+            args=(watcher, self.data_folder, self.all_tests, to_reload, removed),
+            daemon=True
+        ).start()
+    
+    def _reload_worker(self, watcher, data_folder, all_tests, to_reload, removed):
+        """Worker thread: convert changed PDFs and parse changed JSON files (never touches Tk widgets)"""
+        try:
+            # New JSON written here is reported by the watcher and loaded next round
+            # (PDFs inside a changed .zip are converted too)
+            for path in expand_paths(to_reload, ('.pdf',)):
+                error = convert_pdf_file(path, data_folder, STREAM_PDF_TEXT, PARSE_TIME_BUDGET,
+                                         EXTRACT_TIMEOUT, EXTRACT_MEMORY_LIMIT_MB, ADAPTIVE_EXTRACTION,
+                                         COMPRESS_OUTPUTS)
+                if error:
+                    print(f"✗ {error}")
+            for path in removed:
+                if path.lower().endswith(('.pdf', '.zip')):
+                    remove_converted_files(path, data_folder)
+            
+            def in_data_folder(path):
+                return os.path.dirname(path) == os.path.normpath(data_folder)
+            
+            data_extensions = JSON_EXTENSIONS + ('.zip',)
+            json_paths = [path for path in to_reload if path.lower().endswith(data_extensions) and in_data_folder(path)]
+            json_removed = [path for path in removed if path.lower().endswith(data_extensions) and in_data_folder(path)]
+            manifest = folder_manifest(data_folder) if USE_SNAPSHOT else None
+            if not isinstance(all_tests, dict):
+                # Patching needs a plain dict; this loads whatever is still lazy
+                # or reads every record out of the snapshot
+                print("↻ Loading the remaining files before applying the changes...")
+                all_tests = dict(all_tests.items())
+            json_paths, json_removed = expand_archive_changes(all_tests, json_paths, json_removed)
+            loaded = load_changed_files(json_paths, data_folder, DEBUG_MODE, USE_PARSE_CACHE,
+                                        LOAD_WORKERS, PARSE_TIME_BUDGET)
+            self.watch_results.put((watcher, all_tests, loaded, json_removed, manifest))
+        except Exception as e:
+            print(f"Reload failed: {e}")
+            self.watch_results.put((watcher, None, [], [], None))
+    
+    def apply_reload(self, watcher, all_tests, loaded, removed, manifest):
+        """Patch the loaded data with reparsed files; the current view stays as it is"""
+        self.reload_running = False
+        # Dropped if a full load (with its own watcher) happened meanwhile
+        if all_tests is None or watcher is not self.watcher:
+            return
+        if not loaded and not removed:
+            self.update_status("✓ Ready")
+            return
+        
+        if all_tests is not self.all_tests:
+            # A lazy or snapshot mapping was turned into a plain dict
+            self.close_snapshot(all_tests)
+            self.all_tests = all_tests
+            self.series_store = SeriesStore(self.all_tests)
+        changed = apply_file_changes(self.all_tests, loaded, removed, DEBUG_MODE,
+                                     self.text_index, self.record_store)
+        for test_name in changed:
+            self.series_store.invalidate(test_name)
+        self.test_names = sorted(self.all_tests.keys())
+        self.name_index = TestNameIndex(self.test_names)
+        
+        self.abnormal_manager.all_tests = self.all_tests
+        self.abnormal_manager.test_names = self.test_names
+        self.abnormal_manager.series_store = self.series_store
+        self.abnormal_manager.find_abnormal_tests()
+        self.abnormal_manager.create_buttons(self.show_abnormal_test)
+        self.save_snapshot(manifest)
+        
+        self.update_status(f"↻ Updated {len(loaded) + len(removed)} file(s) - {len(self.test_names)} health records")
+    
+    def start_abnormal_fill(self, manifest=None):
+        """Lazy mode: load the remaining files in a thread, then fill the abnormal panel"""
+        for widget in self.abnormal_buttons_frame.winfo_children():
+            widget.destroy()
+        tk.Label(
+            self.abnormal_buttons_frame,
+            text="⏳ Checking your results...",
+            bg="white",
+            font=("Arial", 10),
+        ).pack(pady=20)
+        
+        self.fill_cancel = threading.Event()
+        done = threading.Event()
+        threading.Thread(
+            target=self._abnormal_fill_worker, args=(self.all_tests, self.fill_cancel, done), daemon=True
+        ).start()
+        self.root.after(200, self._poll_abnormal_fill, self.all_tests, self.fill_cancel, done, manifest)
+    
+    def _abnormal_fill_worker(self, all_tests, cancel_event, done):
+        """Worker thread: parse every file not loaded yet (never touches Tk widgets)"""
+        try:
+            all_tests.load_all(cancel_event=cancel_event)
+        except Exception as e:
+            print(f"Background load failed: {e}")
+        finally:
+            done.set()
+    
+    def _poll_abnormal_fill(self, all_tests, cancel_event, done, manifest=None):
+        """Build the abnormal panel once the background load has finished"""
+        if not done.is_set():
+            self.root.after(200, self._poll_abnormal_fill, all_tests, cancel_event, done, manifest)
+            return
+        # Another folder was loaded in the meantime
+        if cancel_event.is_set() or all_tests is not self.all_tests:
+            return
+        
+        self.abnormal_manager.find_abnormal_tests()
+        self.abnormal_manager.create_buttons(self.show_abnormal_test)
+        self.update_status(f"✓ Abnormal panel ready - {self.abnormal_manager.get_abnormal_count()} tests with abnormal results")
+        if all_tests.is_fully_loaded():
+            self.save_snapshot(manifest)
+    
+    def on_load_error(self, e):
+        """Show a friendly message when loading fails"""
+        error_msg = f"😟 Oops! I had trouble loading your health data.\n\n"
+        error_msg += f"Error details: {e}\n\n"
+        error_msg += f"Folder: {self.data_folder}\n\n"
+        error_msg += "Please make sure your folder contains valid JSON files.\n\n"
+        error_msg += "Click '📁 Change Folder' to select a different folder."
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, error_msg)
+        self.update_status("❌ Error loading health data")
+        messagebox.showerror("Loading Error", f"I couldn't load your health records.\n\n{e}\n\nPlease select a different folder.")
     
     def show_abnormal_test(self, test_name):
         """Show specific abnormal test details and chart"""
@@ -524,7 +942,7 @@ Just type what you're curious about and I'll find it for you. 😊
         
         # Show chart first
         if can_visualize(self.all_tests[test_name]):
-            self.chart_manager.show_chart(test_name, self.all_tests[test_name])
+            self.chart_manager.show_chart(test_name, self.all_tests[test_name], self.series_store.get(test_name))
         
         # Show results in text area
         self.results_text.delete(1.0, tk.END)
@@ -563,13 +981,25 @@ Just type what you're curious about and I'll find it for you. 😊
             self.results_text.insert(tk.END, "Hmm, I don't have any health records loaded yet. Please check your data folder.")
             return
         
-        matches = find_test(query, self.test_names)
+        if 'abnormal' in query.lower():
+            self.show_abnormal_results(query)
+            return
+        
+        # None when no test name matches
+        matches = find_test(query, self.name_index) or []
+        # Procedure and note narratives mentioning the query ("polyp" is in a
+        # colonoscopy report even when a record name like Polypectomy matches)
+        hits = self.text_index.search(query, exclude_tests=matches)
         
         if matches:
             if len(matches) == 1:
                 self.show_single_match(matches[0])
             else:
                 self.show_multiple_matches(matches, query)
+            if hits:
+                self.show_text_matches(hits, query, below_matches=True)
+        elif hits:
+            self.show_text_matches(hits, query)
         else:
             self.show_no_matches(query)
     
@@ -589,7 +1019,7 @@ Just type what you're curious about and I'll find it for you. 😊
         self.update_status(f"✓ Found your {test_name} results!")
         
         if can_visualize(self.all_tests[test_name]):
-            self.chart_manager.show_chart(test_name, self.all_tests[test_name])
+            self.chart_manager.show_chart(test_name, self.all_tests[test_name], self.series_store.get(test_name))
     
     def show_multiple_matches(self, matches, query):
         """Display results for multiple matching tests"""
@@ -601,7 +1031,7 @@ Just type what you're curious about and I'll find it for you. 😊
             result += f"{'='*50}\n"
             result += f"📊 {test_name}\n"
             result += f"{'='*50}\n"
-            result += format_results(self.all_tests[test_name])
+            result += format_results(self.all_tests[test_name], self.series_store.get(test_name))
             result += "\n\n"
         
         result += f"\n💡 Tip: Try searching for a specific test name to see the trend chart!\n"
@@ -609,6 +1039,34 @@ Just type what you're curious about and I'll find it for you. 😊
         self.results_text.insert(tk.END, result)
         self.update_status(f"✓ Found {len(matches)} matches for you!")
     
+    def show_abnormal_results(self, query):
+        """Display abnormal results, e.g. for 'abnormal since 2022'"""
+        since = query_since(query)
+        header = f"{'='*60}\n"
+        header += "⚠️ Results outside the normal range"
+        header += f" (from {since} on):\n" if since else ":\n"
+        header += f"{'='*60}\n\n"
+        
+        self.results_text.insert(tk.END, header)
+        self.results_text.insert(tk.END, format_abnormal_tests(self.all_tests, self.record_store, since))
+        self.update_status("✓ Abnormal results listed")
+    
+    def show_text_matches(self, hits, query, below_matches=False):
+        """Display procedures and notes whose narrative mentions the query (below_matches: after the name matches)"""
+        result = "\n" if below_matches else ""
+        result += f"{'='*60}\n"
+        if below_matches:
+            result += f"📝 '{query}' is also mentioned in these procedure reports and notes:\n"
+        else:
+            result += f"📝 I found '{query}' in your procedure reports and notes:\n"
+        result += f"{'='*60}\n\n"
+        result += format_text_matches(hits, query)
+        result += "\n"
+        
+        self.results_text.insert(tk.END, result)
+        if not below_matches:
+            self.update_status(f"✓ Found {len(hits)} notes and procedures mentioning '{query}'")
+    
     def show_no_matches(self, query):
         """Display message when no matches are found"""
         result = f"🤔 Hmm, I couldn't find any records matching '{query}'.\n\n"
@@ -633,7 +1091,7 @@ Just type what you're curious about and I'll find it for you. 😊
         result += "Here's everything I have for you:\n\n"
         
         for i, name in enumerate(self.test_names, 1):
-            count = len(self.all_tests[name])
+            count = entry_count(self.all_tests, name)
             result += f"{i:3d}. 📊 {name} ({count} entries)\n"
         
         result += f"\n💡 Click on any test name above, or just type it in the search box!\n"
@@ -669,7 +1127,7 @@ Just type what you're curious about and I'll find it for you. 😊
             result += "Here are all your blood tests:\n\n"
             
             for i, name in enumerate(sorted(blood_tests), 1):
-                count = len(self.all_tests[name])
+                count = entry_count(self.all_tests, name)
                 result += f"{i:3d}. 💉 {name} ({count} entries)\n"
             
             result += f"\n💡 Want to see details? Just search for any test name above!\n"
@@ -701,7 +1159,7 @@ Just type what you're curious about and I'll find it for you. 😊
         
         all_matches = set()
         for keyword in keywords:
-            matches = find_test(keyword, self.test_names)
+            matches = find_test(keyword, self.name_index)
             if matches:
                 all_matches.update(matches)
         
@@ -714,7 +1172,7 @@ Just type what you're curious about and I'll find it for you. 😊
                 result += f"{'='*50}\n"
                 result += f"📊 {test_name}\n"
                 result += f"{'='*50}\n"
-                result += format_results(self.all_tests[test_name])
+                result += format_results(self.all_tests[test_name], self.series_store.get(test_name))
                 result += "\n\n"
             
             result += f"\n💡 Tip: Search for a specific test name to see the trend chart!\n"
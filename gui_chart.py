@@ -3,13 +3,17 @@ Medical RAG GUI - Chart Management
 Handles all chart creation and display logic
 """
 import re
-from datetime import datetime
+
+import numpy as np
 
 import matplotlib
 matplotlib.use('TkAgg')
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from records import as_record
+from reference_range import parse_reference_range
+
 
 class ChartManager:
     """Manages chart creation and display"""
@@ -22,8 +26,12 @@ class ChartManager:
         """Hide the chart frame"""
         self.chart_frame.pack_forget()
     
-    def show_chart(self, test_name, results):
-        """Display trend chart for numeric results"""
+    def show_chart(self, test_name, results, series=None):
+        """Display trend chart for numeric results
+        
+        series (a series.TestSeries for the same results) supplies the dates
+        and values as arrays when every entry is numeric.
+        """
         try:
             # Clear any existing chart content
             for widget in self.chart_frame.winfo_children():
@@ -48,42 +56,34 @@ class ChartManager:
                 if 'Reference Range' in first_entry:
                     range_str = str(first_entry['Reference Range'])
                     print(f"Found 'Reference Range': '{range_str}'")
-                    match = re.search(r'(\d+\.?\d*)\s*-\s*(\d+\.?\d*)', range_str)
-                    if match:
-                        normal_min = float(match.group(1))
-                        normal_max = float(match.group(2))
+                    parsed_range = parse_reference_range(range_str)
+                    if parsed_range.low is not None and parsed_range.high is not None:
+                        normal_min = parsed_range.low
+                        normal_max = parsed_range.high
                         print(f"✓ Parsed range: {normal_min} to {normal_max}")
             
-            # Extract values and dates
-            for idx, entry in enumerate(results):
-                if not isinstance(entry, dict):
-                    continue
-                
-                # Find date
-                date_str = entry.get('Date') or entry.get('date')
-                # Find value  
-                value_raw = entry.get('Value') or entry.get('value')
-                
-                if date_str and value_raw:
-                    try:
-                        # Parse date
-                        date_obj = None
-                        for fmt in ['%m/%d/%Y', '%Y-%m-%d', '%Y/%m/%d']:
-                            try:
-                                date_obj = datetime.strptime(str(date_str), fmt)
-                                break
-                            except:
-                                pass
-                        
-                        if date_obj:
-                            # Parse value
-                            value_str = str(value_raw).replace('<', '').replace('>', '').strip()
-                            match = re.search(r'\d+\.?\d*', value_str)
+            # Extract values and dates (parsed once when the record was loaded)
+            if series is not None and len(series) == len(results) and not np.isnan(series.values).any():
+                rows = np.flatnonzero(series.dates > 0)
+                data_points = list(zip(map(series.date_at, rows), series.values[rows].tolist()))
+            else:
+                for idx, entry in enumerate(results):
+                    if not isinstance(entry, dict):
+                        continue
+                    
+                    record = as_record(entry)
+                    date_obj = record.date
+                    # Find value  
+                    value_raw = record.get('Value') or record.get('value')
+                    
+                    if date_obj and value_raw:
+                        if record.numeric_value is not None:
+                            data_points.append((date_obj, record.numeric_value))
+                        else:
+                            # Values like "120/80" or "5.2 H": chart the leading number
+                            match = re.search(r'\d+\.?\d*', str(value_raw))
                             if match:
-                                value = float(match.group())
-                                data_points.append((date_obj, value))
-                    except:
-                        pass
+                                data_points.append((date_obj, float(match.group())))
             
             print(f"Extracted {len(data_points)} data points")
             print(f"Normal range: {normal_min} - {normal_max}")
@@ -3,7 +3,7 @@ Medical RAG GUI - UI Widget Creation Functions
 Contains all the UI widget creation logic
 """
 import tkinter as tk
-from tkinter import scrolledtext
+from tkinter import scrolledtext, ttk
 
 
 def create_header(root, accent_color, title="Medical Health Assistant"):
@@ -295,4 +295,42 @@ def create_status_bar(root, text_color):
     )
     status_label.pack(fill=tk.BOTH, padx=10)
     
-    return status_label
\ No newline at end of file
+    return status_label
+
+
+def create_progress_panel(root, text_color, cancel_callback):
+    """Create the (initially hidden) loading progress panel with a Cancel button
+
+    Returns:
+        tuple: (panel_frame, progress_label, progress_bar)
+    """
+    panel_frame = tk.Frame(root, bg="#e0e0e0", height=34)
+    panel_frame.pack_propagate(False)
+    
+    cancel_btn = tk.Button(
+        panel_frame,
+        text="✖ Cancel",
+        command=cancel_callback,
+        bg="white",
+        fg=text_color,
+        font=("Arial", 9, "bold"),
+        relief=tk.FLAT,
+        cursor="hand2",
+        padx=10
+    )
+    cancel_btn.pack(side=tk.RIGHT, padx=10, pady=4)
+    
+    progress_bar = ttk.Progressbar(panel_frame, orient=tk.HORIZONTAL, mode="determinate", length=250)
+    progress_bar.pack(side=tk.RIGHT, padx=(10, 0), pady=8)
+    
+    progress_label = tk.Label(
+        panel_frame,
+        text="",
+        bg="#e0e0e0",
+        fg=text_color,
+        font=("Arial", 9),
+        anchor=tk.W
+    )
+    progress_label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10)
+    
+    return panel_frame, progress_label, progress_bar
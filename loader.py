@@ -3,87 +3,819 @@ loader.py - Load and parse JSON test result files
 """
 import os
 import json
-from parsers import parse_labcorp_tests, parse_kaiser_tests
+import time
+import threading
+import traceback
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from parsers import parse_labcorp_tests, parse_kaiser_tests, PARSER_VERSION
 from medical_parsers import parse_all_medical_records
 from normalizer import normalize_name
+from records import Record
+from parse_cache import ParseCache, default_cache_folder, folder_key, file_fingerprint, content_hash
+from archives import is_archive, list_members, read_data_file, close_archives, JSON_EXTENSIONS
 
-def load_all_tests(results_folder, debug_mode=False):
-    """Load and parse all JSON files from the results folder"""
-    all_results = {}
-    
+# Record types that keep their original name instead of being normalized
+MEDICAL_RECORD_TYPES = ['Vital Sign', 'Medication', 'Immunization', 'Problem', 'Procedure']
+
+# Files read and decoded ahead of the one being parsed when loading serially
+# (0 = no read-ahead), and the threads reading them
+PREFETCH_FILES = 4
+READ_THREADS = 2
+
+
+def parse_text(text, debug_mode=False, time_budget=None):
+    """Detect the format of a document and run the matching parsers
+
+    time_budget (seconds) limits the medical record parsers; a document that
+    runs past it raises medical_parsers.ParseTimeoutError.
+
+    Returns:
+        tuple: (file_results, record_types)
+    """
+    file_results = {}
+    record_types = []
+
+    # Check if it's LabCorp format
+    if 'Laboratory Corporation of America' in text or 'LabCorp' in text or 'Date Collected:' in text:
+        file_results = parse_labcorp_tests(text, debug_mode)
+        if file_results:
+            record_types.append('Lab Tests')
+
+    # Check if it's Kaiser format
+    if 'Kaiser Permanente' in text or 'Final result' in text:
+        # Parse lab tests
+        lab_results = parse_kaiser_tests(text, debug_mode)
+        file_results.update(lab_results)
+        if lab_results:
+            record_types.append('Lab Tests')
+
+        # Parse other medical records (vital signs, immunizations, etc.)
+        medical_results = parse_all_medical_records(text, time_budget)
+        file_results.update(medical_results)
+        if medical_results:
+            # Count types
+            types_found = set(r[0]['Type'] for r in medical_results.values() if r)
+            record_types.extend(types_found)
+
+    return file_results, record_types
+
+
+def _read_document(raw_bytes, path=None):
+    """Decode a JSON export
+
+    Returns:
+        tuple: (text, parsed) - parsed is (file_results, record_types) if the
+        export holds records from this parser version (saved by PDF
+        conversion), and text is then not read; else parsed is None
+    """
+    data = json.loads(raw_bytes.decode('utf-8'))
+
+    records = data.get('records')
+    if isinstance(records, dict) and records.get('parser_version') == PARSER_VERSION:
+        return '', (records.get('results') or {}, records.get('record_types') or [])
+
+    # Try both 'full_text' and 'raw_text' keys
+    text = data.get('full_text', '') or data.get('raw_text', '')
+    if not text and data.get('text_file') and path:
+        # Streamed PDF conversions keep the text in a .txt next to the JSON
+        # (in the same archive, for a JSON inside one)
+        try:
+            text = read_data_file(os.path.join(os.path.dirname(path), data['text_file'])).decode('utf-8')
+        except OSError:
+            text = ''
+    return text, None
+
+
+def _read_file(path, cache):
+    """The I/O half of loading a file: cache lookups, reading (and
+    decompressing) the file and decoding the JSON
+
+    Returns:
+        tuple: (cached, document, stamp) - cached is the load result
+        (file_results, record_types, has_text, True) on a cache hit, else
+        None; document is _read_document()'s (text, parsed) and stamp the
+        (size, mtime_ns, sha256) to store the parsed results under
+    """
+    size, mtime_ns = file_fingerprint(path) if cache else (None, None)
+
+    if cache:
+        entry = cache.lookup(path, size, mtime_ns)
+        if entry:
+            return (entry['results'], entry['record_types'], entry['has_text'], True), None, None
+
+    # Archive members are decompressed in memory, never written out
+    raw_bytes = read_data_file(path)
+
+    sha256 = None
+    if cache:
+        sha256 = content_hash(raw_bytes)
+        entry = cache.lookup_by_hash(path, size, mtime_ns, sha256)
+        if entry:
+            return (entry['results'], entry['record_types'], entry['has_text'], True), None, None
+
+    return None, _read_document(raw_bytes, path), (size, mtime_ns, sha256)
+
+
+def _parse_file(path, cache, document, stamp, debug_mode=False, time_budget=None):
+    """The CPU half of loading a file: parse a document read by _read_file (and cache the results)
+
+    Returns:
+        tuple: (file_results, record_types, has_text, from_cache)
+    """
+    text, parsed = document
+    has_text = bool(text) or parsed is not None
+    if parsed is not None:
+        # Parsed when the PDF was converted - nothing to do
+        file_results, record_types = parsed
+    elif text:
+        file_results, record_types = parse_text(text, debug_mode, time_budget)
+    else:
+        file_results, record_types = {}, []
+
+    if cache:
+        size, mtime_ns, sha256 = stamp
+        cache.store(path, size, mtime_ns, sha256, file_results, record_types, has_text=has_text)
+
+    return file_results, record_types, has_text, False
+
+
+def _error_message(e, debug_mode=False):
+    return f"{e}\n{traceback.format_exc()}" if debug_mode else str(e)
+
+
+def _load_file_task(path, cache_folder, debug_mode=False, time_budget=None):
+    """Load one file and report failures instead of raising (also the process pool entry point)
+
+    Returns:
+        tuple: (load_result, read_seconds, parse_seconds) - load_result is
+        (file_results, record_types, has_text, from_cache, error)
+    """
+    read_seconds = parse_seconds = 0.0
+    try:
+        start = time.perf_counter()
+        cache = ParseCache(cache_folder, PARSER_VERSION) if cache_folder else None
+        cached, document, stamp = _read_file(path, cache)
+        read_seconds = time.perf_counter() - start
+        if cached is not None:
+            return cached + (None,), read_seconds, parse_seconds
+        start = time.perf_counter()
+        result = _parse_file(path, cache, document, stamp, debug_mode, time_budget) + (None,)
+        parse_seconds = time.perf_counter() - start
+        return result, read_seconds, parse_seconds
+    except Exception as e:
+        return ({}, [], False, False, _error_message(e, debug_mode)), read_seconds, parse_seconds
+
+
+def _read_file_task(path, cache):
+    """_read_file in a reader thread, reporting failures instead of raising
+
+    Returns:
+        tuple: ((cached, document, stamp) or None, error, read_seconds)
+    """
+    start = time.perf_counter()
+    try:
+        read = _read_file(path, cache)
+        error = None
+    except Exception as e:
+        read, error = None, e
+    return read, error, time.perf_counter() - start
+
+
+def _new_load_times():
+    """
+    Counters _iter_loaded_files adds to: seconds spent reading files (cache
+    lookups, reading, decompressing and decoding JSON) and parsing them, and
+    - when reading ahead - seconds parsing had to wait for a read
+    """
+    return {'read': 0.0, 'parse': 0.0, 'waited': None}
+
+
+def _format_load_times(times):
+    line = f"Load time: {times['read']:.1f} s reading files, {times['parse']:.1f} s parsing"
+    if times['waited'] is not None:
+        line += f" ({times['waited']:.1f} s waiting for reads)"
+    return line
+
+
+def _iter_loaded_files(paths, cache_folder, debug_mode=False, workers=1, time_budget=None, times=None):
+    """
+    Yield (path, load_result) in the order of paths, parsing in a process pool if workers > 1.
+    If times (see _new_load_times) is given, the time spent reading and parsing is added to it.
+    """
+    if times is None:
+        times = _new_load_times()
+    if workers <= 1 or len(paths) < 2:
+        if PREFETCH_FILES > 0 and len(paths) > 1:
+            yield from _iter_prefetched(paths, cache_folder, debug_mode, time_budget, times)
+            return
+        try:
+            for path in paths:
+                result, read_seconds, parse_seconds = _load_file_task(path, cache_folder, debug_mode, time_budget)
+                times['read'] += read_seconds
+                times['parse'] += parse_seconds
+                yield path, result
+        finally:
+            close_archives()
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Submit everything up front, then collect in submission order so the
+        # merge (and therefore all_tests) is identical to serial mode
+        futures = [executor.submit(_load_file_task, path, cache_folder, debug_mode, time_budget) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                result, read_seconds, parse_seconds = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                yield path, ({}, [], False, False, f"Worker failed - {e}")
+                continue
+            times['read'] += read_seconds
+            times['parse'] += parse_seconds
+            yield path, result
+    finally:
+        # Drop files that have not started yet if the caller stopped early (cancelled load)
+        executor.shutdown(wait=True, cancel_futures=True)
+        close_archives()
+
+
+def _iter_prefetched(paths, cache_folder, debug_mode, time_budget, times):
+    """
+    Serial loading with the reads pipelined: reader threads read and decode
+    up to PREFETCH_FILES files ahead while the current one is parsed, so
+    waiting on a slow disk or network share overlaps with parsing. At most
+    PREFETCH_FILES decoded files are held besides the one being parsed.
+    """
+    cache = ParseCache(cache_folder, PARSER_VERSION) if cache_folder else None
+    times['waited'] = times['waited'] or 0.0
+    executor = ThreadPoolExecutor(max_workers=min(READ_THREADS, PREFETCH_FILES))
+    pending = deque()
+    upcoming = iter(paths)
+
+    def read_ahead():
+        while len(pending) < PREFETCH_FILES:
+            path = next(upcoming, None)
+            if path is None:
+                return
+            pending.append((path, executor.submit(_read_file_task, path, cache)))
+
+    try:
+        read_ahead()
+        while pending:
+            path, future = pending.popleft()
+            start = time.perf_counter()
+            read, error, read_seconds = future.result()
+            times['waited'] += time.perf_counter() - start
+            times['read'] += read_seconds
+            # Start the next read before parsing this file
+            read_ahead()
+
+            if error is not None:
+                yield path, ({}, [], False, False, _error_message(error, debug_mode))
+                continue
+            cached, document, stamp = read
+            if cached is not None:
+                yield path, cached + (None,)
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = _parse_file(path, cache, document, stamp, debug_mode, time_budget) + (None,)
+            except Exception as e:
+                result = ({}, [], False, False, _error_message(e, debug_mode))
+            times['parse'] += time.perf_counter() - start
+            # Let go of the document before the caller merges the results
+            read = document = future = None
+            yield path, result
+    finally:
+        # Stopped early (cancelled load) - don't start the reads still queued
+        executor.shutdown(wait=True, cancel_futures=True)
+        close_archives()
+
+
+def merge_file_results(all_results, file_results, debug_mode=False, source=None):
+    """Merge one file's results into all_results with name normalization
+
+    Entries are stored as records.Record objects (dicts with the date and
+    value already parsed), tagged with the source file path.
+
+    Returns:
+        dict: this file's entries keyed by their normalized name
+    """
+    normalized_results = {}
+    for test_name, entries in file_results.items():
+        # Don't normalize medical record types
+        if entries and entries[0].get('Type') in MEDICAL_RECORD_TYPES:
+            normalized = test_name
+        else:
+            normalized = normalize_name(test_name)
+
+        # Parse dates and values once, here, instead of in every sort and chart
+        entries = [Record(entry, source=source) for entry in entries]
+        
+        if normalized not in all_results:
+            all_results[normalized] = []
+        all_results[normalized].extend(entries)
+        normalized_results.setdefault(normalized, []).extend(entries)
+        if debug_mode:
+            print(f"  {test_name} -> {normalized}")
+
+    return normalized_results
+
+
+def _list_data_files(results_folder):
+    """
+    Paths of the JSON files (plain, .json.gz or .json.zst) in results_folder -
+    and of the JSON files inside its .zip archives, in place of the archive -
+    or [] (with an error printed) if there are none
+    """
     if not os.path.exists(results_folder):
         print(f"ERROR: Folder '{results_folder}' not found!")
-        return all_results
-    
-    json_files = [f for f in os.listdir(results_folder) if f.lower().endswith('.json')]
-    
-    if not json_files:
+        return []
+
+    paths = []
+    for fname in os.listdir(results_folder):
+        path = os.path.join(results_folder, fname)
+        if fname.lower().endswith(JSON_EXTENSIONS):
+            paths.append(path)
+        elif is_archive(fname) and os.path.isfile(path):
+            paths.extend(list_members(path, JSON_EXTENSIONS))
+
+    if not paths:
         print(f"ERROR: No JSON files found in '{results_folder}'")
+        return []
+
+    return paths
+
+
+def _store_file(record_store, path, normalized_results):
+    """Write one file's records to the record store unless it already holds this version"""
+    size, mtime_ns = file_fingerprint(path)
+    if not record_store.is_current(path, size, mtime_ns):
+        record_store.add_file(path, normalized_results, size, mtime_ns)
+
+
+def fill_record_store(record_store, all_tests):
+    """
+    Write the records of an already loaded all_tests (e.g. a snapshot) to
+    record_store file by file - skipping files it holds already - and drop
+    the files all_tests has no records from
+    """
+    by_source = {}
+    for test_name, entries in all_tests.items():
+        for entry in entries:
+            source = getattr(entry, 'source', None)
+            by_source.setdefault(source, {}).setdefault(test_name, []).append(entry)
+    by_source.pop(None, None)
+    for source, file_results in by_source.items():
+        try:
+            _store_file(record_store, source, file_results)
+        except OSError:
+            # Gone since the load - the next full load drops it
+            pass
+    record_store.retain_files(by_source)
+
+
+def load_all_tests(results_folder, debug_mode=False, use_cache=True, workers=1,
+                   progress_callback=None, cancel_event=None, text_index=None,
+                   time_budget=None, record_store=None):
+    """Load and parse all JSON files from the results folder
+
+    When use_cache is set, parsed results are kept in a cache folder next to
+    results_folder and only new or modified files are parsed again.
+
+    With workers > 1 files are parsed in a process pool (workers=0 uses every
+    CPU). Results are merged in file order, so all_tests is the same as in
+    serial mode; a failing file is reported and the rest of the batch continues.
+    Serially, the next PREFETCH_FILES files are read while one is parsed. The
+    time spent reading and parsing is printed at the end.
+
+    progress_callback(files_done, total_files, fname, records_so_far) is called
+    after every file. Setting cancel_event (a threading.Event) stops loading as
+    soon as the current file finishes and returns what was merged so far.
+
+    If text_index (a fulltext.FullTextIndex) is given, the narrative records
+    of each file are added to it as the file is merged.
+
+    time_budget caps the seconds spent parsing any one document; a file that
+    exceeds it is reported as an error and skipped.
+
+    If record_store (a record_store.RecordStore) is given, each file's records
+    are written to it as the file is merged; files whose size and mtime match
+    the stored copy are not rewritten, and files no longer in the folder are
+    dropped once loading completes.
+    """
+    all_results = {}
+
+    paths = _list_data_files(results_folder)
+    if not paths:
         return all_results
-    
-    print(f"Loading {len(json_files)} file(s)...\n")
-    
-    for fname in json_files:
+
+    print(f"Loading {len(paths)} file(s)...\n")
+
+    cache_folder = default_cache_folder(results_folder) if use_cache else None
+    if not workers:
+        workers = os.cpu_count() or 1
+    reused = parsed = 0
+    files_done = records_so_far = 0
+
+    times = _new_load_times()
+    loaded_files = _iter_loaded_files(paths, cache_folder, debug_mode, workers, time_budget, times)
+    for path, (file_results, record_types, has_text, from_cache, error) in loaded_files:
+        fname = os.path.basename(path)
+        files_done += 1
+        if not error and has_text:
+            records_so_far += sum(len(entries) for entries in file_results.values())
+        if progress_callback:
+            progress_callback(files_done, len(paths), fname, records_so_far)
+        if cancel_event is not None and cancel_event.is_set():
+            print("Loading cancelled")
+            loaded_files.close()
+            break
+
+        if error:
+            print(f"✗ {fname}: Error - {error}")
+            if record_store is not None:
+                # Stale rows would outlive the file's current contents
+                record_store.remove_file(path)
+            continue
+
+        if from_cache:
+            reused += 1
+        else:
+            parsed += 1
+
+        if not has_text:
+            print(f"⚠ {fname}: No text content found (missing 'full_text', 'raw_text' or 'text_file' key)")
+            if record_store is not None:
+                record_store.remove_file(path)
+            continue
+
+        if file_results:
+            types_str = ', '.join(record_types) if record_types else 'Unknown'
+            cached_str = ' [cached]' if from_cache else ''
+            print(f"✓ {fname}: {len(file_results)} items ({types_str}){cached_str}")
+
+            # Merge into all_results with normalization
+            normalized_results = merge_file_results(all_results, file_results, debug_mode, path)
+            if text_index is not None:
+                text_index.add_file(path, normalized_results)
+            if record_store is not None:
+                _store_file(record_store, path, normalized_results)
+        else:
+            print(f"⚠ {fname}: No records found")
+            if record_store is not None:
+                _store_file(record_store, path, {})
+    else:
+        # Only after a complete pass - a cancelled load hasn't seen every file
+        if record_store is not None:
+            record_store.retain_files(paths)
+
+    if use_cache:
+        print(f"\nParse cache: {reused} file(s) reused, {parsed} file(s) parsed")
+    print(_format_load_times(times))
+
+    return all_results
+
+
+# File in the cache folder listing the tests each data file holds (lazy
+# mode) - one per data folder (<prefix><folder key>.json), as sibling
+# folders share the cache folder
+MANIFEST_PREFIX = "manifest-"
+
+
+class LazyTests(Mapping):
+    """
+    all_tests for lazy loading: a read-only mapping of test name -> entries
+    that parses a file only when one of its tests is first looked up.
+
+    scan() builds the manifest - for every file its size, mtime, record types
+    and the number of entries of each test it holds. Files listed in the saved
+    manifest with the same size and mtime are not opened at all; the others
+    are parsed once (through the parse cache) to learn their tests. A lookup
+    then loads just the files holding that test and memoizes the merged list,
+    which is the same, in the same order, as load_all_tests returns.
+
+    Only warm starts get faster: a file's test names are only known once it
+    is parsed, so the first scan of a folder (or of new and changed files)
+    parses them all, as load_all_tests would, and keeps their results.
+
+    Narrative records reach text_index (and records reach record_store) when
+    their file is loaded; load_all() loads whatever is left.
+    """
+
+    def __init__(self, results_folder, debug_mode=False, use_cache=True, workers=1,
+                 text_index=None, time_budget=None, record_store=None):
+        self.results_folder = results_folder
+        self.debug_mode = debug_mode
+        self.cache_folder = default_cache_folder(results_folder) if use_cache else None
+        self.workers = workers or os.cpu_count() or 1
+        self.text_index = text_index
+        self.time_budget = time_budget
+        self.record_store = record_store
+
+        self.paths = []
+        # Absolute path -> {'size', 'mtime', 'record_types', 'counts': {test_name: entries}}
+        self.manifest = {}
+        # Test name -> paths of the files holding it, in file order
+        self._test_paths = {}
+        # Path -> that file's merged results, once loaded
+        self._loaded = {}
+        # Test name -> merged entries, once looked up
+        self._merged = {}
+        # Lookups on the GUI thread race the background load_all()
+        self._lock = threading.RLock()
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_folder, f"{MANIFEST_PREFIX}{folder_key(self.results_folder)}.json")
+
+    def _read_manifest(self):
+        if not self.cache_folder:
+            return {}
         try:
-            with open(os.path.join(results_folder, fname), 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Try both 'full_text' and 'raw_text' keys
-                text = data.get('full_text', '') or data.get('raw_text', '')
-            
-            if not text:
-                print(f"⚠ {fname}: No text content found (missing 'full_text' or 'raw_text' key)")
-                continue
-            
-            # Detect format and parse
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if saved.get('parser_version') != PARSER_VERSION:
+            return {}
+        return saved.get('files', {})
+
+    def _write_manifest(self):
+        if not self.cache_folder:
+            return
+        tmp_path = self._manifest_path() + '.tmp'
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'parser_version': PARSER_VERSION, 'files': self.manifest}, f, separators=(',', ':'))
+            os.replace(tmp_path, self._manifest_path())
+        except OSError:
+            # Without a manifest the next start just scans again
+            pass
+
+    def _add_loaded(self, path, result):
+        """Merge one _load_file_task result; returns the manifest entry counts or None on error"""
+        file_results, record_types, has_text, from_cache, error = result
+        if error:
+            print(f"✗ {os.path.basename(path)}: Error - {error}")
             file_results = {}
-            record_types = []
-            
-            # Check if it's LabCorp format
-            if 'Laboratory Corporation of America' in text or 'LabCorp' in text or 'Date Collected:' in text:
-                file_results = parse_labcorp_tests(text, debug_mode)
-                if file_results:
-                    record_types.append('Lab Tests')
-            
-            # Check if it's Kaiser format
-            if 'Kaiser Permanente' in text or 'Final result' in text:
-                # Parse lab tests
-                lab_results = parse_kaiser_tests(text, debug_mode)
-                file_results.update(lab_results)
-                if lab_results:
-                    record_types.append('Lab Tests')
-                
-                # Parse other medical records (vital signs, immunizations, etc.)
-                medical_results = parse_all_medical_records(text)
-                file_results.update(medical_results)
-                if medical_results:
-                    # Count types
-                    types_found = set(r[0]['Type'] for r in medical_results.values() if r)
-                    record_types.extend(types_found)
-            
-            if file_results:
-                types_str = ', '.join(record_types) if record_types else 'Unknown'
-                print(f"✓ {fname}: {len(file_results)} items ({types_str})")
-                
-                # Merge into all_results with normalization
-                for test_name, entries in file_results.items():
-                    # Don't normalize medical record types
-                    if entries and entries[0].get('Type') in ['Vital Sign', 'Medication', 'Immunization', 'Problem', 'Procedure']:
-                        normalized = test_name
-                    else:
-                        normalized = normalize_name(test_name)
-                    
-                    if normalized not in all_results:
-                        all_results[normalized] = []
-                    all_results[normalized].extend(entries)
-                    if debug_mode:
-                        print(f"  {test_name} -> {normalized}")
+
+        normalized_results = merge_file_results({}, file_results, self.debug_mode, path) if has_text else {}
+        self._loaded[path] = normalized_results
+        if normalized_results and self.text_index is not None:
+            self.text_index.add_file(path, normalized_results)
+        if self.record_store is not None:
+            if error or not has_text:
+                # Stale rows would outlive the file's current contents
+                self.record_store.remove_file(path)
             else:
-                print(f"⚠ {fname}: No records found")
-                
-        except Exception as e:
-            print(f"✗ {fname}: Error - {e}")
-            if debug_mode:
-                import traceback
-                traceback.print_exc()
-    
-    return all_results
\ No newline at end of file
+                _store_file(self.record_store, path, normalized_results)
+
+        if error:
+            return None
+        return record_types, {name: len(entries) for name, entries in normalized_results.items()}
+
+    def _load(self, paths, progress_callback=None, cancel_event=None, done=0, total=0):
+        """Load files that aren't loaded yet; returns False if cancelled"""
+        paths = [path for path in paths if path not in self._loaded]
+        loaded_files = _iter_loaded_files(paths, self.cache_folder, self.debug_mode,
+                                          self.workers, self.time_budget)
+        for path, result in loaded_files:
+            self._add_loaded(path, result)
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, os.path.basename(path), None)
+            if cancel_event is not None and cancel_event.is_set():
+                loaded_files.close()
+                return False
+        return True
+
+    def scan(self, progress_callback=None, cancel_event=None):
+        """
+        Build the manifest; returns the number of tests found.
+
+        progress_callback(files_done, total_files, fname, records_so_far) is
+        called for every file; cancel_event stops scanning after the current file.
+        """
+        self.paths = _list_data_files(self.results_folder)
+        if not self.paths:
+            return 0
+
+        saved = self._read_manifest()
+        to_parse = []
+        files_done = records_so_far = 0
+        for path in self.paths:
+            key = os.path.abspath(path)
+            size, mtime_ns = file_fingerprint(path)
+            entry = saved.get(key)
+            if entry and entry['size'] == size and entry['mtime'] == mtime_ns:
+                self.manifest[key] = entry
+                files_done += 1
+                records_so_far += sum(entry['counts'].values())
+            else:
+                to_parse.append((path, size, mtime_ns))
+
+        print(f"Indexing {len(self.paths)} file(s): {files_done} from the manifest, {len(to_parse)} to parse\n")
+        if progress_callback:
+            progress_callback(files_done, len(self.paths), None, records_so_far)
+
+        stamps = {path: (size, mtime_ns) for path, size, mtime_ns in to_parse}
+        times = _new_load_times()
+        loaded_files = _iter_loaded_files([path for path, _, _ in to_parse], self.cache_folder,
+                                          self.debug_mode, self.workers, self.time_budget, times)
+        for path, result in loaded_files:
+            found = self._add_loaded(path, result)
+            if found is not None:
+                record_types, counts = found
+                size, mtime_ns = stamps[path]
+                self.manifest[os.path.abspath(path)] = {
+                    'size': size, 'mtime': mtime_ns, 'record_types': record_types, 'counts': counts,
+                }
+                records_so_far += sum(counts.values())
+            files_done += 1
+            if progress_callback:
+                progress_callback(files_done, len(self.paths), os.path.basename(path), records_so_far)
+            if cancel_event is not None and cancel_event.is_set():
+                print("Indexing cancelled")
+                loaded_files.close()
+                break
+        if to_parse:
+            print(_format_load_times(times))
+
+        self._write_manifest()
+
+        # Test names in the order load_all_tests would first meet them
+        for path in self.paths:
+            entry = self.manifest.get(os.path.abspath(path))
+            if entry is None:
+                continue
+            for name in entry['counts']:
+                self._test_paths.setdefault(name, []).append(path)
+        return len(self._test_paths)
+
+    def __getitem__(self, test_name):
+        with self._lock:
+            merged = self._merged.get(test_name)
+            if merged is None:
+                paths = self._test_paths[test_name]
+                self._load(paths)
+                merged = []
+                for path in paths:
+                    merged.extend(self._loaded[path].get(test_name, ()))
+                self._merged[test_name] = merged
+            return merged
+
+    def __iter__(self):
+        return iter(self._test_paths)
+
+    def __len__(self):
+        return len(self._test_paths)
+
+    def __contains__(self, test_name):
+        return test_name in self._test_paths
+
+    def entry_count(self, test_name):
+        """Number of entries of test_name, from the manifest (nothing is parsed)"""
+        return sum(self.manifest[os.path.abspath(path)]['counts'][test_name]
+                   for path in self._test_paths.get(test_name, ()))
+
+    def total_entries(self):
+        """Number of entries across all tests, from the manifest"""
+        return sum(sum(entry['counts'].values()) for entry in self.manifest.values())
+
+    def is_fully_loaded(self):
+        return all(path in self._loaded for path in self.paths)
+
+    def load_all(self, progress_callback=None, cancel_event=None):
+        """
+        Load every file not loaded yet (e.g. in a background thread) in small
+        batches, so lookups from other threads are not held up for long.
+        Returns False if cancel_event stopped it.
+        """
+        pending = [path for path in self.paths if path not in self._loaded]
+        batch_size = max(self.workers, 1) * 4
+        for start in range(0, len(pending), batch_size):
+            with self._lock:
+                if not self._load(pending[start:start + batch_size], progress_callback, cancel_event,
+                                  start, len(pending)):
+                    return False
+        if self.record_store is not None:
+            self.record_store.retain_files(self.paths)
+        return True
+
+
+def entry_count(all_tests, test_name):
+    """Number of entries of a test, without parsing anything if all_tests is LazyTests or a snapshot"""
+    if hasattr(all_tests, 'entry_count'):
+        return all_tests.entry_count(test_name)
+    return len(all_tests[test_name])
+
+
+def total_entries(all_tests):
+    """Number of entries across all tests, without parsing anything if all_tests is LazyTests or a snapshot"""
+    if hasattr(all_tests, 'total_entries'):
+        return all_tests.total_entries()
+    return sum(len(entries) for entries in all_tests.values())
+
+
+def remove_file_results(all_results, sources):
+    """Remove every entry loaded from any of sources, in one pass; returns the names of the tests that changed"""
+    changed = set()
+    sources = set(sources)
+    if not sources:
+        return changed
+    for test_name in list(all_results):
+        entries = all_results[test_name]
+        kept = [entry for entry in entries if getattr(entry, 'source', None) not in sources]
+        if len(kept) != len(entries):
+            changed.add(test_name)
+            if kept:
+                all_results[test_name] = kept
+            else:
+                del all_results[test_name]
+    return changed
+
+
+def load_changed_files(paths, results_folder, debug_mode=False, use_cache=True, workers=1, time_budget=None):
+    """
+    Parse just the given files (e.g. reported by a watcher.FolderWatcher).
+
+    Returns:
+        list: (path, load_result) pairs for apply_file_changes
+    """
+    cache_folder = default_cache_folder(results_folder) if use_cache else None
+    workers = workers or os.cpu_count() or 1
+    return list(_iter_loaded_files(paths, cache_folder, debug_mode, workers, time_budget))
+
+
+def expand_archive_changes(all_results, to_reload, removed):
+    """
+    Replace changed or removed .zip archives in to_reload/removed with their
+    JSON members: every member the archive holds now is reloaded (unchanged
+    ones come from the parse cache), and members loaded before that it no
+    longer holds are removed.
+
+    Returns:
+        tuple: (to_reload, removed) without archive paths
+    """
+    archives = [path for path in list(to_reload) + list(removed) if is_archive(path)]
+    to_reload = [path for path in to_reload if not is_archive(path)]
+    removed = [path for path in removed if not is_archive(path)]
+    if not archives:
+        return to_reload, removed
+
+    loaded_sources = {getattr(entry, 'source', None) for entries in all_results.values() for entry in entries}
+    for archive_path in archives:
+        members = list_members(archive_path, JSON_EXTENSIONS) if os.path.isfile(archive_path) else []
+        to_reload.extend(members)
+        for source in loaded_sources:
+            if source and source not in members and source.startswith(archive_path + os.sep):
+                removed.append(source)
+    return to_reload, removed
+
+
+def apply_file_changes(all_results, loaded_files, removed=(), debug_mode=False,
+                       text_index=None, record_store=None):
+    """
+    Patch all_results in place: drop the entries of removed files and of
+    files that were parsed again, then merge the new results.
+
+    A file that failed to parse keeps its previous entries. Re-parsed files
+    are merged after the rest, so their entries move to the end of each test.
+
+    Returns:
+        set: names of the tests whose entries changed
+    """
+    reloaded = [(path, result) for path, result in loaded_files if not result[4]]
+    for path, (_, _, _, _, error) in loaded_files:
+        if error:
+            print(f"✗ {os.path.basename(path)}: Error - {error}")
+
+    stale = list(removed) + [path for path, _ in reloaded]
+    changed = remove_file_results(all_results, stale)
+    for path in stale:
+        if text_index is not None:
+            text_index.remove_file(path)
+        if record_store is not None:
+            record_store.remove_file(path)
+
+    for path, (file_results, record_types, has_text, from_cache, error) in reloaded:
+        fname = os.path.basename(path)
+        if not has_text or not file_results:
+            print(f"⚠ {fname}: No records found")
+            continue
+        types_str = ', '.join(record_types) if record_types else 'Unknown'
+        print(f"✓ {fname}: {len(file_results)} items ({types_str})")
+        normalized_results = merge_file_results(all_results, file_results, debug_mode, path)
+        changed.update(normalized_results)
+        if text_index is not None:
+            text_index.add_file(path, normalized_results)
+        if record_store is not None:
+            _store_file(record_store, path, normalized_results)
+
+    for path in removed:
+        print(f"✗ {os.path.basename(path)}: Removed")
+    return changed
@@ -1,55 +1,208 @@
 """
 matcher.py - Find matching test names from queries
 """
-from difflib import get_close_matches
+import heapq
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import chain
 from normalizer import normalize_name
 
+# "abnormal since 2022", "abnormal after 03/01/2021", "abnormal from 2020-06-01"
+_SINCE_PATTERN = re.compile(r'\b(since|after|from)\s+(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4}|\d{4})\b')
+
+
+class FuzzyNameMatcher:
+    """Drop-in replacement for difflib.get_close_matches over a fixed list of names
+
+    Candidates are narrowed with a character-bigram index before the full
+    SequenceMatcher scoring. The filters are exact bounds, so the results are
+    the same as get_close_matches:
+      - length: ratio() <= 2*min(la, lb)/(la + lb) (difflib's real_quick_ratio)
+      - bigrams: if ratio() >= cutoff, the matching blocks leave at most
+        (1 - cutoff)*L unmatched characters (L = la + lb), hence at most that
+        many block boundaries, so the strings share at least
+        cutoff*L/2 - (1 - cutoff)*L - 1 bigram occurrences.
+    The shared count used for filtering (name occurrences of each distinct
+    query bigram) is never below the true count, so no match is dropped.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        # Bigram -> positions of names containing it, once per occurrence
+        self.postings = {}
+        # Name length -> positions of names with that length
+        self.by_length = {}
+        for pos, name in enumerate(self.names):
+            self.by_length.setdefault(len(name), []).append(pos)
+            for i in range(len(name) - 1):
+                self.postings.setdefault(name[i:i + 2], []).append(pos)
+
+    def _candidates(self, word, cutoff):
+        """Positions of names that can still reach the cutoff"""
+        la = len(word)
+        query_grams = set(word[i:i + 2] for i in range(la - 1))
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query_grams))
+
+        candidates = []
+        for lb, positions in self.by_length.items():
+            total = la + lb
+            if total and 2.0 * min(la, lb) / total < cutoff:
+                continue
+            # Small slack so float rounding can never drop a borderline name
+            min_shared = cutoff * total / 2.0 - (1.0 - cutoff) * total - 1 - 1e-9
+            if min_shared <= 0:
+                candidates.extend(positions)
+            else:
+                candidates.extend(pos for pos in positions if shared.get(pos, 0) >= min_shared)
+        return candidates
+
+    def get_close_matches(self, word, n=3, cutoff=0.6):
+        """Same contract and results as difflib.get_close_matches(word, names, n, cutoff)"""
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+
+        result = []
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        for pos in self._candidates(word, cutoff):
+            x = self.names[pos]
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and \
+               s.quick_ratio() >= cutoff and \
+               s.ratio() >= cutoff:
+                result.append((s.ratio(), x))
+
+        # Keep the n best; ties are broken the same way as difflib
+        result = heapq.nlargest(n, result)
+        return [x for score, x in result]
+
+
+class TestNameIndex:
+    """Lookup structures over the loaded test names, built once after loading"""
+
+    def __init__(self, test_names):
+        self.test_names = list(test_names)
+        self.lower_names = [name.lower() for name in self.test_names]
+
+        # Lower-cased name -> positions of names with that spelling
+        self.exact = {}
+        # Whitespace token -> positions of names containing that token
+        self.tokens = {}
+        for pos, name_lower in enumerate(self.lower_names):
+            self.exact.setdefault(name_lower, []).append(pos)
+            for token in name_lower.split():
+                self.tokens.setdefault(token, set()).add(pos)
+
+        # Query word -> positions of names containing it as a substring
+        self._word_positions = {}
+        # Built on first use - most searches never reach the fuzzy stage
+        self._fuzzy = None
+
+    def __len__(self):
+        return len(self.test_names)
+
+    def _names_at(self, positions):
+        """Return names for positions, in test_names order"""
+        return [self.test_names[pos] for pos in sorted(positions)]
+
+    def exact_matches(self, query_lower):
+        """Names whose lower-cased form equals query_lower"""
+        return self._names_at(self.exact.get(query_lower, []))
+
+    def _positions_containing_word(self, word):
+        """Positions of names containing a whitespace-free word as a substring
+
+        A word without whitespace can only occur inside a single token of a
+        name, so the (much smaller) token vocabulary is scanned instead of names.
+        """
+        positions = self._word_positions.get(word)
+        if positions is None:
+            positions = set()
+            for token, token_positions in self.tokens.items():
+                if word in token:
+                    positions |= token_positions
+            self._word_positions[word] = positions
+        return positions
+
+    def names_containing_all(self, words):
+        """Names that contain every word as a substring"""
+        positions = None
+        for word in words:
+            word_positions = self._positions_containing_word(word)
+            positions = word_positions if positions is None else positions & word_positions
+            if not positions:
+                return []
+        return self._names_at(positions or [])
+
+    def names_containing(self, text):
+        """Names that contain text as a substring"""
+        if text and not any(ch.isspace() for ch in text):
+            return self._names_at(self._positions_containing_word(text))
+        return [name for name, name_lower in zip(self.test_names, self.lower_names) if text in name_lower]
+
+    def fuzzy_matches(self, query_lower):
+        """Names close to query_lower (top 3, cutoff 0.8), in test_names order"""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyNameMatcher(self.lower_names)
+        fuzzy = self._fuzzy.get_close_matches(query_lower, n=3, cutoff=0.8)
+        if not fuzzy:
+            return []
+        fuzzy = set(fuzzy)
+        return [name for name, name_lower in zip(self.test_names, self.lower_names) if name_lower in fuzzy]
+
+
 def find_test(query, test_names):
-    """Find matching test name(s) - can return multiple matches"""
+    """Find matching test name(s) - can return multiple matches
+
+    test_names may be a list of names or a prebuilt TestNameIndex; passing
+    the index (built once per load, also for a record_store.RecordStore's
+    test_names()) avoids re-scanning every name on each query.
+    """
+    index = test_names if isinstance(test_names, TestNameIndex) else TestNameIndex(test_names)
+
     query_normalized = normalize_name(query)
     query_lower = query.lower()
-    
-    matches = []
-    
+
     # Exact match on normalized name
-    for name in test_names:
-        if name.lower() == query_normalized.lower():
-            matches.append(name)
-    
+    matches = index.exact_matches(query_normalized.lower())
     if matches:
         return matches
-    
+
     # Exact match on original query
-    for name in test_names:
-        if name.lower() == query_lower:
-            matches.append(name)
-    
+    matches = index.exact_matches(query_lower)
     if matches:
         return matches
-    
+
     # If query has multiple words (like "calcium urine"), require all words
     query_words = query_lower.split()
     if len(query_words) > 1:
-        for name in test_names:
-            name_lower = name.lower()
-            if all(word in name_lower for word in query_words):
-                matches.append(name)
+        matches = index.names_containing_all(query_words)
         if matches:
             return matches
-    
+
     # Single word query - find all tests containing that word
-    for name in test_names:
-        if query_lower in name.lower():
-            matches.append(name)
-    
+    matches = index.names_containing(query_lower)
     if matches:
         return matches
-    
+
     # Fuzzy match as last resort
-    fuzzy = get_close_matches(query_lower, [n.lower() for n in test_names], n=3, cutoff=0.8)
-    if fuzzy:
-        for name in test_names:
-            if name.lower() in fuzzy:
-                matches.append(name)
-    
-    return matches if matches else None
\ No newline at end of file
+    matches = index.fuzzy_matches(query_lower)
+
+    return matches if matches else None
+
+
+def query_since(query):
+    """Date bound in a query like "abnormal since 2022", or None
+
+    "after <year>" starts at the following year; any other bound is inclusive.
+    """
+    match = _SINCE_PATTERN.search(query.lower())
+    if not match:
+        return None
+    word, bound = match.groups()
+    if word == 'after' and len(bound) == 4:
+        return str(int(bound) + 1)
+    return bound
@@ -3,18 +3,74 @@ medical_parsers.py - Parse all types of medical records
 Includes: vital signs, medications, immunizations, problems, procedures, imaging
 """
 import re
+import time
+from bisect import bisect_left
 from datetime import datetime
 
-def parse_vital_signs(text):
+
+class ParseTimeoutError(Exception):
+    """Raised when a document takes longer than its parsing time budget"""
+
+
+def _check_deadline(deadline, stage):
+    """Raise ParseTimeoutError if the monotonic deadline has passed"""
+    if deadline is not None and time.monotonic() > deadline:
+        raise ParseTimeoutError(f"Parsing time budget exceeded during {stage}")
+
+# Section headers, and the headers that end a section. None of these can
+# overlap another, so a single finditer over the alternation finds every one.
+SECTION_HEADERS = (
+    'Last Filed Vital Signs', 'Results', 'Immunizations', 'Ended Medications',
+    'Active Problems', 'Resolved Problems', 'Social History',
+)
+_SECTION_PATTERN = re.compile('|'.join(re.escape(header) for header in SECTION_HEADERS))
+
+
+class SectionIndex:
+    """Offsets of every section header in a document, found in one linear pass"""
+    
+    def __init__(self, text):
+        self.text = text
+        self.positions = {header: [] for header in SECTION_HEADERS}
+        for match in _SECTION_PATTERN.finditer(text):
+            self.positions[match.group()].append(match.start())
+        
+        # Where a trailing '$' lookahead stops: before a final newline, like re's '$'
+        self.text_end = len(text) - 1 if text.endswith('\n') else len(text)
+    
+    def section(self, header, terminators, include_header=False):
+        """
+        Return the slice from the first header to the next terminator (or the end).
+        Same text as re.search(header + '(.*?)(?=T1|T2|$)', text, re.DOTALL);
+        returns None if the header does not occur.
+        """
+        starts = self.positions[header]
+        if not starts:
+            return None
+        
+        start = starts[0]
+        body_start = start + len(header)
+        end = self.text_end
+        for terminator in terminators:
+            positions = self.positions[terminator]
+            i = bisect_left(positions, body_start)
+            if i < len(positions) and positions[i] < end:
+                end = positions[i]
+        
+        # A header right at the end of the text still yields an empty section
+        end = max(end, body_start)
+        return self.text[start if include_header else body_start:end]
+
+
+def parse_vital_signs(text, sections=None):
     """Parse vital signs from Kaiser medical record"""
     results = {}
     
-    vital_signs_section = re.search(r'Last Filed Vital Signs.*?(?=Results|Immunizations|$)', text, re.DOTALL)
-    if not vital_signs_section:
+    sections = sections or SectionIndex(text)
+    vital_text = sections.section('Last Filed Vital Signs', ('Results', 'Immunizations'), include_header=True)
+    if vital_text is None:
         return results
     
-    vital_text = vital_signs_section.group(0)
-    
     # Blood Pressure
     bp_match = re.search(r'Blood Pressure\s+(\d+/\d+)\s+(\d{2}/\d{2}/\d{4})', vital_text)
     if bp_match:
@@ -96,15 +152,15 @@ def parse_vital_signs(text):
     return results
 
 
-def parse_medications(text):
+def parse_medications(text, sections=None):
     """Parse medications from Kaiser medical record"""
     results = {}
     
     # Active Medications (skip for now as they don't have dates/values)
     # Ended Medications
-    ended_section = re.search(r'Ended Medications(.*?)(?=Active Problems|Immunizations|$)', text, re.DOTALL)
-    if ended_section:
-        med_text = ended_section.group(1)
+    sections = sections or SectionIndex(text)
+    med_text = sections.section('Ended Medications', ('Active Problems', 'Immunizations'))
+    if med_text is not None:
         # Pattern: "MEDICATION_NAME (Started DATE) (Expired)"
         med_pattern = r'([A-Z][A-Za-z\s-]+(?:\([A-Z]+\))?)\s+.*?\(Started\s+(\d{1,2}/\d{1,2}/\d{4})\)'
         
@@ -127,16 +183,15 @@ def parse_medications(text):
     return results
 
 
-def parse_immunizations(text):
+def parse_immunizations(text, sections=None):
     """Parse immunizations from Kaiser medical record"""
     results = {}
     
-    imm_section = re.search(r'Immunizations(.*?)(?=Social History|$)', text, re.DOTALL)
-    if not imm_section:
+    sections = sections or SectionIndex(text)
+    imm_text = sections.section('Immunizations', ('Social History',))
+    if imm_text is None:
         return results
     
-    imm_text = imm_section.group(1)
-    
     # Pattern: "VACCINE_NAME (Given DATE, DATE, ...)"
     imm_pattern = r'([A-Z][A-Za-z0-9\s,()/-]+?)\s+\(Given\s+([\d/,\s]+)\)'
     
@@ -163,14 +218,14 @@ def parse_immunizations(text):
     return results
 
 
-def parse_problems(text):
+def parse_problems(text, sections=None):
     """Parse active and resolved problems"""
     results = {}
+    sections = sections or SectionIndex(text)
     
     # Active Problems
-    active_section = re.search(r'Active Problems(.*?)(?=Resolved Problems|Immunizations|$)', text, re.DOTALL)
-    if active_section:
-        prob_text = active_section.group(1)
+    prob_text = sections.section('Active Problems', ('Resolved Problems', 'Immunizations'))
+    if prob_text is not None:
         # Pattern: "PROBLEM Noted_Date MM/DD/YYYY"
         prob_pattern = r'([A-Z][A-Z\s,()/-]+?)\s+(\d{2}/\d{2}/\d{4})'
         
@@ -191,9 +246,8 @@ def parse_problems(text):
             })
     
     # Resolved Problems
-    resolved_section = re.search(r'Resolved Problems(.*?)(?=Immunizations|$)', text, re.DOTALL)
-    if resolved_section:
-        prob_text = resolved_section.group(1)
+    prob_text = sections.section('Resolved Problems', ('Immunizations',))
+    if prob_text is not None:
         prob_pattern = r'([A-Z][A-Z\s,()/-]+?)\s+(\d{2}/\d{2}/\d{4})\s+.*?(\d{2}/\d{2}/\d{4})'
         
         for match in re.finditer(prob_pattern, prob_text):
@@ -216,23 +270,34 @@ def parse_problems(text):
     return results
 
 
-def parse_procedures(text):
+# Pattern 1: "PROCEDURE_NAME - Final result (DATE)"
+# More restrictive - stop at newline or specific delimiters.
+# Each pattern is keyed by its literal prefix so absent ones are skipped without a scan.
+PROCEDURE_PATTERNS = [
+    (prefix, re.compile('(' + re.escape(prefix) + r'[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})'))
+    for prefix in ('COLONOSCOPY', 'ULTRASOUND', 'OPTICAL COHERENCE', 'FLUORO', 'XR ', 'SARS-COV-2')
+]
+
+# Pattern 2: "PROCEDURE_NAME (DATE)" - without "Final result"
+# Stop at opening parenthesis or newline
+PROCEDURE_PATTERNS_ALT = [
+    (prefix, re.compile('(' + re.escape(prefix) + r'[^\n(]*?)\s*\((\d{2}/\d{2}/\d{4}\s+\d{1,2}:\d{2}\s+[AP]M\s+[A-Z]+)\)'))
+    for prefix in ('COLONOSCOPY', 'OPTICAL COHERENCE')
+]
+
+
+def parse_procedures(text, deadline=None):
     """Parse procedures and imaging studies with full narratives"""
     results = {}
     
-    # Pattern 1: "PROCEDURE_NAME - Final result (DATE)"
-    # More restrictive - stop at newline or specific delimiters
-    procedure_patterns = [
-        r'(COLONOSCOPY[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})',
-        r'(ULTRASOUND[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})',
-        r'(OPTICAL COHERENCE[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})',
-        r'(FLUORO[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})',
-        r'(XR [^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})',
-        r'(SARS-COV-2[^\n-]*?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})'
-    ]
-    
-    for pattern in procedure_patterns:
-        for match in re.finditer(pattern, text):
+    # Every pattern 1 match contains "Final result"
+    procedure_patterns = PROCEDURE_PATTERNS if 'Final result' in text else []
+    
+    for prefix, pattern in procedure_patterns:
+        if prefix not in text:
+            continue
+        for match in pattern.finditer(text):
+            _check_deadline(deadline, "procedures")
             procedure_name = match.group(1).strip()
             procedure_date = match.group(2)
             
@@ -272,15 +337,11 @@ def parse_procedures(text):
                 'Type': 'Procedure'
             })
     
-    # Pattern 2: "PROCEDURE_NAME (DATE)" - without "Final result"
-    # Stop at opening parenthesis or newline
-    procedure_patterns_alt = [
-        r'(COLONOSCOPY[^\n(]*?)\s*\((\d{2}/\d{2}/\d{4}\s+\d{1,2}:\d{2}\s+[AP]M\s+[A-Z]+)\)',
-        r'(OPTICAL COHERENCE[^\n(]*?)\s*\((\d{2}/\d{2}/\d{4}\s+\d{1,2}:\d{2}\s+[AP]M\s+[A-Z]+)\)'
-    ]
-    
-    for pattern in procedure_patterns_alt:
-        for match in re.finditer(pattern, text):
+    for prefix, pattern in PROCEDURE_PATTERNS_ALT:
+        if prefix not in text:
+            continue
+        for match in pattern.finditer(text):
+            _check_deadline(deadline, "procedures")
             procedure_name = match.group(1).strip()
             date_time_str = match.group(2)
             
@@ -343,16 +404,78 @@ def parse_procedures(text):
     return results
 
 
-def parse_clinical_notes(text):
+NOTE_MARKER = 'Procedure Note'
+NOTE_TERMINATORS = ('Authorizing Provider', 'Performing')
+_WHITESPACE_RUN = re.compile(r'\s*')
+
+
+def _find_all(text, marker):
+    """Start offsets of every occurrence of marker in text"""
+    positions = []
+    pos = text.find(marker)
+    while pos != -1:
+        positions.append(pos)
+        pos = text.find(marker, pos + 1)
+    return positions
+
+
+def _iter_note_spans(text, deadline=None):
+    """
+    Yield (provider_info, note_content) for each procedure note.
+    
+    After stripping, these are the groups of
+    re.finditer(r'Procedure Note\s+(.*?)\s+Procedure Note(.*?)(?=Authorizing Provider|Performing|$)', text, re.DOTALL)
+    but from precomputed marker offsets, so a note with no terminator after it
+    costs a lookup instead of a scan to the end of the text for every note.
+    """
+    marker_len = len(NOTE_MARKER)
+    markers = _find_all(text, NOTE_MARKER)
+    if len(markers) < 2:
+        return
+    
+    # Markers that can close a header: the regex needs whitespace right before them
+    closing = [pos for pos in markers if pos and text[pos - 1].isspace()]
+    terminators = sorted(pos for terminator in NOTE_TERMINATORS for pos in _find_all(text, terminator))
+    # '$' also matches before a trailing newline
+    text_end = len(text) - 1 if text.endswith('\n') else len(text)
+    
+    resume = 0
+    for start in markers:
+        if start < resume:
+            continue
+        _check_deadline(deadline, "clinical notes")
+        
+        # Opening marker must be followed by whitespace; the header starts after it
+        header_start = _WHITESPACE_RUN.match(text, start + marker_len).end()
+        if header_start == start + marker_len:
+            continue
+        
+        i = bisect_left(closing, header_start + 1)
+        if i < len(closing):
+            close = closing[i]
+        elif header_start - start - marker_len > 1 and text.startswith(NOTE_MARKER, header_start):
+            # Only whitespace between the two markers - the regex backtracks
+            # into that run and matches an empty header
+            close = header_start
+        else:
+            continue
+        
+        body_start = close + marker_len
+        j = bisect_left(terminators, body_start)
+        body_end = min(terminators[j], text_end) if j < len(terminators) else text_end
+        
+        yield text[header_start:close], text[body_start:body_end]
+        resume = body_end
+
+
+def parse_clinical_notes(text, deadline=None):
     """Parse clinical notes and procedure narratives"""
     results = {}
     
     # Look for procedure notes with detailed narratives
-    note_pattern = r'Procedure Note\s+(.*?)\s+Procedure Note(.*?)(?=Authorizing Provider|Performing|$)'
-    
-    for match in re.finditer(note_pattern, text, re.DOTALL):
-        provider_info = match.group(1).strip()
-        note_content = match.group(2).strip()
+    for provider_info, note_content in _iter_note_spans(text, deadline):
+        provider_info = provider_info.strip()
+        note_content = note_content.strip()
         
         # Extract date from note
         date_match = re.search(r'(\d{2}/\d{2}/\d{4})', provider_info)
@@ -381,17 +504,27 @@ def parse_clinical_notes(text):
     return results
 
 
-def parse_all_medical_records(text):
-    """Parse all types of medical records from text"""
+def parse_all_medical_records(text, time_budget=None):
+    """
+    Parse all types of medical records from text.
+    
+    If time_budget (seconds) is given, ParseTimeoutError is raised once parsing
+    runs past it, so one pathological document cannot stall a whole load.
+    """
     all_results = {}
+    deadline = time.monotonic() + time_budget if time_budget else None
+    
+    # Find all section headers once; each parser only reads its own slice
+    sections = SectionIndex(text)
     
     # Parse each type
-    vital_signs = parse_vital_signs(text)
-    medications = parse_medications(text)
-    immunizations = parse_immunizations(text)
-    problems = parse_problems(text)
-    procedures = parse_procedures(text)
-    clinical_notes = parse_clinical_notes(text)
+    vital_signs = parse_vital_signs(text, sections)
+    medications = parse_medications(text, sections)
+    immunizations = parse_immunizations(text, sections)
+    problems = parse_problems(text, sections)
+    _check_deadline(deadline, "summary sections")
+    procedures = parse_procedures(text, deadline)
+    clinical_notes = parse_clinical_notes(text, deadline)
     
     # Merge all results
     all_results.update(vital_signs)
@@ -4,16 +4,25 @@ Simplified modular structure for easy maintenance
 """
 import sys
 import os
+import multiprocessing
+import queue
 #from trial_manager import check_trial_and_start_app, TrialManager
 
 # Add current directory to path to ensure imports work
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from loader import load_all_tests
-    from matcher import find_test
-    from formatter import format_results, format_abnormal_tests
-    from config import RESULTS_FOLDER, DEBUG_MODE
+    from loader import (load_all_tests, LazyTests, entry_count, total_entries,
+                        load_changed_files, apply_file_changes, expand_archive_changes)
+    from matcher import find_test, query_since, TestNameIndex
+    from fulltext import FullTextIndex
+    from record_store import RecordStore, default_store_path
+    from watcher import FolderWatcher, collapse_changes
+    from archives import JSON_EXTENSIONS
+    from parsers import PARSER_VERSION
+    from formatter import format_results, format_abnormal_tests, format_text_matches
+    from config import (RESULTS_FOLDER, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS, PARSE_TIME_BUDGET,
+                        USE_RECORD_STORE, LAZY_LOAD, WATCH_FOLDER, WATCH_INTERVAL)
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("\nMake sure all these files are in the same directory:")
@@ -33,11 +42,25 @@ def main():
     print("="*60)
     
     # Load all test data
-    all_tests = load_all_tests(RESULTS_FOLDER, DEBUG_MODE)
+    text_index = FullTextIndex()
+    record_store = None
+    if USE_RECORD_STORE:
+        record_store = RecordStore(default_store_path(RESULTS_FOLDER), PARSER_VERSION)
+    if LAZY_LOAD:
+        # Records are parsed when a test is first shown
+        all_tests = LazyTests(RESULTS_FOLDER, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS,
+                              text_index=text_index, time_budget=PARSE_TIME_BUDGET,
+                              record_store=record_store)
+        all_tests.scan()
+    else:
+        all_tests = load_all_tests(RESULTS_FOLDER, DEBUG_MODE, USE_PARSE_CACHE, LOAD_WORKERS,
+                                   text_index=text_index, time_budget=PARSE_TIME_BUDGET,
+                                   record_store=record_store)
     test_names = sorted(all_tests.keys())
+    name_index = TestNameIndex(test_names)
     
     print(f"\nLoaded {len(test_names)} unique test types")
-    print(f"Total entries: {sum(len(v) for v in all_tests.values())}")
+    print(f"Total entries: {total_entries(all_tests)}")
     print("="*60)
     
     if not test_names:
@@ -48,6 +71,7 @@ def main():
     print("  - Type test/record name (e.g., 'glucose', 'blood pressure', 'immunizations')")
     print("  - 'list tests' - Show all available records")
     print("  - 'abnormal' or 'abnormal tests' - Show tests with abnormal values")
+    print("    ('abnormal since 2022' - only results from 2022 on)")
     print("  - 'vital signs' - Show all vital sign measurements")
     print("  - 'procedures' - Show all procedures and imaging")
     print("  - 'clinical notes' - Show doctor's notes and summaries")
@@ -55,6 +79,14 @@ def main():
     print("  - 'exit' - Quit")
     print("="*60 + "\n")
     
+    # New exports dropped into the folder are picked up before the next question
+    changes = queue.Queue()
+    watcher = None
+    if WATCH_FOLDER:
+        watcher = FolderWatcher(RESULTS_FOLDER, lambda *batch: changes.put(batch), WATCH_INTERVAL,
+                                extensions=JSON_EXTENSIONS + ('.zip',))
+        watcher.start()
+    
     # Query loop
     while True:
         query = input("Question: ").strip()
@@ -66,11 +98,29 @@ def main():
             print("\nExiting. Stay healthy!")
             break
         
+        # Pick up files the watcher saw change since the last question
+        batches = []
+        while not changes.empty():
+            batches.append(changes.get())
+        if batches:
+            to_reload, removed = collapse_changes(batches)
+            if not isinstance(all_tests, dict):
+                # Patching needs a plain dict; this loads whatever is still lazy
+                print("↻ Loading the remaining files before applying the changes...")
+                all_tests = dict(all_tests.items())
+            to_reload, removed = expand_archive_changes(all_tests, to_reload, removed)
+            loaded = load_changed_files(to_reload, RESULTS_FOLDER, DEBUG_MODE, USE_PARSE_CACHE,
+                                        LOAD_WORKERS, PARSE_TIME_BUDGET)
+            apply_file_changes(all_tests, loaded, removed, DEBUG_MODE, text_index, record_store)
+            test_names = sorted(all_tests.keys())
+            name_index = TestNameIndex(test_names)
+            print(f"↻ Reloaded {len(to_reload)} changed and {len(removed)} removed file(s)\n")
+        
         # List all tests
         if 'list tests' in query.lower():
             print(f"\nAvailable tests ({len(test_names)}):")
             for i, name in enumerate(test_names, 1):
-                count = len(all_tests[name])
+                count = entry_count(all_tests, name)
                 print(f"  {i}. {name} ({count} entries)")
             print()
             continue
@@ -78,12 +128,19 @@ def main():
         # Show abnormal tests
         if 'abnormal' in query.lower():
             print("\n--- Abnormal Tests ---")
-            print(format_abnormal_tests(all_tests))
+            print(format_abnormal_tests(all_tests, record_store, query_since(query)))
             print()
             continue
         
         # Find and display test(s)
-        matches = find_test(query, test_names)
+        matches = find_test(query, name_index) or []
+        if not matches and isinstance(all_tests, LazyTests):
+            # Narratives are indexed as their files load (with name matches,
+            # the files loaded so far are searched)
+            all_tests.load_all()
+        # Procedure and note narratives mentioning the query, besides the
+        # records matched by name
+        hits = text_index.search(query, exclude_tests=matches)
         
         if matches:
             if len(matches) == 1:
@@ -99,8 +156,14 @@ def main():
                     print(f"=== {test_name} ===")
                     print(format_results(all_tests[test_name]))
                     print()
-        else:
+        if hits:
+            print(f"\n--- Notes and procedures mentioning '{query}' ---")
+            print(format_text_matches(hits, query))
+            print()
+        elif not matches:
             print("\n✗ Test not found. Try 'list tests' to see all available tests.\n")
 
 if __name__ == "__main__":
+    # Needed by the parallel loader in frozen (cx_Freeze/PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -14,32 +14,37 @@ IMPORTANT: Make sure these files are in the same folder:
 - visualizer.py
 - config.py
 """
-import tkinter as tk
 import sys
 import os
+import multiprocessing
 #from trial_manager import check_trial_and_start_app, TrialManager
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from gui_app import MedicalRAGApp
-except ImportError as e:
-    print(f"ERROR: Could not import required modules: {e}")
-    print("\nMake sure all these files are in the same folder:")
-    print("- gui_app.py")
-    print("- gui_widgets.py")
-    print("- gui_chart.py")
-    print("- gui_results.py")
-    sys.exit(1)
-
 
 def main():
     """Main application entry point"""
+    # Imported here, not at module level: worker processes (PDF extraction)
+    # re-import this module, and must start without Tk, numpy and matplotlib
+    import tkinter as tk
+    try:
+        from gui_app import MedicalRAGApp
+    except ImportError as e:
+        print(f"ERROR: Could not import required modules: {e}")
+        print("\nMake sure all these files are in the same folder:")
+        print("- gui_app.py")
+        print("- gui_widgets.py")
+        print("- gui_chart.py")
+        print("- gui_results.py")
+        sys.exit(1)
+    
     root = tk.Tk()
     app = MedicalRAGApp(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # Needed by the parallel loader in frozen (cx_Freeze/PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+parse_cache.py - On-disk cache of parsed results for each source file
+"""
+import os
+import json
+import hashlib
+
+from archives import is_member_path, member_fingerprint
+
+# Name of the cache folder created next to the data folder
+CACHE_FOLDER_NAME = ".parse_cache"
+
+
+def default_cache_folder(results_folder):
+    """Return the cache folder that sits next to the given data folder"""
+    parent = os.path.dirname(os.path.abspath(results_folder))
+    return os.path.join(parent, CACHE_FOLDER_NAME)
+
+
+def folder_key(results_folder):
+    """
+    Short name unique to a data folder (its name plus a hash of its absolute
+    path), for the per-folder files kept next to it - sibling data folders
+    share the parent and the cache folder
+    """
+    path = os.path.abspath(results_folder)
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:10]
+    return f"{os.path.basename(path)}-{digest}"
+
+
+def file_fingerprint(path):
+    """
+    Return (size, mtime_ns) for a file - the cheap part of the cache key.
+    For a member of a ZIP archive it is (size, CRC-32), read from the
+    archive's directory.
+    """
+    if is_member_path(path):
+        return member_fingerprint(path)
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of raw file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    """
+    Stores parsed per-file results keyed by path, size, mtime, content hash and parser version.
+    Members of ZIP archives are keyed by the SHA-256 of their content instead of
+    their path, so the same export in a newly downloaded bundle is still a hit
+    (they are only found by lookup_by_hash - the CRC-32 in the archive is too
+    weak to trust on its own).
+    """
+    
+    def __init__(self, cache_folder, parser_version):
+        self.cache_folder = cache_folder
+        self.parser_version = parser_version
+        self.enabled = True
+        
+        try:
+            os.makedirs(cache_folder, exist_ok=True)
+        except OSError:
+            # Read-only media or no permission - just parse everything
+            self.enabled = False
+    
+    def _entry_path(self, path, sha256=None):
+        """Cache file used for a given source file (an archive member's is found by its content hash)"""
+        if is_member_path(path):
+            key = hashlib.sha1(f"member:{sha256}".encode('utf-8')).hexdigest()
+        else:
+            key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_folder, f"{key}.json")
+    
+    def _read_entry(self, path, sha256=None):
+        try:
+            with open(self._entry_path(path, sha256), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if entry.get('parser_version') != self.parser_version:
+            return None
+        if entry.get('path') != os.path.abspath(path) and not is_member_path(path):
+            return None
+        return entry
+    
+    def lookup(self, path, size, mtime_ns):
+        """Return the cached entry if size and mtime still match, else None"""
+        if not self.enabled or is_member_path(path):
+            return None
+        
+        entry = self._read_entry(path)
+        if entry and entry.get('size') == size and entry.get('mtime') == mtime_ns:
+            return entry
+        return None
+    
+    def lookup_by_hash(self, path, size, mtime_ns, sha256):
+        """
+        Return the cached entry if the content hash still matches.
+        Used when a file was touched (new mtime) but its bytes did not change;
+        the stored stamp is refreshed so the next lookup is cheap again.
+        """
+        if not self.enabled:
+            return None
+        
+        entry = self._read_entry(path, sha256)
+        if entry and entry.get('sha256') == sha256:
+            if not is_member_path(path):
+                entry['size'] = size
+                entry['mtime'] = mtime_ns
+                self._write_entry(path, entry)
+            return entry
+        return None
+    
+    def store(self, path, size, mtime_ns, sha256, file_results, record_types, has_text=True):
+        """Save the parsed results for a source file"""
+        if not self.enabled:
+            return
+        
+        entry = {
+            'parser_version': self.parser_version,
+            'path': os.path.abspath(path),
+            'size': size,
+            'mtime': mtime_ns,
+            'sha256': sha256,
+            'has_text': has_text,
+            'record_types': record_types,
+            'results': file_results,
+        }
+        self._write_entry(path, entry)
+    
+    def _write_entry(self, path, entry):
+        entry_path = self._entry_path(path, entry.get('sha256'))
+        tmp_path = entry_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # A cache write failure should never stop loading
+            pass
@@ -2,6 +2,12 @@
 parsers.py - Lab report parsers for different formats
 """
 import re
+import string
+from bisect import bisect_right
+from reference_range import parse_reference_range
+
+# Bump whenever parsing output changes so cached results are rebuilt
+PARSER_VERSION = 3
 
 def parse_labcorp_tests(text, debug_mode=False):
     """Parse LabCorp test format"""
@@ -27,39 +33,20 @@ def parse_labcorp_tests(text, debug_mode=False):
     test_count = 0
     
     for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines and headers
-        if not line or 'Current Result' in line or 'Reference Interval' in line:
+        # Every result line carries the "01" specimen marker; most lines don't
+        if '01' not in line:
             continue
         
-        # Try matching with previous result first
-        match = re.match(
-            r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([\d.<>]+)?\s+(\d{1,2}/\d{1,2}/\d{4})?\s+([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?',
-            line
-        )
+        line = line.strip()
         
-        # If no match, try simpler pattern without previous result
-        if not match:
-            match = re.match(
-                r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?',
-                line
-            )
-            
-            if match:
-                test_name = match.group(1).strip()
-                value = match.group(2).strip()
-                flag = match.group(3) if match.group(3) else None
-                unit = match.group(4).strip() if match.group(4) else ''
-                ref_range = match.group(5).strip() if match.group(5) else ''
-        else:
-            test_name = match.group(1).strip()
-            value = match.group(2).strip()
-            flag = match.group(3) if match.group(3) else None
-            unit = match.group(6).strip() if match.group(6) else ''
-            ref_range = match.group(7).strip() if match.group(7) else ''
+        # Skip headers
+        if 'Current Result' in line or 'Reference Interval' in line:
+            continue
         
+        match = parse_labcorp_line(line)
         if match:
+            test_name, value, flag, unit, ref_range = match
+            
             # Determine status
             status = _determine_status(value, ref_range, flag)
             
@@ -81,37 +68,142 @@ def parse_labcorp_tests(text, debug_mode=False):
     return results
 
 
-def parse_kaiser_tests(text, debug_mode=False):
-    """Parse Kaiser lab test format"""
-    results = {}
+# LabCorp result line with previous result, date and unit
+LABCORP_LINE_PATTERN = re.compile(
+    r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([\d.<>]+)?\s+(\d{1,2}/\d{1,2}/\d{4})?\s+([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?'
+)
+# LabCorp result line without a previous result
+LABCORP_SHORT_LINE_PATTERN = re.compile(
+    r'^([A-Za-z][A-Za-z\s,()/-]+?)\s+01\s+([\d.<>]+)\s+(?:(Low|High|Critical)\s+)?([a-zA-Z0-9/*%]+)?\s+([\d.<>-]+)?'
+)
+
+LABCORP_FLAGS = ('Low', 'High', 'Critical')
+_NAME_CHARS = frozenset(string.ascii_letters + ',()/-')
+_NUMBER_CHARS = frozenset(string.digits + '.<>')
+_UNIT_CHARS = frozenset(string.ascii_letters + string.digits + '/*%')
+_DATE_TOKEN = re.compile(r'\d{1,2}/\d{1,2}/\d{4}')
+_RANGE_PREFIX = re.compile(r'[\d.<>-]*')
+
+
+def _split_labcorp_tokens(tokens):
+    """
+    Split a single-spaced ASCII line into (name, value, flag, unit, ref_range).
     
-    # Pattern: "TEST PANEL - Final result (DATE)"
-    panel_pattern = r'([A-Z][A-Z\s,()/-]+?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})'
+    With exactly one space between tokens every group of the two LabCorp line
+    patterns covers whole tokens, so the patterns reduce to these checks:
+      name  - every token before the first "01" (letters and ,()/- only)
+      long  - value [flag] previous date unit range
+      short - value [flag] unit range (the flag is only a flag if a unit follows)
+    The range is the leading [0-9.<>-] run of its token, as in the patterns.
+    Returns None if neither pattern would match.
+    """
+    count = len(tokens)
+    k = 0
+    while k < count and _NAME_CHARS.issuperset(tokens[k]):
+        k += 1
+    if k == count or tokens[k] != '01' or not tokens[0][0].isalpha() or (k == 1 and len(tokens[0]) < 2):
+        return None
+    if k + 2 >= count or not _NUMBER_CHARS.issuperset(tokens[k + 1]):
+        return None
     
-    for panel_match in re.finditer(panel_pattern, text):
-        test_date = panel_match.group(2)
-        start_pos = panel_match.end()
-        
-        # Extract table content after the header
-        next_section = text[start_pos:start_pos+4000]
+    name = ' '.join(tokens[:k])
+    value = tokens[k + 1]
+    j = k + 2
+    
+    # Format 1: value [flag] previous date unit range
+    i = j + 1 if tokens[j] in LABCORP_FLAGS else j
+    if (i + 3 < count and _NUMBER_CHARS.issuperset(tokens[i])
+            and _DATE_TOKEN.fullmatch(tokens[i + 1]) and _UNIT_CHARS.issuperset(tokens[i + 2])):
+        flag = tokens[j] if i > j else None
+        return name, value, flag, tokens[i + 2], _RANGE_PREFIX.match(tokens[i + 3]).group()
+    
+    # Format 2: value [flag] unit range
+    if tokens[j] in LABCORP_FLAGS and j + 2 < count and _UNIT_CHARS.issuperset(tokens[j + 1]):
+        return name, value, tokens[j], tokens[j + 1], _RANGE_PREFIX.match(tokens[j + 2]).group()
+    if j + 1 < count and _UNIT_CHARS.issuperset(tokens[j]):
+        return name, value, None, tokens[j], _RANGE_PREFIX.match(tokens[j + 1]).group()
+    return None
+
+
+def parse_labcorp_line(line):
+    """
+    Parse one stripped LabCorp result line.
+    
+    Returns:
+        tuple: (test_name, value, flag, unit, ref_range), or None if it is not a result line
+    """
+    tokens = line.split(' ')
+    if line.isascii() and tokens == line.split():
+        return _split_labcorp_tokens(tokens)
+    
+    # Irregular spacing (tabs, runs of spaces, non-ASCII) - use the full patterns
+    match = LABCORP_LINE_PATTERN.match(line)
+    if match:
+        return (match.group(1).strip(), match.group(2).strip(), match.group(3) or None,
+                (match.group(6) or '').strip(), (match.group(7) or '').strip())
+    
+    match = LABCORP_SHORT_LINE_PATTERN.match(line)
+    if match:
+        return (match.group(1).strip(), match.group(2).strip(), match.group(3) or None,
+                (match.group(4) or '').strip(), (match.group(5) or '').strip())
+    return None
+
+
+# Kaiser panel header: "TEST PANEL - Final result (DATE)"
+KAISER_PANEL_PATTERN = re.compile(r'([A-Z][A-Z\s,()/-]+?)\s*-\s*Final result\s*\((\d{2}/\d{2}/\d{4})')
+# Kaiser component line: "WBC'S AUTO 4.2 3.5 - 11.0 10*3/uL"
+KAISER_COMPONENT_PATTERN = re.compile(r'^([A-Z][A-Z\s,()\'/-]+?)\s+([\d.]+)\s+([\d.\s-]+)\s*([a-zA-Z0-9/*%]+)?')
+
+
+def iter_kaiser_panels(text):
+    """
+    Yield (test_date, component_lines) for each Kaiser panel.
+    
+    The text is split into lines once. Each panel's lines start right after its
+    header (the rest of the header line first) and run up to the next panel or
+    stop marker, so every line is visited about once and long panels are not cut
+    off. Lines are stripped, and blank and table-header lines are left out.
+    """
+    lines = text.split('\n')
+    line_starts = []
+    offset = 0
+    for line in lines:
+        line_starts.append(offset)
+        offset += len(line) + 1
+    
+    for panel_match in KAISER_PANEL_PATTERN.finditer(text):
+        header_end = panel_match.end()
+        line_index = bisect_right(line_starts, header_end) - 1
         
-        # Find component lines: "TEST_NAME VALUE REF_RANGE UNIT"
-        for line in next_section.split('\n'):
+        component_lines = []
+        line = lines[line_index][header_end - line_starts[line_index]:]
+        while True:
             line = line.strip()
             
-            # Skip headers and empty lines
+            # Stop at next panel or section; skip headers and empty lines
             if not line or 'Component' in line or 'Analysis' in line or 'Test Method' in line:
-                continue
-            
-            # Stop at next panel or section
-            if 'Final result' in line or 'Specimen' in line or 'Comment:' in line:
+                pass
+            elif 'Final result' in line or 'Specimen' in line or 'Comment:' in line:
                 break
+            else:
+                component_lines.append(line)
             
-            # Match: "WBC'S AUTO 4.2 3.5 - 11.0 10*3/uL"
-            match = re.match(
-                r'^([A-Z][A-Z\s,()\'/-]+?)\s+([\d.]+)\s+([\d.\s-]+)\s*([a-zA-Z0-9/*%]+)?',
-                line
-            )
+            line_index += 1
+            if line_index == len(lines):
+                break
+            line = lines[line_index]
+        
+        yield panel_match.group(2), component_lines
+
+
+def parse_kaiser_tests(text, debug_mode=False):
+    """Parse Kaiser lab test format"""
+    results = {}
+    
+    for test_date, component_lines in iter_kaiser_panels(text):
+        # Find component lines: "TEST_NAME VALUE REF_RANGE UNIT"
+        for line in component_lines:
+            match = KAISER_COMPONENT_PATTERN.match(line)
             
             if match:
                 test_name = match.group(1).strip()
@@ -151,22 +243,6 @@ def _determine_status(value, ref_range, flag=None):
     
     # Check against reference range
     if ref_range and value:
-        try:
-            val = float(value.replace('<', '').replace('>', ''))
-            if '-' in ref_range:
-                parts = ref_range.split('-')
-                if len(parts) == 2:
-                    low = float(parts[0].strip().replace('<', '').replace('>', ''))
-                    high = float(parts[1].strip().replace('<', '').replace('>', ''))
-                    if val < low:
-                        status = 'Low'
-                    elif val > high:
-                        status = 'High'
-            elif '>' in ref_range:
-                threshold = float(ref_range.replace('>', '').strip())
-                if val <= threshold:
-                    status = 'Low'
-        except:
-            pass
-    
-    return status
\ No newline at end of file
+        status = parse_reference_range(ref_range).classify(value) or status
+    
+    return status
@@ -2,18 +2,93 @@
 PDF Converter Module
 Converts medical record PDFs to text and JSON format
 """
+import io
 import os
 import json
+import time
+import shutil
+import hashlib
 from pathlib import Path
+from parsers import PARSER_VERSION
+from loader import parse_text
+from worker_pool import IsolatedPool
+from parse_cache import file_fingerprint
+from archives import (is_archive, is_member_path, split_member_path, list_members, open_data_file, read_data_file, close_archives,
+                      COMPRESSION_SUFFIXES, compression_error, open_compressed)
 
+# Manifest of converted PDFs kept in the output folder (no .json extension, so
+# the loader does not take it for an export)
+CONVERSION_MANIFEST = ".conversion_manifest"
 
-def convert_pdfs_to_json(pdf_folder, output_folder=None):
+# Bump when the .txt/.json output changes, so every PDF is converted again
+CONVERTER_VERSION = 2
+
+# Documents with more pages than this are split into page ranges of this
+# size and extracted by several workers at once
+PAGE_CHUNK_SIZE = 50
+
+NO_LIBRARY_ERROR = "No PDF library available. Please install: pip install PyPDF2 pdfplumber"
+
+# Keyword signatures for classifying a page from its quick (PyPDF2) text, in
+# order of precedence. A page with none of them is noise: its quick text is
+# kept and the slower layout extractor (pdfplumber) is not run on it.
+PAGE_SIGNATURES = (
+    ('results', ('Final result', 'Date Collected', 'Reference Range', 'Standard Range', 'Reference Interval',
+                 'Results', 'Ended Medications', 'Immunizations', 'Active Problems', 'Resolved Problems')),
+    ('vitals', ('Vital Signs', 'Blood Pressure', 'Pulse', 'Temperature', 'Respiratory Rate', 'SpO2', 'BMI')),
+    ('procedures', ('Procedure', 'Imaging', 'Radiology', 'Authorizing Provider')),
+)
+
+# Page kinds that are extracted again with the layout extractor
+LAYOUT_PAGE_KINDS = ('results', 'vitals', 'procedures')
+
+
+def convert_pdfs_to_json(pdf_folder, output_folder=None, progress_callback=None, cancel_event=None,
+                         workers=1, stats=None, streaming=False, time_budget=None,
+                         timeout=None, memory_limit_mb=None, adaptive=False, compression=None):
     """
     Convert all PDF files in a folder to text and JSON
     
+    PDFs whose size and mtime (or, failing that, content hash) match the
+    conversion manifest, and whose outputs still exist, are skipped. With
+    workers > 1 the rest are converted in a process pool (workers=0 uses
+    every CPU), large documents a page range per worker. Extraction always
+    runs in worker processes: a PDF that runs past timeout seconds or
+    memory_limit_mb is reported in errors and the batch carries on.
+    
+    With adaptive set (and both PyPDF2 and pdfplumber installed), every page
+    is read with PyPDF2 first and classified by PAGE_SIGNATURES; pdfplumber
+    runs only on the result, vital sign and procedure pages.
+    
+    With streaming set, each page is written to the .txt as soon as it is
+    extracted and the .json refers to the .txt (with page offsets) instead
+    of holding a copy of the text, so memory use stays around one page.
+    
+    The text is run through the loader's parsers once, in the worker that
+    extracted it (under the same limits), and the records are saved in the
+    .json with the parser version; load_all_tests uses them as they are
+    instead of parsing the text on every load.
+    
+    With compression ("gzip" or "zstd") the outputs are <name>.txt.gz and
+    <name>.json.gz (.zst for zstd): the text is kept once, in the compressed
+    .txt, and the compact .json refers to it. load_all_tests decompresses
+    them as it reads them.
+    
     Args:
         pdf_folder: Path to folder containing PDF files
         output_folder: Path to output folder (default: pdf_folder/txt_json)
+        progress_callback: Optional callable(files_done, total_files, file_name)
+        cancel_event: Optional threading.Event - stops after the current PDF when set
+        workers: Number of worker processes (1 = serial, 0 = one per CPU)
+        stats: Optional dict, filled with 'converted', 'unchanged' and 'failed' counts and
+            the page statistics of the PDFs extracted (see _new_page_stats; with
+            adaptive, 'seconds_saved' estimates the time saved)
+        streaming: Write pages to the .txt as they are extracted (for very large PDFs)
+        time_budget: Seconds allowed for parsing one document's records (None = no limit)
+        timeout: Seconds allowed for extracting one PDF, or one page range of a split PDF (None = no limit)
+        memory_limit_mb: Address space allowed per worker process, where supported (None = no limit)
+        adaptive: Run the layout extractor only on pages that hold records
+        compression: None, "gzip" or "zstd" (needs the zstandard package)
     
     Returns:
         tuple: (num_converted, output_folder_path, errors)
@@ -28,8 +103,17 @@ def convert_pdfs_to_json(pdf_folder, output_folder=None):
     
     output_folder.mkdir(exist_ok=True)
     
-    # Find all PDF files
-    pdf_files = list(pdf_folder.glob("*.pdf")) + list(pdf_folder.glob("*.PDF"))
+    # Find all PDF files (one listing - globbing *.pdf and *.PDF finds every
+    # file twice on case-insensitive file systems), and the PDFs inside .zip
+    # archives, which are read from the archive without extracting them
+    pdf_files = []
+    for path in sorted(pdf_folder.iterdir()):
+        if path.suffix.lower() == '.pdf' and path.is_file():
+            pdf_files.append(path)
+        elif is_archive(path.name) and path.is_file():
+            pdf_files.extend(Path(member) for member in list_members(str(path), ('.pdf',)))
+    # Manifest keys: the file name, or archive name/member name
+    keys = {pdf_file: str(pdf_file.relative_to(pdf_folder)).replace(os.sep, '/') for pdf_file in pdf_files}
     
     if not pdf_files:
         return 0, output_folder, ["No PDF files found in the selected folder"]
@@ -38,124 +122,758 @@ def convert_pdfs_to_json(pdf_folder, output_folder=None):
     errors = []
     
     # Try different PDF libraries
-    converter = _get_pdf_converter()
+    library = _pdf_library(adaptive)
+    
+    if not library:
+        return 0, output_folder, [NO_LIBRARY_ERROR]
     
-    if not converter:
-        return 0, output_folder, ["No PDF library available. Please install: pip install PyPDF2 pdfplumber"]
+    error = compression_error(compression)
+    if error:
+        return 0, output_folder, [error]
     
+    manifest = _read_manifest(output_folder)
+    to_convert = []
+    # Stamps of the PDFs to convert, taken before extraction - a PDF changed
+    # while it is converted is then converted again next time
+    new_stamps = {}
+    limits = [timeout, memory_limit_mb]
     for pdf_file in pdf_files:
+        entry = manifest.get(keys[pdf_file])
+        if entry and 'error' in entry and entry.get('limits') != limits:
+            # Failed under other limits - worth another try
+            entry = None
+        if entry and 'error' not in entry and entry.get('outputs') != _output_names(pdf_file, compression):
+            # Converted with another compression
+            entry = None
+        if entry and 'error' not in entry and entry.get('library') != library:
+            # Extracted by another library, or with(out) adaptive extraction
+            entry = None
+        stamp = _file_stamp(pdf_file, entry, output_folder)
+        if stamp is not None:
+            manifest[keys[pdf_file]] = stamp
+            if 'error' in stamp:
+                # A PDF that failed (scanned, or past the limits) isn't retried until it changes
+                errors.append(f"{stamp['error']} (not retried - file unchanged)")
+            continue
         try:
-            # Extract text from PDF
-            text = converter(pdf_file)
-            
-            if not text or len(text.strip()) < 10:
-                errors.append(f"{pdf_file.name}: Could not extract text (file may be scanned/image-based)")
-                continue
-            
-            # Save as text file
-            txt_file = output_folder / f"{pdf_file.stem}.txt"
-            with open(txt_file, 'w', encoding='utf-8') as f:
-                f.write(text)
-            
-            # Parse and save as JSON
-            json_data = _parse_medical_text_to_json(text, pdf_file.stem)
-            json_file = output_folder / f"{pdf_file.stem}.json"
-            
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2)
-            
-            converted_count += 1
+            new_stamps[keys[pdf_file]] = _new_stamp(pdf_file, compression, library)
+        except OSError:
+            pass
+        to_convert.append(pdf_file)
+    unchanged = len(pdf_files) - len(to_convert) - len(errors)
+    # Forget PDFs that are no longer in the folder
+    present = set(keys.values())
+    manifest = {key: entry for key, entry in manifest.items() if key in present}
+    
+    if not workers:
+        workers = os.cpu_count() or 1
+    files_done = unchanged
+    page_stats = _new_page_stats()
+    if progress_callback and unchanged:
+        progress_callback(files_done, len(pdf_files), "")
+    
+    try:
+        extracted = _iter_extracted(to_convert, library, output_folder, workers, cancel_event, streaming,
+                                    timeout, memory_limit_mb, time_budget)
+        for pdf_file, extraction, records, error, file_page_stats in extracted:
+            _add_page_stats(page_stats, file_page_stats)
+            if not error:
+                error = _write_outputs(pdf_file, output_folder, extraction, records, streaming, compression)
+            if error:
+                errors.append(error)
+                key = keys[pdf_file]
+                if key in new_stamps:
+                    manifest[key] = dict(new_stamps[key], outputs=[], error=error, limits=limits)
+                else:
+                    manifest.pop(key, None)
+            else:
+                converted_count += 1
+                if keys[pdf_file] in new_stamps:
+                    manifest[keys[pdf_file]] = new_stamps[keys[pdf_file]]
             
-        except Exception as e:
-            errors.append(f"{pdf_file.name}: {str(e)}")
+            files_done += 1
+            if progress_callback:
+                progress_callback(files_done, len(pdf_files), pdf_file.name)
+    finally:
+        # Also after a cancel, so the PDFs finished so far are not converted again
+        _write_manifest(output_folder, manifest)
+        close_archives()
+    
+    failed = len(errors)
+    print(f"PDF conversion: {converted_count} converted, {unchanged} unchanged, {failed} failed")
+    seconds_saved = _seconds_saved(page_stats) if library == "adaptive" else None
+    if seconds_saved is not None:
+        print(f"Adaptive extraction: {page_stats['skipped']} of {page_stats['pages']} page(s) "
+              f"did not need pdfplumber, about {seconds_saved:.1f} s saved")
+    if stats is not None:
+        stats.update(converted=converted_count, unchanged=unchanged, failed=failed, **page_stats)
+        stats['seconds_saved'] = seconds_saved
+    if cancel_event is not None and cancel_event.is_set():
+        errors.append("Conversion cancelled")
     
     return converted_count, output_folder, errors
 
 
-def _get_pdf_converter():
-    """Get the best available PDF converter"""
+def _extract_task(library, pdf_path, start, end, txt_part, time_budget=None, parse=True):
+    """
+    Extract pages start..end - as text, or streamed to txt_part - and, with
+    parse (the range is the whole document), parse its records (a worker
+    process task)
     
-    # Try pdfplumber first (best quality)
+    Returns:
+        tuple: (extraction, page_stats, records)
+    """
+    page_stats = _new_page_stats()
+    if txt_part is None:
+        extraction = _extract_pages(library, pdf_path, start, end, page_stats)
+    else:
+        extraction = _stream_pages(library, pdf_path, txt_part, start, end, page_stats)
+    records = _parse_task(extraction, txt_part, time_budget) if parse else None
+    return extraction, page_stats, records
+
+
+def _extract_or_split(library, pdf_path, chunk_size, txt_part, time_budget=None):
+    """
+    Extract and parse a PDF of up to chunk_size pages, or return the page
+    ranges to split a longer one into (a worker process task)
+    
+    Returns:
+        tuple: (ranges, None) or (None, (extraction, page_stats, records))
+    """
+    ranges = _page_ranges(library, pdf_path, chunk_size)
+    if len(ranges) > 1:
+        return ranges, None
+    return None, _extract_task(library, pdf_path, 0, None, txt_part, time_budget)
+
+
+def _parse_task(extraction, txt_file=None, time_budget=None):
+    """
+    Records of a whole document's extraction - the text, or the (pages,
+    text_chars) streamed to txt_file - as _parse_records returns them; None
+    if it holds too little text (a worker process task)
+    """
+    if txt_file is None:
+        if not extraction or len(extraction.strip()) < 10:
+            return None
+        return _parse_records(extraction, time_budget)
+    if extraction[1] < 10:
+        return None
+    with open(txt_file, 'r', encoding='utf-8') as f:
+        return _parse_records(f.read(), time_budget)
+
+
+def _iter_extracted(pdf_files, library, output_folder, workers=1, cancel_event=None, streaming=False,
+                    timeout=None, memory_limit_mb=None, time_budget=None):
+    """
+    Yield (pdf_file, extraction, records, error, page_stats) in the order of
+    pdf_files. extraction is the text, or with streaming the (pages,
+    text_chars) of the .txt already written; records are the parsed records
+    (see _parse_records), None if the text was too short or failed to parse.
+    
+    Extraction runs in worker processes, so a PDF that takes longer than
+    timeout seconds or more than memory_limit_mb (or crashes the PDF library)
+    fails on its own and the rest of the batch carries on. With workers > 1,
+    documents over PAGE_CHUNK_SIZE pages are split into page ranges, joined
+    back in page order so the text is the same as a serial extraction.
+    
+    The records are parsed in the worker that extracted the document, under
+    the same limits; a split document is parsed by one more task once its
+    ranges are joined.
+    """
+    def part_paths(pdf_file, count):
+        if not streaming:
+            return [None] * count
+        txt_file = Path(output_folder) / f"{_output_stem(pdf_file)}.txt"
+        return [f"{txt_file}.part{i}" for i in range(count)]
+    
+    def combine(pdf_file, parts, results):
+        extractions = [result[0] for result in results]
+        if not streaming:
+            return "".join(extractions)
+        return _join_parts(parts, extractions, Path(output_folder) / f"{_output_stem(pdf_file)}.txt")
+    
+    def file_page_stats(results):
+        page_stats = _new_page_stats()
+        for result in results:
+            if result is not None:
+                _add_page_stats(page_stats, result[1])
+        return page_stats
+    
+    pool = IsolatedPool(workers, timeout, memory_limit_mb)
+    # Per file: the part files, page range results still to come, and the first error
+    jobs = [{'parts': part_paths(pdf_file, 1), 'results': [None], 'pending': 1, 'error': None}
+            for pdf_file in pdf_files]
+    
+    for i, pdf_file in enumerate(pdf_files):
+        if workers > 1:
+            # Counting pages opens the PDF, so that happens in a worker too
+            pool.submit((i, None), _extract_or_split, library, str(pdf_file), PAGE_CHUNK_SIZE, jobs[i]['parts'][0],
+                        time_budget)
+        else:
+            pool.submit((i, 0), _extract_task, library, str(pdf_file), 0, None, jobs[i]['parts'][0], time_budget)
+    
+    finished = {}
+    next_index = 0
     try:
-        import pdfplumber
+        for (i, chunk), result, error in pool.completed(cancel_event):
+            pdf_file = pdf_files[i]
+            job = jobs[i]
+            if chunk == 'records':
+                # The records of a split document, parsed once its ranges were joined
+                extraction, page_stats = job['extraction']
+                if error:
+                    if streaming:
+                        _remove_parts([str(Path(output_folder) / f"{_output_stem(pdf_file)}.txt")])
+                    finished[i] = (None, None, f"{pdf_file.name}: {error}", page_stats)
+                else:
+                    finished[i] = (extraction, result, None, page_stats)
+            else:
+                if chunk is None and not error:
+                    ranges, result = result
+                    if ranges:
+                        job.update(parts=part_paths(pdf_file, len(ranges)), results=[None] * len(ranges),
+                                   pending=len(ranges))
+                        for chunk, ((start, end), part) in enumerate(zip(ranges, job['parts'])):
+                            pool.submit((i, chunk), _extract_task, library, str(pdf_file), start, end, part,
+                                        time_budget, False)
+                        continue
+                
+                job['results'][chunk or 0] = result
+                job['error'] = job['error'] or error
+                job['pending'] -= 1
+                if job['pending']:
+                    continue
+                page_stats = file_page_stats(job['results'])
+                if job['error']:
+                    finished[i] = (None, None, f"{pdf_file.name}: {job['error']}", page_stats)
+                else:
+                    try:
+                        extraction = combine(pdf_file, job['parts'], job['results'])
+                    except Exception as e:
+                        finished[i] = (None, None, f"{pdf_file.name}: {str(e)}", page_stats)
+                    else:
+                        if len(job['results']) == 1:
+                            # Parsed along with the extraction
+                            finished[i] = (extraction, job['results'][0][2], None, page_stats)
+                        else:
+                            # The parsers need the whole text - parse it in a worker too
+                            job['extraction'] = (extraction, page_stats)
+                            txt_file = Path(output_folder) / f"{_output_stem(pdf_file)}.txt" if streaming else None
+                            pool.submit((i, 'records'), _parse_task, extraction,
+                                        str(txt_file) if txt_file else None, time_budget)
+                            continue
+            
+            while next_index in finished:
+                yield (pdf_files[next_index],) + finished.pop(next_index)
+                next_index += 1
+    finally:
+        # Also kills extractions still running if the caller stopped early
+        pool.close()
+        for job in jobs:
+            _remove_parts(job['parts'])
+
+
+def _join_parts(parts, results, txt_file):
+    """
+    Join the streamed parts of one PDF into txt_file, a block at a time.
+    
+    Returns:
+        tuple: (pages, text_chars) - pages as [page number, byte offset, byte length]
+    """
+    pages = []
+    text_chars = 0
+    offset = 0
+    tmp_file = f"{txt_file}.tmp"
+    with open(tmp_file, 'wb') as out:
+        for part, (part_pages, part_chars) in zip(parts, results):
+            pages.extend([number, offset + start, length] for number, start, length in part_pages)
+            text_chars += part_chars
+            with open(part, 'rb') as f:
+                shutil.copyfileobj(f, out)
+            offset = out.tell()
+    os.replace(tmp_file, txt_file)
+    _remove_parts(parts)
+    return pages, text_chars
+
+
+def _remove_parts(parts):
+    for part in parts:
+        if part is not None:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+
+
+def _page_ranges(library, pdf_path, chunk_size):
+    """[(start, end), ...] page ranges covering the document; [(0, None)] if it is small"""
+    page_count = _page_count(library, pdf_path)
+    if page_count <= chunk_size:
+        return [(0, None)]
+    return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+
+def _file_hash(path):
+    """SHA-256 hex digest of a file (or archive member), read in blocks"""
+    digest = hashlib.sha256()
+    with open_data_file(str(path)) as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _output_stem(pdf_file):
+    """
+    Base name of a PDF's outputs: the PDF's own stem, or for a PDF inside an
+    archive <archive name>__<member path> (e.g. a.zip__labs__report), so
+    same-named PDFs in different archives don't overwrite each other
+    """
+    archive_path, member = split_member_path(str(pdf_file))
+    if member is None:
+        return Path(pdf_file).stem
+    return f"{os.path.basename(archive_path)}__{os.path.splitext(member)[0].replace('/', '__')}"
+
+
+def _output_names(pdf_file, compression=None):
+    stem = _output_stem(pdf_file)
+    suffix = COMPRESSION_SUFFIXES.get(compression, '')
+    return [f"{stem}.txt{suffix}", f"{stem}.json{suffix}"]
+
+
+def _new_stamp(pdf_file, compression=None, library=None):
+    """Manifest entry for a PDF just converted (for an archive member, mtime_ns holds its CRC-32)"""
+    size, mtime_ns = file_fingerprint(str(pdf_file))
+    return {
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'sha256': _file_hash(pdf_file),
+        'outputs': _output_names(pdf_file, compression),
+        'library': library,
+    }
+
+
+def _file_stamp(pdf_file, entry, output_folder):
+    """
+    The manifest entry for pdf_file if its outputs are up to date, else None.
+    A PDF whose mtime changed but whose content did not (copied, touched) is
+    still up to date; its entry is returned with the new mtime.
+    """
+    if not entry or not all((output_folder / name).exists() for name in entry.get('outputs', ())):
+        return None
+    try:
+        size, mtime_ns = file_fingerprint(str(pdf_file))
+        if size != entry.get('size'):
+            return None
+        if mtime_ns == entry.get('mtime_ns'):
+            return entry
+        if _file_hash(pdf_file) != entry.get('sha256'):
+            return None
+    except OSError:
+        return None
+    return dict(entry, mtime_ns=mtime_ns)
+
+
+def _read_manifest(output_folder):
+    """
+    {pdf name: {size, mtime_ns, sha256, outputs, library}} from the last conversion, or {}.
+    PDFs that failed have no outputs, and the error and [timeout, memory
+    limit] they failed with.
+    """
+    try:
+        with open(Path(output_folder) / CONVERSION_MANIFEST, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if saved.get('converter_version') != CONVERTER_VERSION:
+        return {}
+    return saved.get('files', {})
+
+
+def _write_manifest(output_folder, manifest):
+    path = Path(output_folder) / CONVERSION_MANIFEST
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'converter_version': CONVERTER_VERSION, 'files': manifest}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Without a manifest the next run just converts everything again
+        pass
+
+
+def convert_pdf_file(pdf_file, output_folder, streaming=False, time_budget=None, timeout=None, memory_limit_mb=None,
+                     adaptive=False, compression=None):
+    """
+    Convert one PDF to a .txt and a .json file in output_folder (compressed
+    with compression, as for convert_pdfs_to_json)
+    
+    Returns:
+        str: error message, or None if the file was converted
+    """
+    pdf_file = Path(pdf_file)
+    output_folder = Path(output_folder)
+    library = _pdf_library(adaptive)
+    if not library:
+        return NO_LIBRARY_ERROR
+    error = compression_error(compression)
+    if error:
+        return error
+    
+    extracted = _iter_extracted([pdf_file], library, output_folder, streaming=streaming,
+                                timeout=timeout, memory_limit_mb=memory_limit_mb, time_budget=time_budget)
+    try:
+        pdf_file, extraction, records, error, page_stats = next(extracted)
+    finally:
+        # Stops the worker process
+        extracted.close()
+    if error:
+        return error
+    return _write_outputs(pdf_file, output_folder, extraction, records, streaming, compression)
+
+
+def _write_outputs(pdf_file, output_folder, extraction, records, streaming=False, compression=None):
+    """
+    Write the .json (and, unless streamed already, the .txt) for one PDF's
+    extraction and the records parsed from it; returns an error message or None
+    """
+    pdf_file = Path(pdf_file)
+    output_folder = Path(output_folder)
+    if streaming:
+        error = _write_streamed_json(pdf_file, output_folder, *extraction, records, compression)
+        if not error:
+            _remove_other_outputs(pdf_file, output_folder, compression)
+        return error
+    
+    text = extraction
+    try:
+        if not text or len(text.strip()) < 10:
+            return f"{pdf_file.name}: Could not extract text (file may be scanned/image-based)"
+        
+        txt_name, json_name = _output_names(pdf_file, compression)
+        
+        # Save as text file
+        with open_compressed(output_folder / txt_name, compression) as f:
+            f.write(text.encode('utf-8'))
         
-        def convert_with_pdfplumber(pdf_path):
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-            return text
+        # Save as JSON - compressed outputs refer to the .txt instead of
+        # holding a second copy of the text
+        json_data = _parse_medical_text_to_json(text, pdf_file.stem, records,
+                                                text_file=txt_name if compression else None)
+        _write_json(output_folder / json_name, json_data, compression)
         
-        return convert_with_pdfplumber
+    except Exception as e:
+        return f"{pdf_file.name}: {str(e)}"
+    
+    _remove_other_outputs(pdf_file, output_folder, compression)
+    return None
+
+
+def _write_streamed_json(pdf_file, output_folder, pages, text_chars, records, compression=None):
+    """
+    Write the .json of a PDF whose text was streamed to its .txt (then
+    compressed, with compression), with the records parsed from it
+    """
+    txt_file = output_folder / f"{_output_stem(pdf_file)}.txt"
+    txt_name, json_name = _output_names(pdf_file, compression)
+    try:
+        if text_chars < 10:
+            os.remove(txt_file)
+            return f"{pdf_file.name}: Could not extract text (file may be scanned/image-based)"
+        
+        json_data = {
+            "source_file": pdf_file.stem,
+            # The text is in the .txt next to this file (loaded from there);
+            # page offsets are into the text as decompressed
+            "text_file": txt_name,
+            "pages": pages,
+            "metadata": {
+                "conversion_method": "automated_pdf_extraction",
+                "streamed": True
+            }
+        }
+        if records is not None:
+            json_data["records"] = records
+        if compression:
+            with open(txt_file, 'rb') as src, open_compressed(output_folder / txt_name, compression) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.remove(txt_file)
+        _write_json(output_folder / json_name, json_data, compression)
+    
+    except Exception as e:
+        return f"{pdf_file.name}: {str(e)}"
+    
+    return None
+
+
+def _write_json(json_file, json_data, compression=None):
+    """Write an output .json - indented when plain, compact when compressed"""
+    if compression:
+        with open_compressed(json_file, compression) as f:
+            f.write(json.dumps(json_data, separators=(',', ':')).encode('utf-8'))
+    else:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(json_data, f, indent=2)
+
+
+def _all_output_names(pdf_file):
+    """Names of a PDF's outputs with and without each compression"""
+    names = []
+    for compression in (None,) + tuple(COMPRESSION_SUFFIXES):
+        names.extend(_output_names(pdf_file, compression))
+    return names
+
+
+def _remove_other_outputs(pdf_file, output_folder, compression=None):
+    """Delete a PDF's outputs left from converting it with another compression (else loaded twice)"""
+    current = _output_names(pdf_file, compression)
+    for name in _all_output_names(pdf_file):
+        if name not in current:
+            try:
+                os.remove(Path(output_folder) / name)
+            except OSError:
+                pass
+
+
+def remove_converted_files(pdf_file, output_folder):
+    """
+    Delete the .txt and .json (compressed or not) made from a PDF that is
+    gone - or, for a .zip that is gone, from every PDF it held
+    """
+    if is_archive(str(pdf_file)):
+        prefix = f"{os.path.basename(str(pdf_file))}__"
+        try:
+            names = [name for name in os.listdir(output_folder) if name.startswith(prefix)]
+        except OSError:
+            names = []
+    else:
+        names = _all_output_names(pdf_file)
+    for name in names:
+        try:
+            os.remove(Path(output_folder) / name)
+        except OSError:
+            pass
+
+
+def _pdf_library(adaptive=False):
+    """
+    Name of the PDF library to extract with, or None - "adaptive" (PyPDF2
+    for a first pass, pdfplumber for the pages that need it) if adaptive is
+    set and both are installed
+    """
+    
+    # Try pdfplumber first (best quality)
+    try:
+        import pdfplumber
+        has_pdfplumber = True
     except ImportError:
-        pass
+        has_pdfplumber = False
     
     # Try PyPDF2 as fallback
     try:
         from PyPDF2 import PdfReader
-        
-        def convert_with_pypdf2(pdf_path):
-            text = ""
-            reader = PdfReader(pdf_path)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-            return text
-        
-        return convert_with_pypdf2
+        has_pypdf2 = True
     except ImportError:
-        pass
+        has_pypdf2 = False
     
+    if has_pdfplumber and has_pypdf2 and adaptive:
+        return "adaptive"
+    if has_pdfplumber:
+        return "pdfplumber"
+    if has_pypdf2:
+        return "PyPDF2"
     return None
 
 
-def _parse_medical_text_to_json(text, filename):
+def classify_page(text):
+    """Kind of a page from its text - 'results', 'vitals', 'procedures' or 'noise' (None if it has no text)"""
+    if not text or not text.strip():
+        return None
+    for kind, keywords in PAGE_SIGNATURES:
+        if any(keyword in text for keyword in keywords):
+            return kind
+    return 'noise'
+
+
+def _new_page_stats():
+    """Page counts and extraction times, summed over page ranges and files"""
+    stats = {'pages': 0, 'skipped': 0, 'layout_pages': 0, 'fast_seconds': 0.0, 'layout_seconds': 0.0}
+    for kind, keywords in PAGE_SIGNATURES:
+        stats[kind] = 0
+    stats['noise'] = 0
+    return stats
+
+
+def _add_page_stats(total, stats):
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+
+
+def _seconds_saved(page_stats):
+    """
+    Estimated seconds adaptive extraction saved over running pdfplumber on
+    every page (pdfplumber time per page is taken from the pages it did run
+    on); None if it ran on no page
+    """
+    if not page_stats['layout_pages']:
+        return None
+    per_page = page_stats['layout_seconds'] / page_stats['layout_pages']
+    return page_stats['pages'] * per_page - page_stats['fast_seconds'] - page_stats['layout_seconds']
+
+
+def _pdf_source(pdf_path):
+    """What the PDF libraries open: the path, or for an archive member its bytes in memory"""
+    if is_member_path(pdf_path):
+        return io.BytesIO(read_data_file(pdf_path))
+    return pdf_path
+
+
+def _page_count(library, pdf_path):
+    """Number of pages in a PDF"""
+    # The adaptive first pass is PyPDF2, which counts pages without parsing them
+    if library == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(_pdf_source(pdf_path)) as pdf:
+            return len(pdf.pages)
+    
+    from PyPDF2 import PdfReader
+    return len(PdfReader(_pdf_source(pdf_path)).pages)
+
+
+def _iter_page_texts(library, pdf_path, start=0, end=None, page_stats=None):
+    """
+    Yield (page number, text) for the pages start..end that have text, one
+    page at a time; page counts and extraction times are added to page_stats
+    """
+    if page_stats is None:
+        page_stats = _new_page_stats()
+    
+    if library == "adaptive":
+        yield from _iter_adaptive_page_texts(pdf_path, start, end, page_stats)
+        return
+    
+    if library == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(_pdf_source(pdf_path)) as pdf:
+            for number, page in enumerate(pdf.pages[start:end], start + 1):
+                page_text = page.extract_text()
+                # Let go of the page's parsed layout before the next one
+                page.flush_cache()
+                page_stats['pages'] += 1
+                if page_text:
+                    yield number, page_text
+        return
+    
+    from PyPDF2 import PdfReader
+    reader = PdfReader(_pdf_source(pdf_path))
+    for number, page in enumerate(reader.pages[start:end], start + 1):
+        page_text = page.extract_text()
+        page_stats['pages'] += 1
+        if page_text:
+            yield number, page_text
+
+
+def _iter_adaptive_page_texts(pdf_path, start, end, page_stats):
+    """_iter_page_texts for "adaptive": PyPDF2 text for noise pages, pdfplumber for the rest"""
+    import pdfplumber
+    from PyPDF2 import PdfReader
+    
+    source = _pdf_source(pdf_path)
+    reader = PdfReader(source)
+    # pdfplumber gets its own stream - the two readers seek independently
+    with pdfplumber.open(io.BytesIO(source.getvalue()) if isinstance(source, io.BytesIO) else source) as pdf:
+        for number, page in enumerate(reader.pages[start:end], start + 1):
+            started = time.perf_counter()
+            page_text = page.extract_text()
+            page_stats['fast_seconds'] += time.perf_counter() - started
+            page_stats['pages'] += 1
+            
+            kind = classify_page(page_text)
+            if kind is not None:
+                page_stats[kind] += 1
+            if kind is None or kind in LAYOUT_PAGE_KINDS:
+                # Holds records (or PyPDF2 found no text) - worth the layout extractor
+                started = time.perf_counter()
+                layout_page = pdf.pages[number - 1]
+                page_text = layout_page.extract_text()
+                layout_page.flush_cache()
+                page_stats['layout_seconds'] += time.perf_counter() - started
+                page_stats['layout_pages'] += 1
+            else:
+                page_stats['skipped'] += 1
+            
+            if page_text:
+                yield number, page_text
+
+
+def _extract_pages(library, pdf_path, start=0, end=None, page_stats=None):
+    """Text of pages start..end of a PDF"""
+    pages = _iter_page_texts(library, pdf_path, start, end, page_stats)
+    return "".join(page_text + "\n\n" for _, page_text in pages)
+
+
+def _stream_pages(library, pdf_path, txt_path, start=0, end=None, page_stats=None):
+    """
+    Write the text of pages start..end to txt_path as each page is extracted
+    
+    Returns:
+        tuple: (pages, text_chars) - pages as [page number, byte offset, byte
+        length] in txt_path, text_chars the non-blank length of the text
+    """
+    pages = []
+    text_chars = 0
+    with open(txt_path, 'wb') as f:
+        for number, page_text in _iter_page_texts(library, pdf_path, start, end, page_stats):
+            data = page_text.encode('utf-8')
+            pages.append([number, f.tell(), len(data)])
+            f.write(data)
+            f.write(b"\n\n")
+            text_chars += len(page_text.strip())
+    return pages, text_chars
+
+
+def _parse_medical_text_to_json(text, filename, records=None, text_file=None):
     """
-    Parse medical record text into JSON format
-    This is a basic parser - can be enhanced based on specific formats
+    Parse medical record text into JSON format - the text (or, given
+    text_file, the name of the file holding it) plus the records the
+    loader's parsers found in it (parsed in the extraction worker)
     """
     
     # Basic structure
-    json_data = {
-        "source_file": filename,
-        "raw_text": text,
-        "tests": [],
-        "metadata": {
-            "conversion_method": "automated_pdf_extraction"
-        }
+    json_data = {"source_file": filename}
+    if text_file:
+        json_data["text_file"] = text_file
+    else:
+        json_data["raw_text"] = text
+    json_data["metadata"] = {
+        "conversion_method": "automated_pdf_extraction"
     }
     
-    # Try to extract test results (basic pattern matching)
-    lines = text.split('\n')
-    
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Look for patterns like "Test Name: Value Unit Range"
-        # This is a simple parser - enhance based on your PDF formats
-        
-        # Common lab test patterns
-        if any(keyword in line.lower() for keyword in ['glucose', 'cholesterol', 'hemoglobin', 'wbc', 'rbc']):
-            # Try to parse test information
-            test_entry = {
-                "Test": line,
-                "Value": "",
-                "Unit": "",
-                "Reference Range": "",
-                "Status": "",
-                "Date": "",
-                "raw_line": line
-            }
-            json_data["tests"].append(test_entry)
+    if records is not None:
+        json_data["records"] = records
     
     return json_data
 
 
+def _parse_records(text, time_budget=None):
+    """
+    Records of a document in the form load_all_tests reads back, or None if
+    parsing failed (the loader then parses the text itself)
+    """
+    try:
+        file_results, record_types = parse_text(text, time_budget=time_budget)
+    except MemoryError:
+        # Past the worker's memory cap - fails the PDF like an extraction would
+        raise
+    except Exception as e:
+        print(f"Could not parse records: {e}")
+        return None
+    return {
+        "parser_version": PARSER_VERSION,
+        "record_types": record_types,
+        "results": file_results
+    }
+
+
 def install_pdf_library():
     """
     Install PDF processing library
@@ -0,0 +1,172 @@
+"""
+record_store.py - Optional SQLite store of parsed records for large archives
+"""
+import os
+import json
+import sqlite3
+import threading
+
+from records import Record, parse_date_ordinal, since_ordinal
+from parse_cache import folder_key
+
+# Name of the database file created next to the data folder - one per
+# folder (<prefix><folder key>.sqlite3), so folders that share a parent
+# never see or delete each other's records
+STORE_FILE_PREFIX = ".records-"
+
+# Statuses format_abnormal_tests reports (kept in step with the formatters)
+ABNORMAL_STATUSES = ('Low', 'High', 'Critical')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime INTEGER,
+    record_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    test_name TEXT NOT NULL,
+    test_key TEXT NOT NULL,
+    date_ordinal INTEGER,
+    status TEXT,
+    type TEXT,
+    source TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_test ON records (test_key, date_ordinal);
+CREATE INDEX IF NOT EXISTS records_date ON records (date_ordinal);
+CREATE INDEX IF NOT EXISTS records_status ON records (status, date_ordinal);
+CREATE INDEX IF NOT EXISTS records_type ON records (type, date_ordinal);
+CREATE INDEX IF NOT EXISTS records_source ON records (source);
+"""
+
+
+def default_store_path(results_folder):
+    """Return the database path of the given data folder (next to it)"""
+    parent = os.path.dirname(os.path.abspath(results_folder))
+    return os.path.join(parent, f"{STORE_FILE_PREFIX}{folder_key(results_folder)}.sqlite3")
+
+
+class RecordStore:
+    """
+    Parsed records in an SQLite database, indexed on test name, date,
+    status and record type.
+
+    Each source file's records are replaced as a unit, so the loader can
+    write file by file and skip files whose size and mtime are unchanged.
+    Queries return records.Record objects, the same as all_tests holds.
+    """
+
+    def __init__(self, db_path, parser_version):
+        self.db_path = db_path
+        self.parser_version = parser_version
+        # Written by the loader thread, queried by the GUI thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'parser_version'").fetchone()
+            if row is None or row[0] != str(parser_version):
+                # Records from an older parser are stale - start over
+                self._conn.execute("DELETE FROM records")
+                self._conn.execute("DELETE FROM files")
+                self._conn.execute("DELETE FROM meta WHERE key = 'manifest'")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('parser_version', ?)",
+                    (str(parser_version),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_current(self, source, size, mtime_ns):
+        """True if source was stored with this size and mtime"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime FROM files WHERE source = ?", (source,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def add_file(self, source, file_results, size=None, mtime_ns=None):
+        """Replace the records of one file ({test_name: [entries]}) in a single transaction"""
+        rows = []
+        for test_name, entries in file_results.items():
+            test_key = test_name.lower()
+            for entry in entries:
+                ordinal = getattr(entry, 'date_ordinal', None)
+                if ordinal is None:
+                    ordinal = parse_date_ordinal(entry.get('Date'))
+                rows.append((test_name, test_key, ordinal, entry.get('Status'), entry.get('Type'),
+                             source, json.dumps(entry, separators=(',', ':'))))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM meta WHERE key = 'manifest'")
+            self._conn.execute("DELETE FROM records WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT INTO records (test_name, test_key, date_ordinal, status, type, source, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (source, size, mtime, record_count) VALUES (?, ?, ?, ?)",
+                (source, size, mtime_ns, len(rows)))
+
+    def remove_file(self, source):
+        """Drop every record that came from source"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM meta WHERE key = 'manifest'")
+            self._conn.execute("DELETE FROM records WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM files WHERE source = ?", (source,))
+
+    def retain_files(self, sources):
+        """Drop files (and their records) that are not in sources - e.g. deleted from the folder"""
+        keep = set(sources)
+        with self._lock:
+            stored = [row[0] for row in self._conn.execute("SELECT source FROM files")]
+        for source in stored:
+            if source not in keep:
+                self.remove_file(source)
+
+    def folder_manifest(self):
+        """
+        The snapshot.folder_manifest() the stored records were marked as
+        complete for, or None - any file added or removed since clears it
+        """
+        rows = self._query("SELECT value FROM meta WHERE key = 'manifest'")
+        return json.loads(rows[0][0]) if rows else None
+
+    def set_folder_manifest(self, manifest):
+        """Mark the stored records as those of every file in manifest"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('manifest', ?)",
+                (json.dumps(manifest, separators=(',', ':')),))
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _records(self, sql, params=()):
+        """{test_name: [Record]} for rows of (test_name, source, data), in row order"""
+        grouped = {}
+        for test_name, source, data in self._query(sql, params):
+            grouped.setdefault(test_name, []).append(Record(json.loads(data), source=source))
+        return grouped
+
+    def abnormal(self, since=None, statuses=ABNORMAL_STATUSES):
+        """
+        {test_name: [Record]} with a Status in statuses, optionally only
+        from a date on (a year like 2022 or a date string).
+        Served from the (status, date) index rather than a scan.
+        """
+        placeholders = ', '.join('?' for _ in statuses)
+        sql = f"SELECT test_name, source, data FROM records WHERE status IN ({placeholders})"
+        params = list(statuses)
+        ordinal = since_ordinal(since)
+        if ordinal is not None:
+            sql += " AND date_ordinal >= ?"
+            params.append(ordinal)
+        sql += " ORDER BY id"
+        return self._records(sql, params)
@@ -0,0 +1,139 @@
+"""
+records.py - Result entries with their date and value parsed once
+"""
+from datetime import date, datetime
+from functools import lru_cache
+
+# Date formats seen in exports, most common first
+DATE_FORMATS = ('%m/%d/%Y', '%Y-%m-%d', '%Y/%m/%d')
+
+
+@lru_cache(maxsize=65536)
+def _parse_date_ordinal(date_str):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).toordinal()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_date_ordinal(date_str):
+    """Proleptic ordinal of a date string, or None if it isn't a known format (memoized)"""
+    if not date_str:
+        return None
+    return _parse_date_ordinal(str(date_str))
+
+
+def since_ordinal(value):
+    """Date ordinal for a 'since' bound - a year (2022), a date string, or None"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return parse_date_ordinal(f"{value:04d}-01-01")
+    text = str(value).strip()
+    if text.isdigit() and len(text) == 4:
+        text = f"{text}-01-01"
+    return parse_date_ordinal(text)
+
+
+def parse_numeric(value):
+    """
+    Parse a result value.
+
+    Returns:
+        tuple: (number, censor) - censor is '<' or '>' for values like "<5",
+        None for plain numbers; (None, None) if the value isn't numeric
+    """
+    if value is None:
+        return None, None
+    try:
+        return float(value), None
+    except (ValueError, TypeError):
+        pass
+
+    text = str(value).strip()
+    if text[:1] in ('<', '>'):
+        try:
+            return float(text[1:].lstrip('=')), text[0]
+        except ValueError:
+            pass
+    return None, None
+
+
+class Record(dict):
+    """
+    A result entry - still a plain dict of strings ('Date', 'Value', ...) -
+    with its date and numeric value parsed when the record is created.
+
+    Attributes:
+        date_ordinal: date.toordinal() of 'Date', or None if unparseable
+        numeric_value: float of 'Value' ("<5" gives 5.0), or None
+        censor: '<' or '>' for censored values, else None
+        source: path of the file the record was loaded from, if known
+    """
+
+    __slots__ = ('date_ordinal', 'numeric_value', 'censor', 'source')
+
+    def __init__(self, *args, source=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.date_ordinal = parse_date_ordinal(self.get('Date'))
+        self.numeric_value, self.censor = parse_numeric(self.get('Value'))
+        self.source = source
+
+    @classmethod
+    def restore(cls, data, source, date_ordinal, numeric_value, censor):
+        """Rebuild a Record whose fields were parsed before (e.g. read back from a snapshot)"""
+        record = cls.__new__(cls)
+        dict.update(record, data)
+        record.date_ordinal = date_ordinal
+        record.numeric_value = numeric_value
+        record.censor = censor
+        record.source = source
+        return record
+
+    def __reduce__(self):
+        # Rebuild from the dict contents; the parsed fields are derived
+        return _rebuild_record, (dict(self), self.source)
+
+    @property
+    def date(self):
+        """The parsed date, or None"""
+        return date.fromordinal(self.date_ordinal) if self.date_ordinal is not None else None
+
+    @property
+    def is_number(self):
+        """True if 'Value' is a plain number (float() would accept it)"""
+        return self.numeric_value is not None and self.censor is None
+
+
+def _rebuild_record(data, source):
+    return Record(data, source=source)
+
+
+def as_record(entry):
+    """Return entry as a Record, converting plain dicts"""
+    return entry if isinstance(entry, Record) else Record(entry)
+
+
+def date_sort_key(record):
+    """Sort key for records by date; unparseable dates sort as the oldest"""
+    return record.date_ordinal if record.date_ordinal is not None else 0
+
+
+# Words in a Status or Flag field that mark a result as abnormal
+ABNORMAL_STATUS_KEYWORDS = ('ABNORMAL', 'HIGH', 'LOW', 'OUT OF RANGE', 'CRITICAL')
+ABNORMAL_FLAG_KEYWORDS = ('ABNORMAL', 'HIGH', 'LOW', 'H', 'L', 'CRITICAL')
+
+
+@lru_cache(maxsize=4096)
+def status_is_abnormal(status):
+    """True if a Status string mentions an abnormal keyword (memoized)"""
+    status = status.upper()
+    return any(keyword in status for keyword in ABNORMAL_STATUS_KEYWORDS)
+
+
+def flag_is_abnormal(flag):
+    """True if a Flag string mentions an abnormal keyword"""
+    flag = flag.upper()
+    return any(keyword in flag for keyword in ABNORMAL_FLAG_KEYWORDS)
@@ -0,0 +1,139 @@
+"""
+reference_range.py - Parse 'Reference Range' strings once and share the result
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Range kinds
+RANGE = 'range'                  # "3.5 - 11.0"
+LOWER_BOUND = 'lower'            # ">59" - values must stay above it
+UPPER_BOUND = 'upper'            # "<200" - values must stay below it
+BLOOD_PRESSURE = 'bp'            # "90-120/60-80" - systolic/diastolic
+UNPARSEABLE = 'unparseable'
+
+_BP_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)'
+)
+
+
+class ReferenceRange(namedtuple('ReferenceRange', 'kind low high diastolic_low diastolic_high')):
+    """A parsed reference range; low/high are None where there is no bound"""
+
+    __slots__ = ()
+
+    def classify(self, value):
+        """
+        Compare a result value with this range.
+
+        Returns:
+            str: 'Low', 'High' or 'Normal', or None if the two can't be compared
+        """
+        if self.kind == BLOOD_PRESSURE:
+            reading = parse_blood_pressure(value)
+            if reading is None:
+                return None
+            systolic, diastolic = reading
+            if systolic > self.high or diastolic > self.diastolic_high:
+                return 'High'
+            if systolic < self.low or diastolic < self.diastolic_low:
+                return 'Low'
+            return 'Normal'
+
+        if self.kind == UNPARSEABLE:
+            return None
+
+        number = parse_value(value)
+        if number is None:
+            return None
+
+        if self.kind == RANGE:
+            if number < self.low:
+                return 'Low'
+            if number > self.high:
+                return 'High'
+        elif self.kind == LOWER_BOUND:
+            if number <= self.low:
+                return 'Low'
+        elif self.kind == UPPER_BOUND:
+            if number >= self.high:
+                return 'High'
+        return 'Normal'
+
+
+UNPARSEABLE_RANGE = ReferenceRange(UNPARSEABLE, None, None, None, None)
+
+
+def _to_float(token):
+    """float() of a token with '<'/'>' removed, or None"""
+    try:
+        return float(token.replace('<', '').replace('>', ''))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse(text):
+    match = _BP_PATTERN.fullmatch(text)
+    if match:
+        return ReferenceRange(BLOOD_PRESSURE, *map(float, match.groups()))
+
+    if '-' in text:
+        parts = text.split('-')
+        if len(parts) != 2:
+            return UNPARSEABLE_RANGE
+        # "Ref 3.5 - 11.0 10*3/uL": the numbers next to the dash are the bounds
+        low_tokens, high_tokens = parts[0].split(), parts[1].split()
+        low = _to_float(low_tokens[-1]) if low_tokens else None
+        high = _to_float(high_tokens[0]) if high_tokens else None
+        if low is None or high is None:
+            return UNPARSEABLE_RANGE
+        return ReferenceRange(RANGE, low, high, None, None)
+
+    if text.startswith('>') or text.startswith('<'):
+        tokens = text[1:].split()
+        bound = _to_float(tokens[0]) if tokens else None
+        if bound is None:
+            return UNPARSEABLE_RANGE
+        if text[0] == '>':
+            return ReferenceRange(LOWER_BOUND, bound, None, None, None)
+        return ReferenceRange(UPPER_BOUND, None, bound, None, None)
+
+    return UNPARSEABLE_RANGE
+
+
+def parse_reference_range(ref_range):
+    """
+    Parse a reference range string (memoized, so equal strings share one object).
+
+    Returns:
+        ReferenceRange: kind is one of RANGE, LOWER_BOUND, UPPER_BOUND,
+        BLOOD_PRESSURE or UNPARSEABLE
+    """
+    if not ref_range:
+        return UNPARSEABLE_RANGE
+    return _parse(str(ref_range).strip())
+
+
+@lru_cache(maxsize=16384)
+def _parse_value(text):
+    tokens = text.split()
+    return _to_float(tokens[0]) if tokens else None
+
+
+def parse_value(value):
+    """Leading number of a result value ("<5", "5.2 H"), or None (memoized)"""
+    if value is None or value == '':
+        return None
+    return _parse_value(str(value))
+
+
+def parse_blood_pressure(value):
+    """(systolic, diastolic) from a value like "120/80", or None"""
+    parts = str(value).split('/')
+    if len(parts) != 2:
+        return None
+    systolic, diastolic = parse_value(parts[0]), parse_value(parts[1])
+    if systolic is None or diastolic is None:
+        return None
+    return systolic, diastolic
@@ -0,0 +1,144 @@
+"""
+series.py - Columnar (NumPy) time series per test, built from all_tests
+"""
+from datetime import date
+
+import numpy as np
+
+from records import as_record, status_is_abnormal
+from reference_range import parse_reference_range, RANGE, LOWER_BOUND, UPPER_BOUND, BLOOD_PRESSURE
+
+# Status codes stored in TestSeries.status
+STATUS_CODES = {'Normal': 0, 'Low': 1, 'High': 2, 'Critical': 3}
+STATUS_OTHER = 4
+
+
+class TestSeries:
+    """
+    One test's results as parallel arrays, sorted by date (oldest first).
+
+    Attributes:
+        records: the Record objects, in array order
+        dates: int64 date ordinals (0 where the date is unknown)
+        values: float64 values, NaN where the value is not numeric
+        exact: bool, True where the value is a plain number (not "<5")
+        status: int8 STATUS_CODES (STATUS_OTHER for anything else)
+        sources: int32 index into SeriesStore.sources
+    """
+
+    def __init__(self, records, source_ids):
+        records = sorted((as_record(r) for r in records),
+                         key=lambda r: r.date_ordinal if r.date_ordinal is not None else 0)
+        count = len(records)
+        self.records = records
+
+        self.dates = np.fromiter(
+            (r.date_ordinal or 0 for r in records), dtype=np.int64, count=count)
+        self.values = np.fromiter(
+            (r.numeric_value if r.numeric_value is not None else np.nan for r in records),
+            dtype=np.float64, count=count)
+        self.exact = np.fromiter((r.is_number for r in records), dtype=bool, count=count)
+        self.status = np.fromiter(
+            (STATUS_CODES.get(r.get('Status'), STATUS_OTHER) for r in records), dtype=np.int8, count=count)
+        self.sources = np.fromiter(
+            (source_ids.setdefault(r.source, len(source_ids)) for r in records), dtype=np.int32, count=count)
+
+        self._abnormal = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def stats(self):
+        """(min, max, mean) of the values if every value is a plain number, else None"""
+        if len(self.records) < 2 or not self.exact.all():
+            return None
+        return float(self.values.min()), float(self.values.max()), float(self.values.mean())
+
+    def dated_numeric(self):
+        """Indexes of rows with both a known date and a numeric value, oldest first"""
+        return np.flatnonzero((self.dates > 0) & ~np.isnan(self.values))
+
+    def date_at(self, index):
+        """datetime.date of row index"""
+        return date.fromordinal(int(self.dates[index]))
+
+    def abnormal_mask(self, is_abnormal_value):
+        """
+        Boolean array: which rows is_abnormal_value(entry) would flag.
+
+        Status keywords and reference ranges are evaluated once per distinct
+        string and compared on whole arrays. Only rows the arrays can't decide
+        (a Flag field, blood pressure ranges, values that aren't plain numbers)
+        are passed to is_abnormal_value.
+        """
+        if self._abnormal is not None:
+            return self._abnormal
+
+        records = self.records
+        count = len(records)
+        status_index = {}
+        range_index = {}
+        status_ids = np.fromiter(
+            (status_index.setdefault(r.get('Status', ''), len(status_index)) for r in records),
+            dtype=np.int32, count=count)
+        range_ids = np.fromiter(
+            (range_index.setdefault(r.get('Reference Range', ''), len(range_index)) for r in records),
+            dtype=np.int32, count=count)
+        flagged = np.fromiter(('Flag' in r for r in records), dtype=bool, count=count)
+
+        # One row per distinct range string: low, high, inclusive bounds, needs a row check
+        ranges = [parse_reference_range(ref_range) for ref_range in range_index]
+        low = np.array([p.low if p.kind in (RANGE, LOWER_BOUND) else np.nan for p in ranges], dtype=np.float64)
+        high = np.array([p.high if p.kind in (RANGE, UPPER_BOUND) else np.nan for p in ranges], dtype=np.float64)
+        low_inclusive = np.array([p.kind == LOWER_BOUND for p in ranges], dtype=bool)
+        high_inclusive = np.array([p.kind == UPPER_BOUND for p in ranges], dtype=bool)
+        blood_pressure = np.array([p.kind == BLOOD_PRESSURE for p in ranges], dtype=bool)
+
+        status_abnormal = np.array([status_is_abnormal(status) for status in status_index], dtype=bool)[status_ids]
+        row_low, row_high = low[range_ids], high[range_ids]
+        values = self.values
+        with np.errstate(invalid='ignore'):
+            out_of_range = ((values < row_low) | (low_inclusive[range_ids] & (values == row_low))
+                            | (values > row_high) | (high_inclusive[range_ids] & (values == row_high)))
+        mask = status_abnormal | (self.exact & out_of_range)
+
+        # Values like "<5" or "5.2 H" are read by the range parser's own rules
+        undecided = ~status_abnormal & (flagged | blood_pressure[range_ids] | ~self.exact)
+        for i in np.flatnonzero(undecided):
+            mask[i] = bool(is_abnormal_value(records[i]))
+
+        self._abnormal = mask
+        return mask
+
+
+class SeriesStore:
+    """Columnar series for every test in all_tests, built per test on first use"""
+
+    def __init__(self, all_tests):
+        self.all_tests = all_tests
+        self._series = {}
+        # Source file path -> id used in TestSeries.sources
+        self.source_ids = {}
+
+    def get(self, test_name):
+        """TestSeries for test_name, or None if it isn't loaded"""
+        series = self._series.get(test_name)
+        if series is None:
+            results = self.all_tests.get(test_name)
+            if results is None:
+                return None
+            series = TestSeries(results, self.source_ids)
+            self._series[test_name] = series
+        return series
+
+    @property
+    def sources(self):
+        """Source file paths, indexed by the ids in TestSeries.sources"""
+        return sorted(self.source_ids, key=self.source_ids.get)
+
+    def invalidate(self, test_name=None):
+        """Drop cached series (all of them if test_name is None) after all_tests changes"""
+        if test_name is None:
+            self._series.clear()
+        else:
+            self._series.pop(test_name, None)
@@ -25,7 +25,9 @@ build_exe_options = {
     "include_files": [
         "config.py",
         "loader.py",
+        "parse_cache.py",
         "matcher.py",
+        "fulltext.py",
         "medical_formatter.py",
         "visualizer.py",
         "gui_widgets.py",
@@ -35,6 +37,14 @@ build_exe_options = {
         "gui_app.py",
         "pdf_converter.py",
         "parsers.py",
+        "reference_range.py",
+        "records.py",
+        "record_store.py",
+        "snapshot.py",
+        "watcher.py",
+        "worker_pool.py",
+        "archives.py",
+        "series.py",
         "medical_parsers.py",
         "normalizer.py",
         "formatter.py",
@@ -0,0 +1,357 @@
+"""
+snapshot.py - Binary snapshot of a loaded folder, memory-mapped on the next start
+"""
+import os
+import sys
+import json
+import math
+import mmap
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+
+from parsers import PARSER_VERSION
+from records import Record, as_record
+from fulltext import FullTextIndex
+from parse_cache import default_cache_folder, folder_key
+from archives import JSON_EXTENSIONS
+
+# Snapshot files written in the cache folder next to the data folder - one
+# per folder (<prefix><folder key>.bin), as sibling folders share the cache
+SNAPSHOT_PREFIX = "snapshot-"
+
+SNAPSHOT_MAGIC = b'MACSNAP\x01'
+SNAPSHOT_VERSION = 2
+
+# Per-user folder that remembers the last data folder opened
+if sys.platform == 'win32':
+    APP_DATA_FOLDER = os.path.join(os.getenv('APPDATA') or os.path.expanduser('~'), 'MedicalHealthAssistant')
+else:
+    APP_DATA_FOLDER = os.path.join(os.path.expanduser('~'), '.medical_health_assistant')
+LAST_FOLDER_FILE = 'last_folder'
+
+# Column typecodes; string columns hold ids into the string table (-1 = key
+# absent, _NONE_ID = the value is None)
+_INDEX = 'q'
+_ID = 'i'
+_DATE = 'i'
+_VALUE = 'd'
+_CENSOR = 'b'
+_CENSOR_CODES = {None: 0, '<': 1, '>': 2}
+_CENSOR_VALUES = (None, '<', '>')
+_NONE_ID = -2
+
+
+def default_snapshot_path(results_folder):
+    """Return the snapshot path for a data folder"""
+    return os.path.join(default_cache_folder(results_folder), f"{SNAPSHOT_PREFIX}{folder_key(results_folder)}.bin")
+
+
+def folder_manifest(results_folder):
+    """[[file name, size, mtime_ns], ...] of the folder's JSON files and ZIP archives, in load order"""
+    manifest = []
+    for fname in os.listdir(results_folder):
+        if fname.lower().endswith(JSON_EXTENSIONS + ('.zip',)):
+            st = os.stat(os.path.join(results_folder, fname))
+            manifest.append([fname, st.st_size, st.st_mtime_ns])
+    return manifest
+
+
+def remember_last_folder(folder):
+    """Record folder as the one to reopen on the next start"""
+    try:
+        os.makedirs(APP_DATA_FOLDER, exist_ok=True)
+        with open(os.path.join(APP_DATA_FOLDER, LAST_FOLDER_FILE), 'w', encoding='utf-8') as f:
+            f.write(os.path.abspath(folder))
+    except OSError:
+        pass
+
+
+def last_folder():
+    """The last data folder opened, or None if there isn't one (or it is gone)"""
+    try:
+        with open(os.path.join(APP_DATA_FOLDER, LAST_FOLDER_FILE), 'r', encoding='utf-8') as f:
+            folder = f.read().strip()
+    except OSError:
+        return None
+    return folder if folder and os.path.isdir(folder) else None
+
+
+class _StringTable:
+    """Interns strings while writing; each distinct string is stored once"""
+
+    def __init__(self):
+        self.ids = {}
+        self.data = bytearray()
+        self.offsets = array(_INDEX, [0])
+
+    def add(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[text] = string_id
+            self.data += text.encode('utf-8')
+            self.offsets.append(len(self.data))
+        return string_id
+
+
+def write_snapshot(path, results_folder, all_tests, text_index=None, abnormal_tests=None, manifest=None):
+    """
+    Write all_tests (and the text index and abnormal test names, if given)
+    to path. The snapshot records the folder manifest it was built from -
+    pass the folder_manifest() taken before loading, so files changed during
+    the load make the snapshot stale rather than wrong.
+
+    A SnapshotTests open on path must be closed first: a mapped file can't
+    be replaced on Windows.
+
+    Returns:
+        bool: True if the snapshot was written
+    """
+    strings = _StringTable()
+    fields = {}
+    shapes = {}
+    sources = {}
+    test_offsets = array(_INDEX, [0])
+    columns = {
+        'source': array(_ID), 'shape': array(_ID),
+        'date': array(_DATE), 'value': array(_VALUE), 'censor': array(_CENSOR),
+    }
+    field_columns = []
+    row_of = {}
+
+    test_names = list(all_tests.keys())
+    for test_name in test_names:
+        for entry in all_tests[test_name]:
+            record = as_record(entry)
+            row = len(columns['shape'])
+            row_of[id(entry)] = row
+
+            keys = tuple(record.keys())
+            columns['shape'].append(shapes.setdefault(keys, len(shapes)))
+            for key in keys:
+                if key not in fields:
+                    fields[key] = len(fields)
+                    field_columns.append(array(_ID, [-1]) * row)
+            for key, column in zip(fields, field_columns):
+                if key not in record:
+                    column.append(-1)
+                elif record[key] is None:
+                    column.append(_NONE_ID)
+                else:
+                    column.append(strings.add(str(record[key])))
+
+            columns['source'].append(sources.setdefault(record.source, len(sources)))
+            columns['date'].append(record.date_ordinal or 0)
+            columns['value'].append(record.numeric_value if record.numeric_value is not None else math.nan)
+            columns['censor'].append(_CENSOR_CODES.get(record.censor, 0))
+        test_offsets.append(len(columns['shape']))
+
+    text_docs = array(_ID)
+    if text_index is not None:
+        for doc in text_index.docs:
+            if doc is not None and id(doc[1]) in row_of:
+                text_docs.append(row_of[id(doc[1])])
+
+    sections = [
+        ('strings', bytes(strings.data), 'B'),
+        ('string_offsets', strings.offsets, _INDEX),
+        ('test_offsets', test_offsets, _INDEX),
+        ('text_docs', text_docs, _ID),
+    ]
+    sections += [(name, column, column.typecode) for name, column in columns.items()]
+    sections += [(f"field:{key}", column, _ID) for key, column in zip(fields, field_columns)]
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'parser_version': PARSER_VERSION,
+        'byteorder': sys.byteorder,
+        'folder': os.path.abspath(results_folder),
+        'manifest': manifest if manifest is not None else folder_manifest(results_folder),
+        'test_names': test_names,
+        'fields': list(fields),
+        'shapes': [[fields[key] for key in keys] for keys in shapes],
+        'sources': list(sources),
+        'abnormal_tests': abnormal_tests,
+        'sections': {},
+    }
+
+    # Section offsets are relative to the end of the header, 8-byte aligned
+    offset = 0
+    for name, data, typecode in sections:
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        header['sections'][name] = [offset, size, typecode]
+        offset += (size + 7) // 8 * 8
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    tmp_path = path + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, data, typecode in sections:
+                raw = data.tobytes() if isinstance(data, array) else data
+                f.write(raw)
+                f.write(b'\0' * (-len(raw) % 8))
+        os.replace(tmp_path, path)
+    except OSError:
+        # A snapshot is only a shortcut - loading normally still works
+        return False
+    return True
+
+
+def open_snapshot(path, results_folder):
+    """
+    Memory-map the snapshot at path if it still matches results_folder.
+
+    Returns:
+        SnapshotTests, or None if there is no usable snapshot (missing,
+        another format or parser version, written for another folder, or
+        the folder's files changed)
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if mapped[:8] != SNAPSHOT_MAGIC:
+            mapped.close()
+            return None
+        header_len = int.from_bytes(mapped[8:16], 'little')
+        header = json.loads(mapped[16:16 + header_len].decode('utf-8'))
+        if (header.get('version') != SNAPSHOT_VERSION
+                or header.get('parser_version') != PARSER_VERSION
+                or header.get('byteorder') != sys.byteorder
+                or header.get('folder') != os.path.abspath(results_folder)
+                or header.get('manifest') != folder_manifest(results_folder)):
+            mapped.close()
+            return None
+    except (OSError, ValueError):
+        mapped.close()
+        return None
+
+    return SnapshotTests(mapped, header, 16 + header_len)
+
+
+class SnapshotTests(Mapping):
+    """
+    Read-only all_tests backed by a memory-mapped snapshot.
+
+    Records of a test are built from the columns the first time the test is
+    looked up; strings are decoded once and shared.
+    """
+
+    def __init__(self, mapped, header, data_start):
+        self._mapped = mapped
+        view = memoryview(mapped)
+        # Every view of the map, released (last first) by close()
+        self._views = [view]
+        self._sections = {}
+        for name, (offset, size, typecode) in header['sections'].items():
+            section = view[data_start + offset:data_start + offset + size]
+            self._views.append(section)
+            if typecode != 'B':
+                section = section.cast(typecode)
+                self._views.append(section)
+            self._sections[name] = section
+
+        self.test_names = header['test_names']
+        self.fields = header['fields']
+        # Shape id -> ((key, field column), ...) in the record's key order
+        self._shape_fields = [tuple((self.fields[field], field) for field in shape) for shape in header['shapes']]
+        self.sources = header['sources']
+        # folder_manifest() of the files the snapshot was built from
+        self.manifest = header['manifest']
+        # Abnormal test names saved with the snapshot, or None
+        self.abnormal_tests = header['abnormal_tests']
+
+        self._test_index = {name: i for i, name in enumerate(self.test_names)}
+        self._strings = [None] * (len(self._sections['string_offsets']) - 1)
+        self._field_columns = [self._sections[f"field:{key}"] for key in self.fields]
+        self._merged = {}
+
+    def _string(self, string_id):
+        offsets = self._sections['string_offsets']
+        text = bytes(self._sections['strings'][offsets[string_id]:offsets[string_id + 1]]).decode('utf-8')
+        self._strings[string_id] = text
+        return text
+
+    def _records(self, start, end):
+        """Records for rows start..end, built from the column slices"""
+        s = self._sections
+        strings = self._strings
+        columns = [column[start:end].tolist() for column in self._field_columns]
+        sources = self.sources
+        records = []
+        for j, (shape, source, date_ordinal, value, censor) in enumerate(zip(
+                s['shape'][start:end].tolist(), s['source'][start:end].tolist(), s['date'][start:end].tolist(),
+                s['value'][start:end].tolist(), s['censor'][start:end].tolist())):
+            data = {}
+            for key, field in self._shape_fields[shape]:
+                string_id = columns[field][j]
+                if string_id == _NONE_ID:
+                    data[key] = None
+                    continue
+                text = strings[string_id]
+                data[key] = text if text is not None else self._string(string_id)
+            records.append(Record.restore(
+                data, sources[source], date_ordinal or None,
+                None if value != value else value, _CENSOR_VALUES[censor]))
+        return records
+
+    def close(self):
+        """
+        Unmap the snapshot file, so it can be rewritten or deleted (Windows
+        refuses while it is mapped). Records already looked up stay usable;
+        nothing else may be read afterwards.
+        """
+        self._sections = {}
+        self._field_columns = []
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mapped.close()
+
+    def __getitem__(self, test_name):
+        merged = self._merged.get(test_name)
+        if merged is None:
+            i = self._test_index[test_name]
+            offsets = self._sections['test_offsets']
+            merged = self._records(offsets[i], offsets[i + 1])
+            self._merged[test_name] = merged
+        return merged
+
+    def __iter__(self):
+        return iter(self.test_names)
+
+    def __len__(self):
+        return len(self.test_names)
+
+    def __contains__(self, test_name):
+        return test_name in self._test_index
+
+    def entry_count(self, test_name):
+        """Number of entries of test_name, from the offsets (nothing is decoded)"""
+        i = self._test_index[test_name]
+        offsets = self._sections['test_offsets']
+        return offsets[i + 1] - offsets[i]
+
+    def total_entries(self):
+        return self._sections['test_offsets'][-1]
+
+    def build_text_index(self):
+        """FullTextIndex over the saved narrative records, in their original order"""
+        text_index = FullTextIndex()
+        offsets = self._sections['test_offsets']
+        for row in self._sections['text_docs']:
+            # Rows are stored test by test; find the test holding this row
+            i = bisect_right(offsets, row) - 1
+            record = self[self.test_names[i]][row - offsets[i]]
+            text_index.add_record(self.test_names[i], record, record.source)
+        return text_index
+
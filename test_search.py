@@ -0,0 +1,36 @@
+"""
+test_search.py - Name and narrative search as the CLI and GUI combine them
+"""
+from fulltext import FullTextIndex
+# matcher.TestNameIndex is not imported by name, or pytest takes it for a test class
+import matcher
+
+
+def _index():
+    index = FullTextIndex()
+    index.add_file("notes.json", {
+        "Ultrasound Abdomen": [{
+            "Type": "Procedure",
+            "Value": "Ultrasound Abdomen",
+            "Status": "Liver shows hepatic steatosis. No focal lesion.",
+        }],
+        "Glucose": [{"Type": "Lab", "Value": "95"}],
+    })
+    return index
+
+
+def test_narrative_only_query():
+    """A query no test name matches still finds the narratives mentioning it"""
+    name_index = matcher.TestNameIndex(["Glucose", "Ultrasound Abdomen"])
+    matches = matcher.find_test("hepatic steatosis", name_index) or []
+    assert matches == []
+    hits = _index().search("hepatic steatosis", exclude_tests=matches)
+    assert [test_name for _, test_name, _ in hits] == ["Ultrasound Abdomen"]
+
+
+def test_name_matches_are_excluded():
+    """Records already shown by name are not repeated as narrative hits"""
+    name_index = matcher.TestNameIndex(["Glucose", "Ultrasound Abdomen"])
+    matches = matcher.find_test("ultrasound", name_index) or []
+    assert matches == ["Ultrasound Abdomen"]
+    assert _index().search("ultrasound", exclude_tests=matches) == []
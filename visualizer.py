@@ -3,8 +3,9 @@ visualizer.py - Create visualizations for medical test results
 """
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from datetime import datetime
 import tkinter as tk
+from reference_range import parse_reference_range
+from records import as_record, date_sort_key
 
 def can_visualize(results):
     """Check if results can be visualized (numeric values)"""
@@ -12,36 +13,48 @@ def can_visualize(results):
         return False
     
     # Check if we have numeric values
-    try:
-        for r in results[:3]:  # Check first 3 entries
-            float(r['Value'])
-        return True
-    except (ValueError, TypeError, KeyError):
-        return False
+    return all(as_record(r).is_number for r in results[:3])  # Check first 3 entries
+
 
+# Bar colors by series.STATUS_CODES (Normal, Low, High, Critical, other)
+STATUS_COLORS = ['#6bcf7f', '#ffd93d', '#ff6b6b', '#6bcf7f', '#6bcf7f']
 
-def create_trend_chart(parent_frame, results, test_name):
-    """Create a bar chart showing test trends over time"""
+
+def create_trend_chart(parent_frame, results, test_name, series=None):
+    """Create a bar chart showing test trends over time
+    
+    series (a series.TestSeries for the same results) supplies the sorted
+    dates, values and statuses as arrays.
+    """
     
     # Clear existing widgets in frame
     for widget in parent_frame.winfo_children():
         widget.destroy()
     
-    # Sort by date
-    sorted_results = sorted(
-        results,
-        key=lambda x: datetime.strptime(x['Date'], "%m/%d/%Y")
-    )
-    
-    # Extract data
-    dates = []
-    values = []
-    colors = []
-    
-    for r in sorted_results:
-        try:
+    if series is not None:
+        # Already sorted by date; keep plain numbers only
+        sorted_results = series.records
+        rows = series.exact.nonzero()[0]
+        dates = [sorted_results[i]['Date'] for i in rows]
+        values = series.values[rows].tolist()
+        colors = [STATUS_COLORS[code] for code in series.status[rows].tolist()]
+    else:
+        # Sort by date
+        sorted_results = sorted(
+            (as_record(r) for r in results),
+            key=date_sort_key
+        )
+        
+        # Extract data
+        dates = []
+        values = []
+        colors = []
+        
+        for r in sorted_results:
+            if not r.is_number:
+                continue
             dates.append(r['Date'])
-            values.append(float(r['Value']))
+            values.append(r.numeric_value)
             
             # Color based on status
             if r['Status'] == 'High':
@@ -50,8 +63,6 @@ def create_trend_chart(parent_frame, results, test_name):
                 colors.append('#ffd93d')  # Yellow
             else:
                 colors.append('#6bcf7f')  # Green
-        except (ValueError, TypeError):
-            continue
     
     if not values:
         no_data_label = tk.Label(
@@ -80,12 +91,11 @@ def create_trend_chart(parent_frame, results, test_name):
     
     # Add reference range if available
     if sorted_results[0].get('Reference Range'):
-        ref_range = sorted_results[0]['Reference Range']
+        parsed_range = parse_reference_range(sorted_results[0]['Reference Range'])
         try:
-            if '-' in ref_range:
-                parts = ref_range.split('-')
-                low = float(parts[0].strip())
-                high = float(parts[1].strip())
+            if parsed_range.low is not None and parsed_range.high is not None:
+                low = parsed_range.low
+                high = parsed_range.high
                 
                 # Add horizontal lines for reference range
                 ax.axhline(y=low, color='blue', linestyle='--', linewidth=1, alpha=0.5, label=f'Low: {low}')
@@ -0,0 +1,179 @@
+"""
+watcher.py - Watch data folders for added, changed and deleted files
+"""
+import os
+import threading
+
+try:
+    # Optional - native change notifications (inotify, FSEvents, ReadDirectoryChangesW)
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# File types the watcher reports
+WATCH_EXTENSIONS = ('.json', '.json.gz', '.json.zst', '.pdf', '.zip')
+
+# Seconds a changed file must stay the same before it is reported
+SETTLE_SECONDS = 0.5
+
+
+def scan_folder(folder, extensions=WATCH_EXTENSIONS):
+    """{path: (size, mtime_ns)} of the files with the given extensions directly in folder"""
+    state = {}
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return state
+    for name in names:
+        if name.lower().endswith(extensions):
+            path = os.path.join(folder, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Deleted between listdir and stat
+                continue
+            state[path] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def diff_scans(before, after):
+    """
+    Compare two scan_folder() results.
+
+    Returns:
+        tuple: (added, modified, removed) lists of paths
+    """
+    added = [path for path in after if path not in before]
+    modified = [path for path, stamp in after.items() if path in before and before[path] != stamp]
+    removed = [path for path in before if path not in after]
+    return added, modified, removed
+
+
+class _WakeHandler(FileSystemEventHandler):
+    """watchdog handler that only wakes the watcher thread; the scan finds what changed"""
+
+    def __init__(self, wake):
+        super().__init__()
+        self.wake = wake
+
+    def on_any_event(self, event):
+        self.wake.set()
+
+
+class FolderWatcher:
+    """
+    Calls on_change(added, modified, removed) from a background thread when
+    watched files in any of folders change.
+
+    With watchdog installed, change notifications wake the watcher right away;
+    otherwise (or as a safety net) it polls every interval seconds. Changes are
+    always confirmed by comparing folder scans, and reported only after the
+    files have stayed the same for SETTLE_SECONDS, so a file still being
+    written is not picked up half-way.
+    """
+
+    def __init__(self, folders, on_change, interval=2.0, extensions=WATCH_EXTENSIONS):
+        self.folders = [folders] if isinstance(folders, str) else list(folders)
+        self.on_change = on_change
+        self.interval = interval
+        self.extensions = extensions
+
+        self._known = self._scan()
+        self._pending = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    @property
+    def native(self):
+        """True if change notifications come from watchdog rather than polling alone"""
+        return self._observer is not None
+
+    def _scan(self):
+        state = {}
+        for folder in self.folders:
+            state.update(scan_folder(folder, self.extensions))
+        return state
+
+    def check(self):
+        """
+        Scan once. Reports (and returns) the changes if they have settled since
+        the previous check, else returns None.
+        """
+        current = self._scan()
+        if current == self._known:
+            self._pending = None
+            return None
+        if current != self._pending:
+            # Still changing (or just noticed) - confirm on the next check
+            self._pending = current
+            return None
+
+        changes = diff_scans(self._known, current)
+        self._known = current
+        self._pending = None
+        self.on_change(*changes)
+        return changes
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        if self._thread is not None:
+            return
+        if Observer is not None:
+            try:
+                observer = Observer()
+                handler = _WakeHandler(self._wake)
+                for folder in self.folders:
+                    if os.path.isdir(folder):
+                        observer.schedule(handler, folder, recursive=False)
+                observer.start()
+                self._observer = observer
+            except Exception:
+                # e.g. inotify watch limit reached - polling still works
+                self._observer = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            timeout = SETTLE_SECONDS if self._pending is not None else self.interval
+            if self._wake.wait(timeout):
+                # Woken by a notification - give the writer a moment to finish
+                self._stop.wait(SETTLE_SECONDS)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Folder watch error: {e}")
+
+    def stop(self):
+        """Stop watching; on_change is not called after this returns"""
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+def collapse_changes(batches):
+    """
+    Collapse several (added, modified, removed) batches into (to_reload, removed),
+    judged by whether each file exists now: a file added then deleted is only
+    removed, a file deleted then restored is reloaded.
+    """
+    touched = {}
+    for batch in batches:
+        for paths in batch:
+            for path in paths:
+                touched[path] = None
+    to_reload = [path for path in touched if os.path.exists(path)]
+    removed = [path for path in touched if not os.path.exists(path)]
+    return to_reload, removed
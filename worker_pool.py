@@ -0,0 +1,186 @@
+"""
+worker_pool.py - Worker processes with a wall-clock timeout and memory cap per task
+"""
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    # POSIX only - on Windows tasks are limited by the timeout alone
+    import resource
+except ImportError:
+    resource = None
+
+# Seconds between cancel checks while tasks are running
+POLL_SECONDS = 0.5
+
+
+def _limit_memory(memory_limit_mb):
+    """Cap this process's address space, so a runaway task gets MemoryError"""
+    if not memory_limit_mb or resource is None:
+        return
+    limit = int(memory_limit_mb * 1024 * 1024)
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Worker process: run (func, args) tasks from conn until told to stop"""
+    _limit_memory(memory_limit_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        func, args = task
+        try:
+            reply = (func(*args), None)
+        except MemoryError:
+            reply = (None, f"out of memory (limit {memory_limit_mb} MB)")
+        except Exception as e:
+            reply = (None, str(e) or type(e).__name__)
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send((None, f"out of memory (limit {memory_limit_mb} MB)"))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.key = None
+        self.deadline = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedPool:
+    """
+    Runs tasks - a picklable function and its arguments - in up to workers
+    separate processes.
+
+    A task that runs longer than timeout seconds is killed, and a task whose
+    process dies (crash, or past memory_limit_mb of address space) fails; in
+    both cases the worker is replaced and the other tasks carry on. Workers
+    are reused between tasks, so a batch pays the process start-up only once
+    per worker.
+
+    Usage:
+        pool = IsolatedPool(workers=4, timeout=300, memory_limit_mb=2048)
+        pool.submit(key, func, *args)
+        for key, result, error in pool.completed():
+            ...                      # more tasks may be submitted here
+        pool.close()
+    """
+
+    def __init__(self, workers=1, timeout=None, memory_limit_mb=None):
+        self.workers = max(workers, 1)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        # Spawned rather than forked: workers start small (the memory cap is
+        # on the whole process) and don't inherit the GUI's threads
+        self._context = multiprocessing.get_context('spawn')
+        self._queue = deque()
+        self._idle = []
+        self._busy = []
+
+    def submit(self, key, func, *args):
+        """Queue func(*args); its outcome is reported under key by completed()"""
+        self._queue.append((key, func, args))
+
+    def _dispatch(self):
+        while self._queue and len(self._busy) < self.workers:
+            key, func, args = self._queue.popleft()
+            worker = self._idle.pop() if self._idle else _Worker(self._context, self.memory_limit_mb)
+            try:
+                worker.conn.send((func, args))
+            except OSError:
+                # The idle worker is gone - start a fresh one
+                worker.kill()
+                worker = _Worker(self._context, self.memory_limit_mb)
+                worker.conn.send((func, args))
+            worker.key = key
+            worker.deadline = time.monotonic() + self.timeout if self.timeout else None
+            self._busy.append(worker)
+
+    def _finish(self, worker, reuse):
+        self._busy.remove(worker)
+        if reuse:
+            self._idle.append(worker)
+        else:
+            worker.kill()
+
+    def completed(self, cancel_event=None):
+        """
+        Run the queued tasks, yielding (key, result, error) as each finishes -
+        error is None on success, else a message saying why the task failed.
+        Stops early (killing running tasks) if cancel_event is set.
+        """
+        while self._queue or self._busy:
+            if cancel_event is not None and cancel_event.is_set():
+                self._kill_busy()
+                return
+            self._dispatch()
+
+            now = time.monotonic()
+            wait_for = POLL_SECONDS
+            for worker in self._busy:
+                if worker.deadline is not None:
+                    wait_for = min(wait_for, max(worker.deadline - now, 0))
+            ready = wait([w.conn for w in self._busy] + [w.process.sentinel for w in self._busy], wait_for)
+
+            for worker in list(self._busy):
+                if worker.conn in ready:
+                    try:
+                        result, error = worker.conn.recv()
+                    except (EOFError, OSError):
+                        # Closed without a reply - the process died
+                        self._finish(worker, reuse=False)
+                        yield worker.key, None, self._death_message(worker)
+                        continue
+                    self._finish(worker, reuse=True)
+                    yield worker.key, result, error
+                elif worker.process.sentinel in ready:
+                    self._finish(worker, reuse=False)
+                    yield worker.key, None, self._death_message(worker)
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    self._finish(worker, reuse=False)
+                    yield worker.key, None, f"timed out after {self.timeout:g} s"
+
+    def _death_message(self, worker):
+        worker.process.join()
+        return f"worker process died (exit code {worker.process.exitcode})"
+
+    def _kill_busy(self):
+        for worker in list(self._busy):
+            self._finish(worker, reuse=False)
+        self._queue.clear()
+
+    def close(self):
+        """Stop every worker; queued tasks that have not started are dropped"""
+        self._kill_busy()
+        for worker in self._idle:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self._idle = []